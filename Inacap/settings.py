@@ -23,6 +23,16 @@ MEDIA_DIR=os.path.join(BASE_DIR,'media')
 
 BASE_URL = 'http://192.168.1.105:8000' 
 
+# Credenciales firmadas de los QR (ver usuario/credenciales.py).
+# Sin CREDENCIAL_CLAVES se usa una clave derivada de SECRET_KEY (versión 1).
+# CREDENCIAL_CLAVES = {1: '...', 2: '...'}
+CREDENCIAL_VERSION_ACTUAL = 1
+# Mientras existan QR antiguos (sin firma) impresos, se siguen aceptando.
+CREDENCIAL_ACEPTAR_SIN_FIRMA = True
+# Los QR se dibujan al vuelo (usuario.views.qr_usuario). En True también se guarda
+# un PNG por usuario en media/qr_codes/ (regenerar_qrs).
+QR_GUARDAR_ARCHIVOS = False
+
 
 SECRET_KEY = 'django-insecure-it)h7wo8um6o+%f+p8qduxi0p9)u7x(#zvh5k)_bj*n6wb!=p)'
 DEBUG = False
@@ -97,6 +107,42 @@ DATABASES = {
 }
 
 
+# Cache
+# Se comparte entre procesos: caché de asistencias (una clave por asistente),
+# contadores que se ajustan con incr() y versiones de datos.
+# En producción debe ser Redis, con incr() atómico entre procesos: basta definir
+# la variable de entorno REDIS_URL (requiere el paquete `redis`).
+# Sin ella se usa un caché en archivos, apto solo para desarrollo o un único
+# proceso: su incr() no es atómico y, al pasar MAX_ENTRIES, borra claves al azar.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BASE_DIR, '.cache'),
+            'OPTIONS': {
+                'MAX_ENTRIES': 20000, # Los asistentes de un evento grande, más los usuarios y las páginas cacheadas
+            },
+        }
+    }
+ASISTENCIA_CACHE_TTL = 60 * 60 * 12 # 12 horas: cubre la jornada de un evento
+
+# Cola de impresión de etiquetas (ver paneladm/impresion.py).
+# Desactivada: el navegador abre la ventana de impresión en cada check-in.
+# Activada: el check-in encola la etiqueta y `manage.py procesar_impresiones` la imprime.
+ETIQUETAS_COLA_IMPRESION = False
+ETIQUETAS_SPOOL_DIR = os.path.join(BASE_DIR, 'spool')
+# ETIQUETAS_IMPRESORA = 'Etiquetas' # Cola CUPS (ver `lpstat -p`); si se define, se imprime con `lp` en vez del spool
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
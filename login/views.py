@@ -19,7 +19,7 @@ def login_usuario(request):
 
             if usuario is not None:
                 request.session['usuario_id'] = usuario.id
-                request.session['usuario_foto_url'] = usuario.foto.url if usuario.foto else None
+                request.session['usuario_foto_url'] = usuario.avatar_48_url or None
                 messages.success(request, f'¡Bienvenido de vuelta, {usuario.nombre}!')
 
                 # --- LÓGICA DE REDIRECCIÓN POR ROL ---
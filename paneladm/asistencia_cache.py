@@ -0,0 +1,88 @@
+"""
+Caché de pertenencia de asistentes por reunión.
+
+Cada asistencia confirmada se guarda como una clave propia
+(`asistencia:<reunion_id>:<usuario_id>`) en el backend de caché configurado.
+Con claves independientes, varias estaciones pueden marcar y desmarcar en
+paralelo sin leer-modificar-escribir un conjunto compartido.
+
+Solo se guardan positivos: si la clave existe, el escaneo es un duplicado y se
+responde sin tocar la base de datos; si no existe, se consulta la base como
+siempre (la restricción única sigue siendo la fuente de verdad).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _ttl():
+    return getattr(settings, 'ASISTENCIA_CACHE_TTL', 60 * 60 * 12)
+
+
+def _clave(reunion_id, usuario_id):
+    return f'asistencia:{reunion_id}:{usuario_id}'
+
+
+def ya_asistio(reunion_id, usuario_id):
+    """True si la caché confirma que el usuario ya asistió a la reunión."""
+    return cache.get(_clave(reunion_id, usuario_id)) is not None
+
+
+def filtrar_asistentes(reunion_id, usuario_ids):
+    """Devuelve el subconjunto de `usuario_ids` que la caché confirma como asistentes."""
+    claves = {_clave(reunion_id, usuario_id): usuario_id for usuario_id in usuario_ids}
+    return {claves[clave] for clave in cache.get_many(list(claves))}
+
+
+def marcar(reunion_id, usuario_ids):
+    if usuario_ids:
+        cache.set_many({_clave(reunion_id, usuario_id): 1 for usuario_id in usuario_ids}, _ttl())
+
+
+def desmarcar(reunion_id, usuario_id):
+    cache.delete(_clave(reunion_id, usuario_id))
+
+
+def olvidar(reunion_id, usuario_ids):
+    """Borra las claves de varios usuarios de una reunión y su marca de precalentada (p. ej. datos de prueba eliminados)."""
+    cache.delete_many([_clave(reunion_id, usuario_id) for usuario_id in usuario_ids] + [_clave_precalentada(reunion_id)])
+
+
+def _clave_precalentada(reunion_id):
+    return f'asistencia:{reunion_id}:precalentada'
+
+
+def precalentar(reunion_id, usuario_ids=None, forzar=False):
+    """
+    Carga en caché los asistentes actuales de la reunión (o `usuario_ids`, si
+    el llamador ya los tiene). Las páginas de escaneo la llaman en cada visita:
+    sin `forzar`, no hace nada si ya se precalentó dentro del TTL.
+    Devuelve cuántos se marcaron.
+    """
+    if not cache.add(_clave_precalentada(reunion_id), 1, _ttl()) and not forzar:
+        return 0
+    if usuario_ids is None:
+        from .models import Asistencia
+        usuario_ids = list(Asistencia.objects.filter(reunion_id=reunion_id).values_list('usuario_id', flat=True))
+    marcar(reunion_id, usuario_ids)
+    return len(usuario_ids)
+
+
+def verificar(reunion_id, reparar=False):
+    """
+    Compara la caché con `Reunion.asistentes`.
+    - faltantes: asistentes en la base que no están en caché (solo cuestan una consulta).
+    - sobrantes: claves en caché de asistencias que ya no existen. Como la caché
+      no se puede recorrer, se revisan los usuarios con bajas registradas.
+    Con `reparar=True` se corrigen ambas diferencias.
+    """
+    from .models import Asistencia, BajaAsistencia
+    en_base = set(Asistencia.objects.filter(reunion_id=reunion_id).values_list('usuario_id', flat=True))
+    con_baja = set(BajaAsistencia.objects.filter(reunion_id=reunion_id).values_list('usuario_id', flat=True))
+
+    faltantes = en_base - filtrar_asistentes(reunion_id, en_base)
+    sobrantes = filtrar_asistentes(reunion_id, con_baja - en_base)
+
+    if reparar:
+        marcar(reunion_id, faltantes)
+        cache.delete_many([_clave(reunion_id, usuario_id) for usuario_id in sobrantes])
+    return {'asistentes': len(en_base), 'faltantes': sorted(faltantes), 'sobrantes': sorted(sobrantes)}
@@ -0,0 +1,206 @@
+"""
+Estadísticas precalculadas (rollups) para `estadisticas_admin`.
+
+En vez de recorrer usuarios y respuestas en cada visita, la página lee tres
+tablas chicas:
+
+- `EstadisticaGlobal`: totales generales (usuarios, reuniones, respuestas y
+  suma de puntuaciones).
+- `EstadisticaReunion`: interesados, respuestas y suma de puntuaciones de cada
+  reunión.
+- `EstadisticaDistribucion`: cuántos usuarios hay por rol, sede y carrera
+  (`ambito=0`) y las respuestas por puntuación de cada reunión (`ambito=<id>`).
+
+Las señales de paneladm/models.py las ajustan con `UPDATE ... SET x = x + n`
+dentro de la misma transacción del cambio: si se revierte, el ajuste también.
+
+Las asistencias no tienen rollup: se cuentan al leer (`asistencias_totales`,
+`asistentes_por_reunion`, `distribucion_asistentes`) con consultas sobre el
+índice (reunion, usuario) de `Asistencia`. Así el check-in no escribe en
+filas de totales que comparten todas las estaciones, ni puede fallar por ellas.
+
+No pasan por las señales, y necesitan `manage.py reconstruir_estadisticas`
+(o `reconstruir()`) después:
+- `bulk_create()` de usuarios, respuestas o reuniones.
+- `update()` de rol, sede o carrera de usuarios, o de la puntuación de respuestas.
+- `delete()` de un queryset de intereses (`Reunion.interesados.through`), y
+  cualquier cambio con SQL directo o `loaddata`.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+GENERAL = 0
+DIMENSIONES = ('rubro', 'sede', 'carrera')
+USUARIOS = 'usuarios'
+REUNIONES = 'reuniones'
+RESPUESTAS = 'respuestas'
+SUMA_PUNTUACIONES = 'suma_puntuaciones'
+TOTALES = (USUARIOS, REUNIONES, RESPUESTAS, SUMA_PUNTUACIONES)
+LOTE = 1000
+
+
+def _sumar(modelo, campo, delta, **claves):
+    """Suma `delta` a `campo` en la fila de `claves`. Si no existe, la crea (solo al sumar)."""
+    if not delta:
+        return
+    if modelo.objects.filter(**claves).update(**{campo: F(campo) + delta}) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**claves, **{campo: delta})
+    except IntegrityError:
+        # Otra transacción la creó entretanto (o la reunión ya no existe).
+        modelo.objects.filter(**claves).update(**{campo: F(campo) + delta})
+
+
+def sumar_totales(**deltas):
+    from .models import EstadisticaGlobal
+    for clave, delta in deltas.items():
+        _sumar(EstadisticaGlobal, 'valor', delta, clave=clave)
+
+
+def sumar_reunion(reunion_id, **deltas):
+    from .models import EstadisticaReunion
+    for campo, delta in deltas.items():
+        _sumar(EstadisticaReunion, campo, delta, reunion_id=reunion_id)
+
+
+def sumar_distribucion(ambito, dimension, valor, delta):
+    from .models import EstadisticaDistribucion
+    if valor in (None, ''):
+        return
+    _sumar(EstadisticaDistribucion, 'cantidad', delta, ambito=ambito, dimension=dimension, valor=str(valor))
+
+
+def sumar_perfiles(ambito, perfiles, signo=1):
+    """Suma (o resta, con `signo=-1`) perfiles {rubro, sede, carrera} a la distribución de `ambito`."""
+    conteo = Counter((dimension, perfil[dimension]) for perfil in perfiles for dimension in DIMENSIONES)
+    for (dimension, valor), cantidad in conteo.items():
+        sumar_distribucion(ambito, dimension, valor, signo * cantidad)
+
+
+def sumar_usuarios(perfiles):
+    """Altas de usuarios con sus perfiles {rubro, sede, carrera}."""
+    sumar_totales(**{USUARIOS: len(perfiles)})
+    sumar_perfiles(GENERAL, perfiles)
+
+
+def cambiar_usuario(antes, despues):
+    """Traslada al usuario entre valores de rol/sede/carrera."""
+    for dimension in DIMENSIONES:
+        if antes[dimension] != despues[dimension]:
+            sumar_distribucion(GENERAL, dimension, antes[dimension], -1)
+            sumar_distribucion(GENERAL, dimension, despues[dimension], 1)
+
+
+def quitar_usuario(usuario_id, valores):
+    """Descuenta a un usuario que se va a borrar. Debe llamarse antes de borrar sus intereses."""
+    from .models import EstadisticaReunion, Reunion
+    sumar_totales(**{USUARIOS: -1})
+    sumar_perfiles(GENERAL, [valores], -1)
+    interesadas = Reunion.interesados.through.objects.filter(usuario_id=usuario_id).values_list('reunion_id', flat=True)
+    EstadisticaReunion.objects.filter(reunion_id__in=list(interesadas)).update(interesados=F('interesados') - 1)
+
+
+def sumar_respuesta(reunion_id, puntuacion, signo=1):
+    sumar_totales(**{RESPUESTAS: signo, SUMA_PUNTUACIONES: signo * puntuacion})
+    sumar_reunion(reunion_id, respuestas=signo, suma_puntuaciones=signo * puntuacion)
+    sumar_distribucion(reunion_id, 'puntuacion', puntuacion, signo)
+
+
+def quitar_reunion(reunion_id):
+    """Su `EstadisticaReunion` se borra en cascada; la distribución no tiene FK y se borra aquí."""
+    from .models import EstadisticaDistribucion
+    sumar_totales(**{REUNIONES: -1})
+    EstadisticaDistribucion.objects.filter(ambito=reunion_id).delete()
+
+
+def totales():
+    from .models import EstadisticaGlobal
+    valores = dict(EstadisticaGlobal.objects.filter(clave__in=TOTALES).values_list('clave', 'valor'))
+    return {clave: valores.get(clave, 0) for clave in TOTALES}
+
+
+def asistencias_totales():
+    from .models import Asistencia
+    return Asistencia.objects.count()
+
+
+def asistentes_por_reunion(reunion_ids):
+    """{reunion_id: asistentes} de varias reuniones, con una sola consulta agrupada."""
+    from .models import Asistencia
+    conteo = dict(Asistencia.objects.filter(reunion_id__in=reunion_ids).values_list('reunion_id').annotate(Count('id')).order_by())
+    return {reunion_id: conteo.get(reunion_id, 0) for reunion_id in reunion_ids}
+
+
+def distribucion_asistentes(reunion_id, dimension, limite=None):
+    """Como `distribucion`, pero entre los asistentes de una reunión."""
+    from .models import Asistencia
+    campo = f'usuario__{dimension}'
+    filas = (Asistencia.objects.filter(reunion_id=reunion_id).exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+             .values_list(campo).annotate(cantidad=Count('id')).order_by('-cantidad', campo))
+    if limite:
+        filas = filas[:limite]
+    return list(filas)
+
+
+def promedio(respuestas, suma_puntuaciones):
+    return suma_puntuaciones / respuestas if respuestas else 0
+
+
+def distribucion(ambito, dimension, limite=None, por_valor=False):
+    """Lista de (valor, cantidad), de mayor a menor cantidad (o por valor)."""
+    from .models import EstadisticaDistribucion
+    filas = EstadisticaDistribucion.objects.filter(ambito=ambito, dimension=dimension, cantidad__gt=0)
+    filas = filas.order_by('valor') if por_valor else filas.order_by('-cantidad', 'valor')
+    if limite:
+        filas = filas[:limite]
+    return list(filas.values_list('valor', 'cantidad'))
+
+
+def reconstruir(lote=LOTE):
+    """Recalcula todas las tablas desde cero en una transacción. Devuelve cuántas reuniones hay."""
+    from usuario.models import Usuario
+    from .models import EstadisticaDistribucion, EstadisticaGlobal, EstadisticaReunion, RespuestaEncuesta, Reunion
+    Interes = Reunion.interesados.through
+
+    with transaction.atomic():
+        for modelo in (EstadisticaGlobal, EstadisticaReunion, EstadisticaDistribucion):
+            modelo.objects.all().delete()
+
+        respuestas = RespuestaEncuesta.objects.aggregate(total=Count('id'), suma=Sum('puntuacion'))
+        valores = {
+            USUARIOS: Usuario.objects.count(),
+            REUNIONES: Reunion.objects.count(),
+            RESPUESTAS: respuestas['total'],
+            SUMA_PUNTUACIONES: respuestas['suma'] or 0,
+        }
+        EstadisticaGlobal.objects.bulk_create([EstadisticaGlobal(clave=clave, valor=valor) for clave, valor in valores.items()])
+
+        interesados = dict(Interes.objects.values_list('reunion_id').annotate(Count('id')).order_by())
+        por_reunion = {
+            reunion_id: (total, suma) for reunion_id, total, suma in
+            RespuestaEncuesta.objects.values_list('encuesta__reunion_id').annotate(Count('id'), Sum('puntuacion')).order_by()
+        }
+        reunion_ids = list(Reunion.objects.values_list('id', flat=True))
+        EstadisticaReunion.objects.bulk_create([
+            EstadisticaReunion(
+                reunion_id=reunion_id, interesados=interesados.get(reunion_id, 0),
+                respuestas=por_reunion.get(reunion_id, (0, 0))[0], suma_puntuaciones=por_reunion.get(reunion_id, (0, 0))[1],
+            ) for reunion_id in reunion_ids
+        ], batch_size=lote)
+
+        filas = []
+        for dimension in DIMENSIONES:
+            generales = Usuario.objects.exclude(**{f'{dimension}__isnull': True}).exclude(**{dimension: ''})
+            filas += [(GENERAL, dimension, valor, cantidad) for valor, cantidad in
+                      generales.values_list(dimension).annotate(Count('id')).order_by()]
+        filas += [(reunion_id, 'puntuacion', puntuacion, cantidad) for reunion_id, puntuacion, cantidad in
+                  RespuestaEncuesta.objects.values_list('encuesta__reunion_id', 'puntuacion').annotate(Count('id')).order_by()]
+        EstadisticaDistribucion.objects.bulk_create([
+            EstadisticaDistribucion(ambito=ambito, dimension=dimension, valor=str(valor), cantidad=cantidad)
+            for ambito, dimension, valor, cantidad in filas
+        ], batch_size=lote)
+    return len(reunion_ids)
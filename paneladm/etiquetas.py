@@ -0,0 +1,101 @@
+"""
+Hojas de etiquetas para imprimir antes del evento.
+
+Se arma un único HTML (A4, varias etiquetas por página) con los interesados de
+una reunión o con una lista de ids, y se guarda en MEDIA_ROOT/etiquetas/.
+El nombre del archivo incluye una huella de los datos que aparecen en las
+etiquetas: si nada cambió, se reutiliza la hoja ya generada.
+
+Desde el panel la hoja no se genera en la petición: queda en la tabla
+`TrabajoHojaEtiquetas` y la arma el worker `manage.py procesar_hojas_etiquetas`.
+"""
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from usuario.models import Usuario
+
+from .models import TrabajoHojaEtiquetas
+
+CARPETA_ETIQUETAS = 'etiquetas'
+ETIQUETAS_POR_PAGINA = 10 # 2 columnas x 5 filas de 10cm x 5cm en una hoja A4
+MAX_ETIQUETAS_POR_PAGINA = 10
+
+
+def _usuarios(usuario_ids):
+    return Usuario.objects.filter(id__in=usuario_ids)
+
+
+def ruta_hoja(usuario_ids, por_pagina=ETIQUETAS_POR_PAGINA, prefijo='seleccion'):
+    """
+    Ruta (relativa a MEDIA_ROOT) de la hoja para estos usuarios. Cambia si se
+    edita algún usuario, si cambian sus asistencias o si cambia la selección.
+    """
+    ids = sorted(set(int(usuario_id) for usuario_id in usuario_ids))
+    resumen = _usuarios(ids).aggregate(
+        total=Count('id'), actualizado=Max('fecha_actualizacion'), asistencias=Sum('cantidad_asistencias')
+    )
+    huella = hashlib.sha1(
+        f"{por_pagina}|{','.join(map(str, ids))}|{resumen['total']}|{resumen['actualizado']}|{resumen['asistencias']}".encode()
+    ).hexdigest()[:16]
+    return f'{CARPETA_ETIQUETAS}/{prefijo}-{huella}.html'
+
+
+def renderizar_hoja(usuario_ids, por_pagina=ETIQUETAS_POR_PAGINA, titulo='Etiquetas'):
+    """Devuelve el HTML de la hoja, con los usuarios ordenados por apellido."""
+    usuarios = list(_usuarios(usuario_ids).only(
+        'id', 'nombre', 'apellido', 'carrera', 'cantidad_asistencias'
+    ).order_by('apellido', 'nombre'))
+    paginas = [usuarios[i:i + por_pagina] for i in range(0, len(usuarios), por_pagina)]
+    return render_to_string('etiquetas_hoja.html', {
+        'titulo': titulo,
+        'paginas': paginas,
+        'total': len(usuarios),
+        'generado_en': timezone.now(),
+    })
+
+
+def _guardar(ruta, usuario_ids, por_pagina, titulo):
+    if not default_storage.exists(ruta):
+        html = renderizar_hoja(usuario_ids, por_pagina, titulo)
+        default_storage.save(ruta, ContentFile(html.encode('utf-8')))
+    return ruta
+
+
+def generar_hoja(usuario_ids, por_pagina=ETIQUETAS_POR_PAGINA, titulo='Etiquetas', prefijo='seleccion'):
+    """Genera la hoja si no existe ya una con los mismos datos. Devuelve su ruta."""
+    return _guardar(ruta_hoja(usuario_ids, por_pagina, prefijo), usuario_ids, por_pagina, titulo)
+
+
+def generar_trabajo(trabajo):
+    """Genera la hoja de un trabajo tomado por el worker."""
+    usuario_ids = [int(usuario_id) for usuario_id in trabajo.usuario_ids.split(',')]
+    return _guardar(trabajo.ruta, usuario_ids, trabajo.por_pagina, trabajo.titulo)
+
+
+def estado_hoja(ruta):
+    """'listo', 'generando', 'error: ...' o None si nunca se pidió."""
+    if default_storage.exists(ruta):
+        return 'listo'
+    trabajo = TrabajoHojaEtiquetas.objects.filter(ruta=ruta).values_list('estado', 'error').first()
+    if trabajo is None or trabajo[0] == 'listo': # Listo pero sin archivo: se borró y hay que pedirla de nuevo
+        return None
+    estado, error = trabajo
+    return f'error: {error}' if estado == 'error' else 'generando'
+
+
+def encolar_hoja(usuario_ids, por_pagina=ETIQUETAS_POR_PAGINA, titulo='Etiquetas', prefijo='seleccion'):
+    """
+    Deja la hoja en la cola del worker y devuelve (ruta, estado) sin esperar.
+    Si la hoja ya existe no se encola; si ya está en la cola, no se duplica.
+    """
+    usuario_ids = sorted(set(usuario_ids))
+    ruta = ruta_hoja(usuario_ids, por_pagina, prefijo)
+    if default_storage.exists(ruta):
+        return ruta, 'listo'
+    TrabajoHojaEtiquetas.objects.encolar(ruta, usuario_ids, por_pagina, titulo)
+    return ruta, 'generando'
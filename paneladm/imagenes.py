@@ -0,0 +1,130 @@
+"""
+Derivados redimensionados de las imágenes de las reuniones.
+
+Las fotos que suben los organizadores pesan varios MB. Las páginas sirven en
+su lugar versiones WebP reducidas, guardadas junto al original
+(`reuniones/foto.jpg` -> `reuniones/foto_card.webp`), y el navegador elige la
+adecuada con `srcset` (ver `Reunion.imagen_srcset`).
+
+Se generan en segundo plano: al subir o cambiar la imagen, la reunión queda con
+`imagen_estado='pendiente'` y el worker `manage.py procesar_imagenes` la toma
+con un UPDATE condicional (varios workers no procesan la misma). Mientras no
+estén listos, los templates usan el original.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+# Ancho máximo de cada derivado. Nunca se agranda el original.
+TAMANOS_REUNION = {'thumb': 320, 'card': 640, 'hero': 1280}
+CALIDAD_WEBP = 80
+MAX_INTENTOS = 3
+
+
+def nombre_derivado(nombre_original, variante):
+    raiz, _ = os.path.splitext(nombre_original)
+    return f'{raiz}_{variante}.webp'
+
+
+def abrir(nombre, lado_minimo=None):
+    """
+    Abre una imagen del storage ya orientada según su EXIF y en RGB/RGBA.
+    Con `lado_minimo`, los JPEG se decodifican directamente a una escala menor
+    (sin bajar de ese lado), mucho más rápido que leer la foto completa.
+    """
+    with default_storage.open(nombre, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        if lado_minimo:
+            imagen.draft('RGB', (lado_minimo, lado_minimo))
+        imagen = ImageOps.exif_transpose(imagen)
+        return imagen.convert('RGBA' if imagen.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+
+def guardar_webp(imagen, nombre):
+    """Guarda la imagen en WebP reemplazando la anterior. Devuelve el nombre."""
+    buffer = BytesIO()
+    imagen.save(buffer, format='WEBP', quality=CALIDAD_WEBP, method=6)
+    if default_storage.exists(nombre):
+        default_storage.delete(nombre)
+    return default_storage.save(nombre, ContentFile(buffer.getvalue()))
+
+
+def generar_variantes(nombre_original, tamanos):
+    """Genera un derivado por entrada de `tamanos`. Devuelve {variante: ancho real}."""
+    original = abrir(nombre_original)
+    variantes = {}
+    for variante, ancho in tamanos.items():
+        imagen = original.copy()
+        imagen.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+        guardar_webp(imagen, nombre_derivado(nombre_original, variante))
+        variantes[variante] = imagen.width
+    return variantes
+
+
+def borrar_variantes(nombre_original, variantes):
+    for variante in variantes:
+        default_storage.delete(nombre_derivado(nombre_original, variante))
+
+
+def url_variante(nombre_original, variantes, variante):
+    """URL del derivado si existe; si no (aún pendiente), la del original."""
+    if variante in variantes:
+        return default_storage.url(nombre_derivado(nombre_original, variante))
+    return default_storage.url(nombre_original)
+
+
+def srcset(nombre_original, variantes):
+    """Valor del atributo srcset: un candidato por ancho distinto."""
+    anchos = {}
+    for variante, ancho in sorted(variantes.items(), key=lambda item: item[1]):
+        anchos.setdefault(ancho, default_storage.url(nombre_derivado(nombre_original, variante)))
+    return ', '.join(f'{url} {ancho}w' for ancho, url in anchos.items())
+
+
+def tomar_siguiente_reunion():
+    """Reclama la reunión pendiente más antigua. Devuelve None si no hay."""
+    from .models import Reunion
+    candidatos = Reunion.objects.filter(imagen_estado='pendiente').order_by('id').values_list('id', flat=True)[:10]
+    for reunion_id in candidatos:
+        tomado = Reunion.objects.filter(id=reunion_id, imagen_estado='pendiente').update(
+            imagen_estado='generando', imagen_intentos=F('imagen_intentos') + 1, imagen_tomada_en=timezone.now()
+        )
+        if tomado:
+            return Reunion.objects.only('id', 'imagen', 'imagen_intentos').get(id=reunion_id)
+    return None
+
+
+def liberar_abandonadas(antiguedad):
+    """Devuelve a la cola las reuniones "generando" reclamadas hace más de `antiguedad` (un worker que se cayó)."""
+    from .models import Reunion
+    return Reunion.objects.filter(
+        imagen_estado='generando', imagen_tomada_en__lt=timezone.now() - antiguedad
+    ).update(imagen_estado='pendiente')
+
+
+def procesar_reunion(reunion, max_intentos=MAX_INTENTOS):
+    """Genera los derivados de una reunión ya reclamada. Devuelve el error o None."""
+    from usuario import versiones
+    from .models import Reunion
+    if not reunion.imagen:
+        Reunion.objects.filter(id=reunion.id).update(imagen_estado='listo', imagen_variantes={})
+        return None
+    try:
+        variantes = generar_variantes(reunion.imagen.name, TAMANOS_REUNION)
+    except Exception as e:
+        estado = 'error' if reunion.imagen_intentos >= max_intentos else 'pendiente'
+        Reunion.objects.filter(id=reunion.id, imagen=reunion.imagen.name).update(imagen_estado=estado)
+        return e
+    # update() en vez de save(): no dispara señales. Si entretanto cambiaron la
+    # imagen, no se marca nada (la reunión ya volvió a la cola).
+    marcada = Reunion.objects.filter(id=reunion.id, imagen=reunion.imagen.name).update(
+        imagen_estado='listo', imagen_variantes=variantes
+    )
+    if marcada:
+        versiones.incrementar(versiones.REUNION) # Las páginas cacheadas pasan a usar los derivados
+    return None
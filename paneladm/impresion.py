@@ -0,0 +1,130 @@
+"""
+Impresión de etiquetas en el servidor.
+
+Con `ETIQUETAS_COLA_IMPRESION = True`, cada check-in con etiqueta crea un
+`TrabajoImpresion` en vez de abrir la ventana de impresión del navegador; el
+worker `procesar_impresiones` los toma en orden y entrega la etiqueta
+(el mismo contenido de `etiqueta_imprimir.html`: logo, nombre, carrera y
+asistencias) como PNG de 10cm x 5cm a 300 dpi, listo para la impresora.
+
+Destino:
+- `ETIQUETAS_IMPRESORA`: nombre de la cola CUPS de la impresora de etiquetas. Se
+  envía con `lp`, y el driver de CUPS convierte el PNG al lenguaje de la impresora
+  (ZPL, EPL, ESC/POS...); un dispositivo crudo como /dev/usb/lp0 no entiende PNG.
+  `ETIQUETAS_OPCIONES_LP` agrega opciones (por defecto, papel de 100x50mm).
+- Si no se configura, se escribe en `ETIQUETAS_SPOOL_DIR` (por defecto BASE_DIR/spool),
+  que hace de impresora local para pruebas o para un proceso que lo vacíe.
+"""
+import io
+import os
+import subprocess
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from PIL import Image, ImageDraw, ImageFont
+
+DPI = 300
+ANCHO, ALTO = 1181, 591 # 10cm x 5cm
+MARGEN = 45 # 0.15in
+LADO_LOGO = 330 # 1.1in
+SEPARACION = 47
+COLOR_TEXTO = (33, 37, 41)
+COLOR_SECUNDARIO = (85, 85, 85)
+COLOR_ASISTENCIAS = (0, 123, 255)
+OPCIONES_LP = ['-o', 'media=Custom.100x50mm', '-o', 'fit-to-page']
+ESPERA_LP = 30 # segundos
+
+
+def cola_activa():
+    return getattr(settings, 'ETIQUETAS_COLA_IMPRESION', False)
+
+
+def _fuente(tamano, negrita=False):
+    ruta = getattr(settings, 'ETIQUETAS_FUENTE_NEGRITA' if negrita else 'ETIQUETAS_FUENTE', None)
+    for nombre in filter(None, [ruta, 'DejaVuSans-Bold.ttf' if negrita else 'DejaVuSans.ttf']):
+        try:
+            return ImageFont.truetype(nombre, tamano)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=tamano)
+
+
+def _ajustar(draw, texto, tamano, ancho_maximo, negrita=False, minimo=30):
+    """Reduce la fuente hasta que el texto quepa; si aun así no cabe, lo recorta con '…'."""
+    while True:
+        fuente = _fuente(tamano, negrita)
+        if draw.textlength(texto, font=fuente) <= ancho_maximo or tamano <= minimo:
+            break
+        tamano -= 4
+    while texto and draw.textlength(texto, font=fuente) > ancho_maximo:
+        texto = texto[:-2] + '…'
+    return texto, fuente
+
+
+def renderizar_etiqueta(usuario):
+    """Devuelve los bytes PNG de la etiqueta del usuario."""
+    imagen = Image.new('RGB', (ANCHO, ALTO), 'white')
+    draw = ImageDraw.Draw(imagen)
+
+    ruta_logo = finders.find('img/logo_etiqueta.jpg')
+    if ruta_logo:
+        with Image.open(ruta_logo) as logo:
+            logo = logo.convert('RGB')
+            logo.thumbnail((LADO_LOGO, LADO_LOGO))
+            imagen.paste(logo, (MARGEN + (LADO_LOGO - logo.width) // 2, (ALTO - logo.height) // 2))
+
+    x = MARGEN + LADO_LOGO + SEPARACION
+    ancho_texto = ANCHO - MARGEN - x
+    lineas = [
+        (*_ajustar(draw, usuario.nombre, 62, ancho_texto, negrita=True), COLOR_TEXTO),
+        (*_ajustar(draw, usuario.apellido, 62, ancho_texto, negrita=True), COLOR_TEXTO),
+    ]
+    if usuario.carrera:
+        lineas.append((*_ajustar(draw, usuario.get_carrera_real_display, 40, ancho_texto), COLOR_SECUNDARIO))
+    lineas.append((f'● {usuario.cantidad_asistencias}', _fuente(75, negrita=True), COLOR_ASISTENCIAS))
+
+    alturas = [fuente.getbbox('Ág')[3] + 12 for _, fuente, _ in lineas]
+    y = (ALTO - sum(alturas)) // 2
+    for (texto, fuente, color), altura in zip(lineas, alturas):
+        draw.text((x, y), texto, font=fuente, fill=color)
+        y += altura
+
+    salida = io.BytesIO()
+    imagen.save(salida, format='PNG', dpi=(DPI, DPI))
+    return salida.getvalue()
+
+
+def _spool_dir():
+    return getattr(settings, 'ETIQUETAS_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'spool'))
+
+
+def _enviar_a_cups(impresora, contenido, titulo):
+    """Entrega la etiqueta a la cola CUPS con `lp`. Devuelve el id del trabajo de CUPS."""
+    opciones = getattr(settings, 'ETIQUETAS_OPCIONES_LP', OPCIONES_LP)
+    resultado = subprocess.run(
+        ['lp', '-d', impresora, '-t', titulo, *opciones, '-'],
+        input=contenido, capture_output=True, timeout=ESPERA_LP,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f'lp: {resultado.stderr.decode(errors="replace").strip()}')
+    # "request id is Etiquetas-42 (1 file(s))"
+    salida = resultado.stdout.decode(errors='replace').split()
+    return salida[3] if len(salida) > 3 else impresora
+
+
+def imprimir(trabajo):
+    """Renderiza y entrega la etiqueta del trabajo. Devuelve el destino."""
+    contenido = renderizar_etiqueta(trabajo.usuario)
+    impresora = getattr(settings, 'ETIQUETAS_IMPRESORA', None)
+    if impresora:
+        return 'cups:' + _enviar_a_cups(impresora, contenido, f'etiqueta-{trabajo.id}')
+
+    carpeta = _spool_dir()
+    os.makedirs(carpeta, exist_ok=True)
+    destino = os.path.join(carpeta, f'{trabajo.id:08d}-{trabajo.usuario_id}.png')
+    # Se escribe con otro nombre y se renombra: quien vacíe el spool nunca lee un archivo a medias.
+    temporal = destino + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, destino)
+    return destino
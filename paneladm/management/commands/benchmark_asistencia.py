@@ -0,0 +1,238 @@
+import json
+import random
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from paneladm import asistencia_cache, estadisticas
+from paneladm.models import Reunion, Asistencia, BajaUsuario
+from usuario.credenciales import generar_token
+from usuario.models import Usuario
+
+ESCENARIOS = ['qr', 'credencial', 'manual', 'decorador']
+# Respuestas esperadas: registro (2xx o redirección del registro manual), duplicado
+# (409) y, en 'decorador', el 405 de la vista. Cualquier otra indica un problema de
+# configuración (p. ej. 400 por ALLOWED_HOSTS) y no una medición del check-in.
+ESPERADOS_EXTRA = {'manual': {302}, 'decorador': {405}}
+MAX_INESPERADAS = 0.5
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not valores:
+        return 0
+    indice = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuántos escaneos por segundo soporta el check-in. Crea N usuarios y una "
+        "reunión por escenario, lanza las peticiones en paralelo con el cliente de "
+        "pruebas de Django y reporta rendimiento, latencias, consultas por petición y "
+        "la tasa de contadores duplicados en JSON. Usar contra una base local (SQLite o "
+        "un MySQL de pruebas): crea y luego borra sus propios datos. Se aborta si la mayoría "
+        "de las respuestas de un escenario no son las esperadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=500, help='Cantidad de usuarios a crear.')
+        parser.add_argument('--concurrencia', type=int, default=8, help='Hilos que envían peticiones en paralelo.')
+        parser.add_argument('--reescaneos', type=float, default=0.3,
+                            help='Fracción de usuarios que vuelve a escanear su QR (duplicados).')
+        parser.add_argument('--escenarios', default=','.join(ESCENARIOS),
+                            help=f'Lista separada por comas: {", ".join(ESCENARIOS)}.')
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la salida estándar).')
+        parser.add_argument('--conservar', action='store_true', help='No borrar los datos creados al terminar.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='No pedir confirmación.')
+
+    def handle(self, *args, **options):
+        escenarios = [e.strip() for e in options['escenarios'].split(',') if e.strip()]
+        desconocidos = set(escenarios) - set(ESCENARIOS)
+        if desconocidos:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(desconocidos))}')
+
+        db = settings.DATABASES['default']
+        if options['interactive']:
+            respuesta = input(f"Se crearán datos de prueba en '{db['NAME']}' ({db['ENGINE']}). ¿Continuar? [s/N] ")
+            if respuesta.strip().lower() not in ('s', 'si', 'sí', 'y', 'yes'):
+                raise CommandError('Cancelado.')
+
+        self.prefijo = uuid.uuid4().hex[:4]
+        self.host = self._host()
+        usuarios, admin, totem = self._sembrar(options['usuarios'])
+        reuniones = []
+        resultados = {}
+        try:
+            for escenario in escenarios:
+                reunion = Reunion.objects.create(
+                    detalle=f'Benchmark {self.prefijo} {escenario}', descripcion='Benchmark de check-in',
+                    fecha=timezone.now(), ubicacion='Local', imprimir_etiqueta_al_asistir=False,
+                )
+                reuniones.append(reunion)
+                operador = admin if escenario == 'manual' else totem
+                resultados[escenario] = self._ejecutar(
+                    escenario, reunion, usuarios, operador, options['concurrencia'], options['reescaneos']
+                )
+                self.stderr.write(f"{escenario}: {resultados[escenario]['peticiones_por_segundo']} req/s")
+                inesperadas = resultados[escenario]['respuestas_inesperadas']
+                if inesperadas > MAX_INESPERADAS:
+                    raise CommandError(
+                        f"{escenario}: {inesperadas:.0%} de respuestas inesperadas "
+                        f"({resultados[escenario]['estados_http']}); no se genera el reporte."
+                    )
+        finally:
+            if not options['conservar']:
+                self._limpiar(reuniones, usuarios + [admin.id, totem.id])
+
+        reporte = json.dumps({
+            'commit': self._commit_actual(),
+            'fecha': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'usuarios': options['usuarios'],
+            'concurrencia': options['concurrencia'],
+            'reescaneos': options['reescaneos'],
+            'escenarios': resultados,
+        }, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(reporte)
+        else:
+            self.stdout.write(reporte)
+
+    def _host(self):
+        """Un host de ALLOWED_HOSTS para el cliente de pruebas ('testserver' no suele estar)."""
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*':
+                return host.lstrip('.')
+        return 'localhost'
+
+    def _sembrar(self, cantidad):
+        """
+        Crea los usuarios con bulk_create (sin señales: no se generan QR) y suma
+        solo esos usuarios a las estadísticas; al borrarlos, las señales los descuentan.
+        """
+        def nuevo(i, **extra):
+            return Usuario(
+                nombre=f'Bench{i}', apellido=self.prefijo, rut=f'{self.prefijo}-{i}',
+                email=f'{i}@{self.prefijo}.bench', password='!', etiqueta_emojis='🚀', **extra
+            )
+        sembrados = Usuario.objects.filter(email__endswith=f'@{self.prefijo}.bench')
+        with transaction.atomic():
+            Usuario.objects.bulk_create(
+                [nuevo(i) for i in range(cantidad)] + [nuevo('admin', es_admin=True), nuevo('totem', es_totem=True)],
+                batch_size=500,
+            )
+            estadisticas.sumar_usuarios(list(sembrados.values(*estadisticas.DIMENSIONES)))
+        admin = sembrados.get(es_admin=True)
+        totem = sembrados.get(es_totem=True)
+        usuarios = list(sembrados.filter(es_admin=False, es_totem=False).values_list('id', flat=True))
+        return usuarios, admin, totem
+
+    def _limpiar(self, reuniones, usuario_ids):
+        """Borra lo que creó el benchmark y nada más: reuniones, usuarios, sus bajas y sus claves de caché."""
+        for reunion in reuniones:
+            asistencia_cache.olvidar(reunion.id, usuario_ids)
+        Reunion.objects.filter(id__in=[r.id for r in reuniones]).delete()
+        Usuario.objects.filter(id__in=usuario_ids).delete()
+        BajaUsuario.objects.filter(usuario_id__in=usuario_ids).delete() # No son bajas que el tótem deba conocer
+
+    def _peticion(self, escenario, reunion, usuario_id):
+        """Devuelve (método, url, datos, content_type) para un escaneo del escenario."""
+        if escenario == 'qr':
+            return 'post', reverse('panel-admin:marcar_asistencia_qr', args=[reunion.id, usuario_id]), None, None
+        if escenario == 'credencial':
+            return ('post', reverse('panel-admin:marcar_asistencia_credencial', args=[reunion.id]),
+                    json.dumps({'credencial': generar_token(usuario_id)}), 'application/json')
+        if escenario == 'manual':
+            return ('post', reverse('panel-admin:registrar_asistencia', args=[reunion.id]),
+                    {'manual_add': '1', 'usuario_id': usuario_id}, None)
+        # 'decorador': un GET que el decorador deja pasar y la vista rechaza con 405.
+        return 'get', reverse('panel-admin:marcar_asistencia_qr', args=[reunion.id, usuario_id]), None, None
+
+    def _ejecutar(self, escenario, reunion, usuarios, operador, concurrencia, reescaneos):
+        # Todos escanean una vez; una fracción vuelve a escanear, mezclado para provocar carreras.
+        escaneos = usuarios + random.sample(usuarios, int(len(usuarios) * reescaneos))
+        random.shuffle(escaneos)
+
+        sesion = SessionStore()
+        sesion['usuario_id'] = operador.id
+        sesion.save()
+
+        local = threading.local()
+        mediciones = []
+        candado = threading.Lock()
+
+        def trabajar(usuario_id):
+            if not hasattr(local, 'cliente'):
+                local.cliente = Client(raise_request_exception=False, HTTP_HOST=self.host)
+                local.cliente.cookies[settings.SESSION_COOKIE_NAME] = sesion.session_key
+            metodo, url, datos, content_type = self._peticion(escenario, reunion, usuario_id)
+            kwargs = {'content_type': content_type} if content_type else {}
+            with CaptureQueriesContext(connections['default']) as consultas:
+                inicio = time.perf_counter()
+                try:
+                    estado = getattr(local.cliente, metodo)(url, datos, **kwargs).status_code
+                except Exception:
+                    estado = 'excepcion'
+                duracion = time.perf_counter() - inicio
+            with candado:
+                mediciones.append((duracion, len(consultas.captured_queries), estado))
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            list(pool.map(trabajar, escaneos))
+        total = time.perf_counter() - inicio
+        sesion.delete()
+
+        latencias = sorted(m[0] * 1000 for m in mediciones)
+        estados = {}
+        for _, _, estado in mediciones:
+            estados[str(estado)] = estados.get(str(estado), 0) + 1
+        esperados = {409} | ESPERADOS_EXTRA.get(escenario, set())
+        inesperadas = sum(
+            cantidad for estado, cantidad in estados.items()
+            if not (estado.isdigit() and (200 <= int(estado) < 300 or int(estado) in esperados))
+        )
+
+        # Contadores duplicados: incrementos de cantidad_asistencias sin fila de asistencia que los respalde.
+        filas = Asistencia.objects.filter(reunion=reunion).count()
+        incrementos = Usuario.objects.filter(id__in=usuarios).aggregate(total=Sum('cantidad_asistencias'))['total'] or 0
+        Usuario.objects.filter(id__in=usuarios).update(cantidad_asistencias=0) # Base limpia para el siguiente escenario
+
+        return {
+            'peticiones': len(mediciones),
+            'segundos': round(total, 3),
+            'peticiones_por_segundo': round(len(mediciones) / total, 1) if total else 0,
+            'latencia_ms': {
+                'p50': round(_percentil(latencias, 50), 2),
+                'p95': round(_percentil(latencias, 95), 2),
+                'p99': round(_percentil(latencias, 99), 2),
+                'max': round(latencias[-1], 2) if latencias else 0,
+            },
+            'consultas_por_peticion': round(sum(m[1] for m in mediciones) / len(mediciones), 2) if mediciones else 0,
+            'estados_http': estados,
+            'respuestas_inesperadas': round(inesperadas / len(mediciones), 4) if mediciones else 0,
+            'asistencias_registradas': filas,
+            'tasa_contador_duplicado': round((incrementos - filas) / filas, 4) if filas else 0,
+        }
+
+    def _commit_actual(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paneladm import asistencia_cache
+from paneladm.models import Reunion
+
+
+class Command(BaseCommand):
+    help = (
+        "Precalienta la caché de asistentes por reunión o verifica su consistencia "
+        "contra Reunion.asistentes. Sin ids, usa las reuniones de hoy en adelante."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reunion_ids', nargs='*', type=int, help='Ids de las reuniones.')
+        parser.add_argument('--verificar', action='store_true', help='Solo comparar la caché con la base de datos.')
+        parser.add_argument('--reparar', action='store_true', help='Verificar y corregir las diferencias.')
+
+    def handle(self, *args, **options):
+        reuniones = Reunion.objects.order_by('fecha')
+        if options['reunion_ids']:
+            reuniones = reuniones.filter(id__in=options['reunion_ids'])
+        else:
+            reuniones = reuniones.filter(fecha__gte=timezone.now() - timedelta(days=1))
+
+        for reunion in reuniones:
+            if options['verificar'] or options['reparar']:
+                resultado = asistencia_cache.verificar(reunion.id, reparar=options['reparar'])
+                estilo = self.style.SUCCESS if not (resultado['faltantes'] or resultado['sobrantes']) else self.style.WARNING
+                self.stdout.write(estilo(
+                    f"[{reunion.id}] {reunion.detalle}: {resultado['asistentes']} asistentes, "
+                    f"{len(resultado['faltantes'])} faltantes, {len(resultado['sobrantes'])} sobrantes"
+                    + (" (reparado)" if options['reparar'] else "")
+                ))
+            else:
+                total = asistencia_cache.precalentar(reunion.id, forzar=True)
+                self.stdout.write(self.style.SUCCESS(f"[{reunion.id}] {reunion.detalle}: {total} asistentes en caché"))
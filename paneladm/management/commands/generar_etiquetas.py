@@ -0,0 +1,46 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from paneladm import etiquetas
+from paneladm.models import Reunion
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera la hoja de etiquetas (HTML listo para imprimir) con los interesados "
+        "de una reunión o con una lista de ids, y la deja en MEDIA_ROOT/etiquetas/. "
+        "Si los datos no cambiaron, reutiliza la hoja ya generada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('reunion_id', nargs='?', type=int, help='Reunión cuyos interesados se imprimen.')
+        parser.add_argument('--ids', help='Ids de usuario separados por coma (en lugar de los interesados).')
+        parser.add_argument('--por-pagina', type=int, default=etiquetas.ETIQUETAS_POR_PAGINA,
+                            help=f'Etiquetas por página (máximo {etiquetas.MAX_ETIQUETAS_POR_PAGINA}).')
+
+    def handle(self, *args, **options):
+        por_pagina = options['por_pagina']
+        if not 1 <= por_pagina <= etiquetas.MAX_ETIQUETAS_POR_PAGINA:
+            raise CommandError(f'--por-pagina debe estar entre 1 y {etiquetas.MAX_ETIQUETAS_POR_PAGINA}.')
+
+        if options['ids']:
+            try:
+                usuario_ids = [int(x) for x in options['ids'].split(',') if x.strip()]
+            except ValueError:
+                raise CommandError('--ids debe ser una lista de números separados por coma.')
+            titulo, prefijo = 'Etiquetas', 'seleccion'
+        elif options['reunion_id']:
+            try:
+                reunion = Reunion.objects.get(id=options['reunion_id'])
+            except Reunion.DoesNotExist:
+                raise CommandError(f"No existe la reunión {options['reunion_id']}.")
+            usuario_ids = list(reunion.interesados.values_list('id', flat=True))
+            titulo, prefijo = reunion.detalle, f'reunion-{reunion.id}'
+        else:
+            raise CommandError('Indica una reunión o --ids.')
+
+        if not usuario_ids:
+            raise CommandError('No hay usuarios para generar etiquetas.')
+
+        ruta = etiquetas.generar_hoja(usuario_ids, por_pagina, titulo, prefijo)
+        self.stdout.write(self.style.SUCCESS(f'{len(usuario_ids)} etiqueta(s): {default_storage.path(ruta)}'))
@@ -0,0 +1,61 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paneladm import etiquetas
+from paneladm.models import TrabajoHojaEtiquetas
+
+LIBERAR_CADA = 60 # Segundos entre revisiones de hojas abandonadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de las hojas de etiquetas pedidas desde el panel: las toma en orden de "
+        "llegada y deja el HTML en MEDIA_ROOT/etiquetas/. Se pueden correr varios en "
+        "paralelo; cada hoja la toma uno solo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar.')
+        parser.add_argument('--intervalo', type=float, default=1,
+                            help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--max-intentos', type=int, default=3,
+                            help='Intentos antes de marcar una hoja como error.')
+        parser.add_argument('--liberar-tras', type=int, default=5,
+                            help='Minutos tras los que una hoja "generando" se considera abandonada.')
+
+    def handle(self, *args, **options):
+        liberar_tras = timedelta(minutes=options['liberar_tras'])
+        proxima_liberacion = 0
+        while True:
+            if time.monotonic() >= proxima_liberacion:
+                self._liberar_abandonados(liberar_tras)
+                proxima_liberacion = time.monotonic() + LIBERAR_CADA
+            trabajo = TrabajoHojaEtiquetas.objects.tomar_siguiente()
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            self._procesar(trabajo, options['max_intentos'])
+
+    def _liberar_abandonados(self, liberar_tras):
+        abandonados = TrabajoHojaEtiquetas.objects.liberar_abandonados(liberar_tras)
+        if abandonados:
+            self.stdout.write(self.style.WARNING(f'{abandonados} hoja(s) abandonadas vuelven a la cola.'))
+
+    def _procesar(self, trabajo, max_intentos):
+        try:
+            etiquetas.generar_trabajo(trabajo)
+        except Exception as e:
+            estado = 'error' if trabajo.intentos >= max_intentos else 'pendiente'
+            TrabajoHojaEtiquetas.objects.filter(id=trabajo.id).update(estado=estado, error=str(e), fecha_fin=timezone.now())
+            self.stderr.write(f'[{trabajo.id}] {trabajo.ruta}: {e} ({estado})')
+            return
+
+        fin = timezone.now()
+        TrabajoHojaEtiquetas.objects.filter(id=trabajo.id).update(estado='listo', error='', fecha_fin=fin)
+        duracion = (fin - trabajo.fecha_inicio).total_seconds()
+        self.stdout.write(f'[{trabajo.id}] {trabajo.ruta} ({duracion:.1f} s)')
@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from paneladm import imagenes
+from paneladm.models import Reunion
+
+LIBERAR_CADA = 60 # Segundos entre revisiones de imágenes abandonadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker que genera los derivados WebP (thumb, card, hero) de las imágenes de "
+        "reuniones nuevas o reemplazadas. Reintenta las fallidas hasta --max-intentos. "
+        "Se pueden correr varios en paralelo; cada reunión la toma uno solo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar.')
+        parser.add_argument('--intervalo', type=float, default=2,
+                            help='Segundos de espera cuando no hay pendientes.')
+        parser.add_argument('--max-intentos', type=int, default=imagenes.MAX_INTENTOS,
+                            help='Intentos antes de marcar la imagen como error.')
+        parser.add_argument('--reintentar-errores', action='store_true',
+                            help='Devolver a la cola las imágenes marcadas como error.')
+        parser.add_argument('--liberar-tras', type=int, default=5,
+                            help='Minutos tras los que una imagen "generando" se considera abandonada.')
+
+    def handle(self, *args, **options):
+        if options['reintentar_errores']:
+            total = Reunion.objects.filter(imagen_estado='error').update(imagen_estado='pendiente', imagen_intentos=0)
+            self.stdout.write(f'{total} imágenes con error vuelven a la cola.')
+        liberar_tras = timedelta(minutes=options['liberar_tras'])
+        proxima_liberacion = 0
+        while True:
+            # Imágenes que quedaron a medias porque un worker (este u otro) se cayó.
+            if time.monotonic() >= proxima_liberacion:
+                abandonadas = imagenes.liberar_abandonadas(liberar_tras)
+                if abandonadas:
+                    self.stdout.write(self.style.WARNING(f'{abandonadas} imágenes abandonadas vuelven a la cola.'))
+                proxima_liberacion = time.monotonic() + LIBERAR_CADA
+            reunion = imagenes.tomar_siguiente_reunion()
+            if reunion is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            error = imagenes.procesar_reunion(reunion, options['max_intentos'])
+            if error:
+                self.stderr.write(f'[{reunion.id}] Error al generar derivados (intento {reunion.imagen_intentos}): {error}')
+            else:
+                self.stdout.write(f'[{reunion.id}] Derivados generados: {reunion.imagen.name}')
@@ -0,0 +1,66 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from paneladm import impresion
+from paneladm.models import TrabajoImpresion
+
+LIBERAR_CADA = 60 # Segundos entre revisiones de trabajos abandonados
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de impresión de etiquetas: toma los trabajos pendientes en "
+        "orden de llegada y los envía a la impresora (o al directorio spool). Se pueden "
+        "correr varios en paralelo; cada trabajo lo toma uno solo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar.')
+        parser.add_argument('--intervalo', type=float, default=0.5,
+                            help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--max-intentos', type=int, default=3,
+                            help='Intentos antes de marcar un trabajo como error.')
+        parser.add_argument('--liberar-tras', type=int, default=5,
+                            help='Minutos tras los que un trabajo "imprimiendo" se considera abandonado.')
+
+    def handle(self, *args, **options):
+        liberar_tras = timedelta(minutes=options['liberar_tras'])
+        proxima_liberacion = 0
+        while True:
+            # Trabajos que quedaron a medias porque un worker (este u otro) se cayó.
+            if time.monotonic() >= proxima_liberacion:
+                self._liberar_abandonados(liberar_tras)
+                proxima_liberacion = time.monotonic() + LIBERAR_CADA
+            trabajo = TrabajoImpresion.objects.tomar_siguiente()
+            if trabajo is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            self._procesar(trabajo, options['max_intentos'])
+
+    def _liberar_abandonados(self, liberar_tras):
+        abandonados = TrabajoImpresion.objects.liberar_abandonados(liberar_tras)
+        if abandonados:
+            self.stdout.write(self.style.WARNING(f'{abandonados} trabajo(s) abandonados vuelven a la cola.'))
+
+    def _procesar(self, trabajo, max_intentos):
+        try:
+            destino = impresion.imprimir(trabajo)
+        except Exception as e:
+            estado = 'error' if trabajo.intentos >= max_intentos else 'pendiente'
+            TrabajoImpresion.objects.filter(id=trabajo.id).update(estado=estado, error=str(e), fecha_fin=timezone.now())
+            self.stderr.write(f'[{trabajo.id}] {trabajo.usuario.nombre}: {e} ({estado})')
+            return
+
+        fin = timezone.now()
+        TrabajoImpresion.objects.filter(id=trabajo.id).update(
+            estado='impreso', archivo=destino, error='', fecha_fin=fin
+        )
+        espera = (trabajo.fecha_inicio - trabajo.fecha_creacion).total_seconds() * 1000
+        duracion = (fin - trabajo.fecha_inicio).total_seconds() * 1000
+        self.stdout.write(f'[{trabajo.id}] {trabajo.usuario.nombre} {trabajo.usuario.apellido}: '
+                          f'{destino} (espera {espera:.0f} ms, impresión {duracion:.0f} ms)')
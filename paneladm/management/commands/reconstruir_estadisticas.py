@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from paneladm import estadisticas
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero las tablas de estadísticas del panel (totales, contadores por "
+        "reunión y distribuciones; las asistencias no tienen tabla, se cuentan al leer). "
+        "Las señales las mantienen al día; usar después de cambios hechos con update() o "
+        "SQL directo, o si se sospecha un desvío. Conviene correrlo fuera de un evento: los "
+        "ajustes que lleguen durante el cálculo pueden perderse."
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        reuniones = estadisticas.reconstruir()
+        totales = estadisticas.totales()
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo en {time.perf_counter() - inicio:.1f} s: {totales[estadisticas.USUARIOS]} usuarios, "
+            f"{reuniones} reuniones, {totales[estadisticas.RESPUESTAS]} respuestas."
+        ))
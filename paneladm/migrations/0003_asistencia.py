@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0009_usuario_groups_usuario_is_active_usuario_is_staff_and_more'),
+        ('paneladm', '0002_ganadorsorteo'),
+    ]
+
+    operations = [
+        # La tabla intermedia ya existe (la creó el ManyToMany automático),
+        # así que solo se actualiza el estado de los modelos.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Asistencia',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('reunion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='paneladm.reunion')),
+                        ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='usuario.usuario')),
+                    ],
+                    options={
+                        'db_table': 'paneladm_reunion_asistentes',
+                        'unique_together': {('reunion', 'usuario')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='reunion',
+                    name='asistentes',
+                    field=models.ManyToManyField(blank=True, related_name='reuniones_asistidas', through='paneladm.Asistencia', to='usuario.usuario'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='asistencia',
+            name='fecha_registro',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0003_asistencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asistencia',
+            name='escaneado_en',
+            field=models.DateTimeField(blank=True, help_text='Hora del escaneo informada por la estación (lotes diferidos).', null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('paneladm', '0004_asistencia_escaneado_en'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BajaAsistencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['reunion', 'fecha_registro'], name='paneladm_re_reunion_f0c18b_idx'),
+        ),
+        migrations.AddField(
+            model_name='bajaasistencia',
+            name='reunion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bajas_asistencia', to='paneladm.reunion'),
+        ),
+        migrations.AddField(
+            model_name='bajaasistencia',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='bajaasistencia',
+            index=models.Index(fields=['reunion', 'fecha'], name='paneladm_ba_reunion_c6fe95_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+def encolar_imagenes_existentes(apps, schema_editor):
+    # Las imágenes ya subidas también necesitan sus derivados.
+    Reunion = apps.get_model('paneladm', 'Reunion')
+    Reunion.objects.exclude(imagen__isnull=True).exclude(imagen='').update(imagen_estado='pendiente')
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0006_trabajoimpresion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reunion',
+            name='imagen_estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('generando', 'Generando'), ('listo', 'Listo'), ('error', 'Error')], db_index=True, default='listo', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reunion',
+            name='imagen_intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reunion',
+            name='imagen_tomada_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reunion',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, help_text='Ancho de cada derivado generado.'),
+        ),
+        migrations.RunPython(encolar_imagenes_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:32
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+# Copia del cálculo de paneladm/estadisticas.py al momento de esta migración:
+# las migraciones no deben depender del código vivo, que puede cambiar después.
+GENERAL = 0
+DIMENSIONES = ('rubro', 'sede', 'carrera')
+LOTE = 1000
+
+
+def calcular_estadisticas(apps, schema_editor):
+    # Parte de los datos actuales; de ahí en adelante las mantienen las señales.
+    Usuario = apps.get_model('usuario', 'Usuario')
+    Reunion = apps.get_model('paneladm', 'Reunion')
+    Asistencia = apps.get_model('paneladm', 'Asistencia')
+    RespuestaEncuesta = apps.get_model('paneladm', 'RespuestaEncuesta')
+    EstadisticaGlobal = apps.get_model('paneladm', 'EstadisticaGlobal')
+    EstadisticaReunion = apps.get_model('paneladm', 'EstadisticaReunion')
+    EstadisticaDistribucion = apps.get_model('paneladm', 'EstadisticaDistribucion')
+    Interes = Reunion._meta.get_field('interesados').remote_field.through
+
+    respuestas = RespuestaEncuesta.objects.aggregate(total=Count('id'), suma=Sum('puntuacion'))
+    valores = {
+        'usuarios': Usuario.objects.count(),
+        'reuniones': Reunion.objects.count(),
+        'asistencias': Usuario.objects.aggregate(total=Sum('cantidad_asistencias'))['total'] or 0,
+        'respuestas': respuestas['total'],
+        'suma_puntuaciones': respuestas['suma'] or 0,
+    }
+    EstadisticaGlobal.objects.bulk_create([EstadisticaGlobal(clave=clave, valor=valor) for clave, valor in valores.items()])
+
+    asistentes = dict(Asistencia.objects.values_list('reunion_id').annotate(Count('id')).order_by())
+    interesados = dict(Interes.objects.values_list('reunion_id').annotate(Count('id')).order_by())
+    por_reunion = {
+        reunion_id: (total, suma) for reunion_id, total, suma in
+        RespuestaEncuesta.objects.values_list('encuesta__reunion_id').annotate(Count('id'), Sum('puntuacion')).order_by()
+    }
+    EstadisticaReunion.objects.bulk_create([
+        EstadisticaReunion(
+            reunion_id=reunion_id, asistentes=asistentes.get(reunion_id, 0), interesados=interesados.get(reunion_id, 0),
+            respuestas=por_reunion.get(reunion_id, (0, 0))[0], suma_puntuaciones=por_reunion.get(reunion_id, (0, 0))[1],
+        ) for reunion_id in Reunion.objects.values_list('id', flat=True)
+    ], batch_size=LOTE)
+
+    filas = []
+    for dimension in DIMENSIONES:
+        generales = Usuario.objects.exclude(**{f'{dimension}__isnull': True}).exclude(**{dimension: ''})
+        filas += [(GENERAL, dimension, valor, cantidad) for valor, cantidad in
+                  generales.values_list(dimension).annotate(Count('id')).order_by()]
+        campo = f'usuario__{dimension}'
+        por_asistentes = Asistencia.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''})
+        filas += [(reunion_id, dimension, valor, cantidad) for reunion_id, valor, cantidad in
+                  por_asistentes.values_list('reunion_id', campo).annotate(Count('id')).order_by()]
+    filas += [(reunion_id, 'puntuacion', puntuacion, cantidad) for reunion_id, puntuacion, cantidad in
+              RespuestaEncuesta.objects.values_list('encuesta__reunion_id', 'puntuacion').annotate(Count('id')).order_by()]
+    EstadisticaDistribucion.objects.bulk_create([
+        EstadisticaDistribucion(ambito=ambito, dimension=dimension, valor=str(valor), cantidad=cantidad)
+        for ambito, dimension, valor, cantidad in filas
+    ], batch_size=LOTE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0007_reunion_imagen_derivados'),
+        ('usuario', '0016_usuario_directorio_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaGlobal',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstadisticaReunion',
+            fields=[
+                ('reunion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadistica', serialize=False, to='paneladm.reunion')),
+                ('asistentes', models.IntegerField(default=0)),
+                ('interesados', models.IntegerField(default=0)),
+                ('respuestas', models.IntegerField(default=0)),
+                ('suma_puntuaciones', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstadisticaDistribucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ambito', models.PositiveIntegerField()),
+                ('dimension', models.CharField(max_length=20)),
+                ('valor', models.CharField(max_length=150)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('ambito', 'dimension', 'valor')},
+            },
+        ),
+        migrations.RunPython(calcular_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0008_estadisticas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BajaUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usuario_id', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
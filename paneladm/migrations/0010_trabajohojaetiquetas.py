@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 16:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0009_bajausuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoHojaEtiquetas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=255, unique=True)),
+                ('usuario_ids', models.TextField()),
+                ('por_pagina', models.PositiveSmallIntegerField()),
+                ('titulo', models.CharField(max_length=200)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('generando', 'Generando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='paneladm_tr_estado_3df721_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-18 16:08
+
+from django.db import migrations
+
+
+def borrar_rollups_de_asistencia(apps, schema_editor):
+    # Las asistencias pasan a contarse al leer: se van su total y su distribución por reunión.
+    apps.get_model('paneladm', 'EstadisticaGlobal').objects.filter(clave='asistencias').delete()
+    apps.get_model('paneladm', 'EstadisticaDistribucion').objects.exclude(ambito=0).exclude(dimension='puntuacion').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paneladm', '0010_trabajohojaetiquetas'),
+    ]
+
+    operations = [
+        # Al revertir, `manage.py reconstruir_estadisticas` de la versión anterior los recalcula.
+        migrations.RunPython(borrar_rollups_de_asistencia, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='estadisticareunion',
+            name='asistentes',
+        ),
+    ]
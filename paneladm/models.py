@@ -1,5 +1,17 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Exists, OuterRef
 from django.utils import timezone
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from usuario import versiones
+from . import asistencia_cache, estadisticas, imagenes, tickets_cache
+
+IMAGEN_ESTADO_CHOICES = [
+    ('pendiente', 'Pendiente'),
+    ('generando', 'Generando'),
+    ('listo', 'Listo'),
+    ('error', 'Error'),
+]
 
 class Reunion(models.Model):
     detalle = models.CharField(max_length=200, verbose_name="Título o Detalle")
@@ -7,7 +19,12 @@ class Reunion(models.Model):
     fecha = models.DateTimeField(verbose_name="Fecha y Hora")
     ubicacion = models.CharField(max_length=255, verbose_name="Ubicación")
     imagen = models.ImageField(upload_to='reuniones/', null=True, blank=True, verbose_name="Imagen (Opcional)")
-    asistentes = models.ManyToManyField('usuario.Usuario', related_name='reuniones_asistidas', blank=True)
+    # Los derivados WebP de la imagen los genera `manage.py procesar_imagenes` (ver paneladm/imagenes.py).
+    imagen_estado = models.CharField(max_length=20, choices=IMAGEN_ESTADO_CHOICES, default='listo', db_index=True)
+    imagen_intentos = models.PositiveSmallIntegerField(default=0)
+    imagen_tomada_en = models.DateTimeField(null=True, blank=True)
+    imagen_variantes = models.JSONField(default=dict, blank=True, help_text="Ancho de cada derivado generado.")
+    asistentes = models.ManyToManyField('usuario.Usuario', through='Asistencia', related_name='reuniones_asistidas', blank=True)
     interesados = models.ManyToManyField('usuario.Usuario', related_name='reuniones_interesado', blank=True)
     imprimir_etiqueta_al_asistir = models.BooleanField(
         default=True,
@@ -18,10 +35,269 @@ class Reunion(models.Model):
     def __str__(self):
         return self.detalle
 
+    @property
+    def imagen_thumb_url(self):
+        return imagenes.url_variante(self.imagen.name, self.imagen_variantes, 'thumb') if self.imagen else ''
+
+    @property
+    def imagen_card_url(self):
+        return imagenes.url_variante(self.imagen.name, self.imagen_variantes, 'card') if self.imagen else ''
+
+    @property
+    def imagen_hero_url(self):
+        return imagenes.url_variante(self.imagen.name, self.imagen_variantes, 'hero') if self.imagen else ''
+
+    @property
+    def imagen_srcset(self):
+        """Candidatos para `srcset`; vacío mientras los derivados no estén listos."""
+        return imagenes.srcset(self.imagen.name, self.imagen_variantes) if self.imagen else ''
+
     class Meta:
         verbose_name = "Reunión"
         verbose_name_plural = "Reuniones"
 
+class AsistenciaManager(models.Manager):
+    def registrar(self, reunion_id, usuario_id, escaneado_en=None):
+        """
+        Registra la asistencia de forma idempotente (insertar o ignorar).
+        Devuelve True solo si la fila se insertó; en ese caso, y solo en ese,
+        se incrementa `cantidad_asistencias` del usuario. La restricción única
+        (reunion, usuario) resuelve los escaneos simultáneos del mismo QR.
+        """
+        from usuario.models import Usuario
+        try:
+            with transaction.atomic():
+                self.create(reunion_id=reunion_id, usuario_id=usuario_id, escaneado_en=escaneado_en)
+                Usuario.objects.filter(id=usuario_id).update(cantidad_asistencias=F('cantidad_asistencias') + 1)
+        except IntegrityError:
+            # Duplicado: otra estación ya lo registró. Cualquier otro error (FK inválida) se propaga.
+            if self.filter(reunion_id=reunion_id, usuario_id=usuario_id).exists():
+                asistencia_cache.marcar(reunion_id, [usuario_id])
+                return False
+            raise
+        transaction.on_commit(lambda: asistencia_cache.marcar(reunion_id, [usuario_id]))
+        return True
+
+    def registrar_lote(self, reunion_id, escaneos):
+        """
+        Registra un lote de escaneos `{usuario_id: escaneado_en}` con una sola
+        inserción masiva y una sola actualización de contadores.
+        Devuelve tres conjuntos de ids: (nuevos, duplicados, desconocidos).
+        """
+        from usuario.models import Usuario
+        # Los duplicados que la caché ya conoce no llegan a la base de datos.
+        en_cache = asistencia_cache.filtrar_asistentes(reunion_id, escaneos)
+        pendientes = [usuario_id for usuario_id in escaneos if usuario_id not in en_cache]
+        if not pendientes:
+            return set(), en_cache, set()
+
+        # Una sola consulta resuelve qué usuarios existen y cuáles ya asistieron.
+        ya_asistio = self.filter(reunion_id=reunion_id, usuario_id=OuterRef('pk'))
+        estado = dict(
+            Usuario.objects.filter(id__in=pendientes).annotate(ya_asistio=Exists(ya_asistio)).values_list('id', 'ya_asistio')
+        )
+        desconocidos = set(pendientes) - set(estado)
+        candidatos = {usuario_id for usuario_id, ya in estado.items() if not ya}
+
+        nuevos = set()
+        if candidatos:
+            try:
+                with transaction.atomic():
+                    self.bulk_create([
+                        self.model(reunion_id=reunion_id, usuario_id=usuario_id, escaneado_en=escaneos[usuario_id])
+                        for usuario_id in candidatos
+                    ])
+                    Usuario.objects.filter(id__in=candidatos).update(cantidad_asistencias=F('cantidad_asistencias') + 1)
+                nuevos = candidatos
+            except IntegrityError:
+                # Otra estación registró a alguno entre la lectura y la inserción:
+                # se resuelve fila a fila para no contar dos veces.
+                for usuario_id in candidatos:
+                    try:
+                        if self.registrar(reunion_id, usuario_id, escaneos[usuario_id]):
+                            nuevos.add(usuario_id)
+                    except IntegrityError:
+                        desconocidos.add(usuario_id) # El usuario fue eliminado entretanto
+
+        duplicados = set(estado) - nuevos - desconocidos
+        confirmados = nuevos | duplicados
+        transaction.on_commit(lambda: asistencia_cache.marcar(reunion_id, confirmados))
+        return nuevos, duplicados | en_cache, desconocidos
+
+    def quitar(self, reunion_id, usuario_id):
+        """
+        Elimina la asistencia y decrementa el contador solo si la fila existía.
+        Devuelve True si se eliminó algo.
+        """
+        from usuario.models import Usuario
+        with transaction.atomic():
+            eliminadas, _ = self.filter(reunion_id=reunion_id, usuario_id=usuario_id).delete()
+            if eliminadas:
+                Usuario.objects.filter(id=usuario_id, cantidad_asistencias__gt=0).update(cantidad_asistencias=F('cantidad_asistencias') - 1)
+                # Dejamos constancia para que los padrones de los tótems reciban la baja.
+                BajaAsistencia.objects.create(reunion_id=reunion_id, usuario_id=usuario_id)
+        # Como `marcar`, recién al confirmar: si la baja se revierte, la caché no queda sin la marca.
+        transaction.on_commit(lambda: asistencia_cache.desmarcar(reunion_id, usuario_id))
+        return bool(eliminadas)
+
+class Asistencia(models.Model):
+    """
+    Tabla intermedia de `Reunion.asistentes`. Reutiliza la tabla que Django
+    creaba automáticamente para el ManyToMany, agregando la fecha de registro.
+    """
+    reunion = models.ForeignKey(Reunion, on_delete=models.CASCADE)
+    usuario = models.ForeignKey('usuario.Usuario', on_delete=models.CASCADE)
+    fecha_registro = models.DateTimeField(default=timezone.now)
+    escaneado_en = models.DateTimeField(null=True, blank=True, help_text="Hora del escaneo informada por la estación (lotes diferidos).")
+
+    objects = AsistenciaManager()
+
+    class Meta:
+        db_table = 'paneladm_reunion_asistentes'
+        unique_together = ('reunion', 'usuario') # Un usuario solo puede asistir una vez por reunión
+        indexes = [
+            models.Index(fields=['reunion', 'fecha_registro']), # Deltas del padrón por reunión
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} en {self.reunion_id}"
+
+class BajaAsistencia(models.Model):
+    """
+    Registro de asistencias quitadas. Permite entregar deltas del padrón
+    (altas y bajas) sin reenviar la lista completa.
+    """
+    reunion = models.ForeignKey(Reunion, on_delete=models.CASCADE, related_name='bajas_asistencia')
+    usuario = models.ForeignKey('usuario.Usuario', on_delete=models.CASCADE, related_name='+')
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['reunion', 'fecha']),
+        ]
+
+class BajaUsuario(models.Model):
+    """
+    Registro de usuarios eliminados (lápidas). Los deltas del padrón los
+    informan para que los tótems los saquen de su copia local.
+    """
+    usuario_id = models.BigIntegerField()
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
+
+@receiver(post_delete, sender='usuario.Usuario')
+def registrar_baja_usuario(sender, instance, **kwargs):
+    BajaUsuario.objects.create(usuario_id=instance.id)
+
+class TrabajoImpresionManager(models.Manager):
+    def encolar(self, reunion_id, usuario_ids):
+        """Crea un trabajo pendiente por usuario. No espera a la impresora."""
+        return self.bulk_create([self.model(reunion_id=reunion_id, usuario_id=usuario_id) for usuario_id in usuario_ids])
+
+    def tomar_siguiente(self):
+        """
+        Reclama el trabajo pendiente más antiguo con un UPDATE condicional, así
+        dos workers nunca imprimen la misma etiqueta. Devuelve None si no hay.
+        """
+        candidatos = self.filter(estado='pendiente').order_by('fecha_creacion', 'id').values_list('id', flat=True)[:10]
+        for trabajo_id in candidatos:
+            tomado = self.filter(id=trabajo_id, estado='pendiente').update(
+                estado='imprimiendo', fecha_inicio=timezone.now(), intentos=F('intentos') + 1
+            )
+            if tomado:
+                return self.select_related('usuario').get(id=trabajo_id)
+        return None
+
+    def liberar_abandonados(self, antiguedad):
+        """Devuelve a la cola los trabajos "imprimiendo" de hace más de `antiguedad` (un worker que se cayó)."""
+        return self.filter(estado='imprimiendo', fecha_inicio__lt=timezone.now() - antiguedad).update(estado='pendiente')
+
+class TrabajoImpresion(models.Model):
+    """Etiqueta pendiente de imprimir por el worker `procesar_impresiones`."""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('imprimiendo', 'Imprimiendo'),
+        ('impreso', 'Impreso'),
+        ('error', 'Error'),
+    ]
+
+    reunion = models.ForeignKey(Reunion, on_delete=models.CASCADE, related_name='trabajos_impresion', null=True, blank=True)
+    usuario = models.ForeignKey('usuario.Usuario', on_delete=models.CASCADE, related_name='+')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    archivo = models.CharField(max_length=255, blank=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    objects = TrabajoImpresionManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+
+    def __str__(self):
+        return f"Etiqueta de {self.usuario_id} ({self.estado})"
+
+class TrabajoHojaEtiquetasManager(models.Manager):
+    def encolar(self, ruta, usuario_ids, por_pagina, titulo):
+        """
+        Deja pendiente la hoja `ruta` si no está ya en la cola. Una que terminó
+        en error (o cuyo archivo se borró) vuelve a la cola.
+        """
+        trabajo, creado = self.get_or_create(ruta=ruta, defaults={
+            'usuario_ids': ','.join(map(str, usuario_ids)), 'por_pagina': por_pagina, 'titulo': titulo,
+        })
+        if not creado and trabajo.estado in ('listo', 'error'):
+            self.filter(id=trabajo.id, estado=trabajo.estado).update(estado='pendiente', intentos=0, error='')
+        return trabajo
+
+    def tomar_siguiente(self):
+        """Reclama la hoja pendiente más antigua con un UPDATE condicional. Devuelve None si no hay."""
+        candidatos = self.filter(estado='pendiente').order_by('fecha_creacion', 'id').values_list('id', flat=True)[:10]
+        for trabajo_id in candidatos:
+            tomado = self.filter(id=trabajo_id, estado='pendiente').update(
+                estado='generando', fecha_inicio=timezone.now(), intentos=F('intentos') + 1
+            )
+            if tomado:
+                return self.get(id=trabajo_id)
+        return None
+
+    def liberar_abandonados(self, antiguedad):
+        """Devuelve a la cola las hojas "generando" de hace más de `antiguedad` (un worker que se cayó)."""
+        return self.filter(estado='generando', fecha_inicio__lt=timezone.now() - antiguedad).update(estado='pendiente')
+
+class TrabajoHojaEtiquetas(models.Model):
+    """Hoja de etiquetas pendiente de generar por el worker `procesar_hojas_etiquetas`."""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('generando', 'Generando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ]
+
+    ruta = models.CharField(max_length=255, unique=True)
+    usuario_ids = models.TextField() # Ids separados por coma
+    por_pagina = models.PositiveSmallIntegerField()
+    titulo = models.CharField(max_length=200)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    objects = TrabajoHojaEtiquetasManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+
+    def __str__(self):
+        return f"Hoja {self.ruta} ({self.estado})"
+
 class Encuesta(models.Model):
     reunion = models.OneToOneField(Reunion, on_delete=models.CASCADE, related_name="encuesta")
     titulo = models.CharField(max_length=200, default="Encuesta de Satisfacción")
@@ -66,6 +342,64 @@ class SoporteTicket(models.Model):
     def __str__(self):
         return f"Ticket de {self.usuario.nombre}: {self.asunto}"
 
+def _estado_guardado(ticket):
+    """Estado en la base (no el de la instancia, que puede estar desactualizada)."""
+    if ticket.pk is None:
+        return None
+    return SoporteTicket.objects.filter(pk=ticket.pk).values_list('estado', flat=True).first()
+
+@receiver(pre_save, sender=SoporteTicket)
+@receiver(pre_delete, sender=SoporteTicket)
+def recordar_estado_ticket(sender, instance, **kwargs):
+    instance._estado_anterior = _estado_guardado(instance)
+
+@receiver(post_save, sender=SoporteTicket)
+def contar_ticket_guardado(sender, instance, **kwargs):
+    antes, ahora = instance._estado_anterior == 'abierto', instance.estado == 'abierto'
+    if antes != ahora:
+        transaction.on_commit(lambda: tickets_cache.ajustar(1 if ahora else -1))
+
+@receiver(post_delete, sender=SoporteTicket)
+def contar_ticket_borrado(sender, instance, **kwargs):
+    if instance._estado_anterior == 'abierto':
+        transaction.on_commit(lambda: tickets_cache.ajustar(-1))
+
+@receiver(pre_save, sender=Reunion)
+def encolar_imagen_reunion(sender, instance, **kwargs):
+    """Si la imagen es nueva o cambió, sus derivados vuelven a la cola."""
+    anterior = None
+    if instance.pk is not None:
+        anterior = Reunion.objects.filter(pk=instance.pk).values('imagen', 'imagen_variantes').first()
+    if (anterior['imagen'] if anterior else '') == (instance.imagen.name or ''):
+        instance._derivados_anteriores = None
+        return
+    instance._derivados_anteriores = anterior
+    instance.imagen_estado = 'pendiente' if instance.imagen else 'listo'
+    instance.imagen_intentos = 0
+    instance.imagen_variantes = {}
+
+@receiver(post_save, sender=Reunion)
+def borrar_derivados_reemplazados(sender, instance, **kwargs):
+    anterior = getattr(instance, '_derivados_anteriores', None)
+    if anterior and anterior['imagen'] and anterior['imagen_variantes']:
+        transaction.on_commit(lambda: imagenes.borrar_variantes(anterior['imagen'], anterior['imagen_variantes']))
+
+@receiver(post_delete, sender=Reunion)
+def borrar_derivados(sender, instance, **kwargs):
+    if instance.imagen and instance.imagen_variantes:
+        nombre, variantes = instance.imagen.name, instance.imagen_variantes
+        transaction.on_commit(lambda: imagenes.borrar_variantes(nombre, variantes))
+
+@receiver(post_save, sender=Reunion)
+@receiver(post_delete, sender=Reunion)
+def nueva_version_reuniones(sender, instance, **kwargs):
+    transaction.on_commit(lambda: versiones.incrementar(versiones.REUNION))
+
+@receiver(post_save, sender=RespuestaEncuesta)
+@receiver(post_delete, sender=RespuestaEncuesta)
+def nueva_version_testimonios(sender, instance, **kwargs):
+    transaction.on_commit(lambda: versiones.incrementar(versiones.RESPUESTA_ENCUESTA))
+
 class TicketRespuesta(models.Model):
     ticket = models.ForeignKey(SoporteTicket, on_delete=models.CASCADE, related_name='respuestas')
     usuario = models.ForeignKey('usuario.Usuario', on_delete=models.CASCADE)
@@ -90,4 +424,130 @@ class GanadorSorteo(models.Model):
         ordering = ['-fecha_sorteo']
 
     def __str__(self):
-        return f"{self.ganador.nombre} {self.ganador.apellido} - {self.fecha_sorteo.strftime('%d/%m/%Y')}"
\ No newline at end of file
+        return f"{self.ganador.nombre} {self.ganador.apellido} - {self.fecha_sorteo.strftime('%d/%m/%Y')}"
+
+
+class EstadisticaGlobal(models.Model):
+    """Totales generales de las estadísticas del panel (ver paneladm/estadisticas.py)."""
+    clave = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.clave}: {self.valor}"
+
+class EstadisticaReunion(models.Model):
+    """Contadores de una reunión para las estadísticas del panel (ver paneladm/estadisticas.py)."""
+    reunion = models.OneToOneField(Reunion, on_delete=models.CASCADE, primary_key=True, related_name='estadistica')
+    interesados = models.IntegerField(default=0)
+    respuestas = models.IntegerField(default=0)
+    suma_puntuaciones = models.IntegerField(default=0)
+
+    @property
+    def promedio_satisfaccion(self):
+        return estadisticas.promedio(self.respuestas, self.suma_puntuaciones)
+
+    def __str__(self):
+        return f"Estadísticas de {self.reunion_id}"
+
+class EstadisticaDistribucion(models.Model):
+    """
+    Cantidad de usuarios por valor de rol, sede o carrera (`ambito=0`), o de
+    respuestas por puntuación de una reunión (`ambito=<id>`): por eso no es
+    una FK, y sus filas se borran junto con la reunión en `descontar_reunion`.
+    """
+    ambito = models.PositiveIntegerField()
+    dimension = models.CharField(max_length=20)
+    valor = models.CharField(max_length=150)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ambito', 'dimension', 'valor')
+
+    def __str__(self):
+        return f"{self.ambito} {self.dimension}={self.valor}: {self.cantidad}"
+
+# --- Rollups de estadísticas (ver paneladm/estadisticas.py) ---
+# Se ajustan dentro de la transacción del cambio, no en on_commit: si el cambio
+# se revierte, el ajuste también.
+
+@receiver(post_save, sender=Reunion)
+def crear_estadistica_reunion(sender, instance, created, **kwargs):
+    if created:
+        EstadisticaReunion.objects.get_or_create(reunion=instance)
+        estadisticas.sumar_totales(**{estadisticas.REUNIONES: 1})
+
+@receiver(post_delete, sender=Reunion)
+def descontar_reunion(sender, instance, **kwargs):
+    estadisticas.quitar_reunion(instance.id)
+
+@receiver(m2m_changed, sender=Reunion.interesados.through)
+def contar_interesados(sender, instance, action, reverse, pk_set, **kwargs):
+    # Con `reverse`, la instancia es el usuario y `pk_set` son reuniones.
+    if action == 'pre_remove':
+        # `remove()` informa los ids pedidos, no los que estaban: se descuentan solo estos.
+        if reverse:
+            quitados = sender.objects.filter(usuario_id=instance.id, reunion_id__in=pk_set).values_list('reunion_id', flat=True)
+        else:
+            quitados = sender.objects.filter(reunion_id=instance.id, usuario_id__in=pk_set).values_list('usuario_id', flat=True)
+        instance._interes_quitado = list(quitados)
+    elif action == 'pre_clear' and reverse:
+        instance._interes_quitado = list(sender.objects.filter(usuario_id=instance.id).values_list('reunion_id', flat=True))
+    elif action in ('post_add', 'post_remove') or (action == 'post_clear' and reverse):
+        signo = 1 if action == 'post_add' else -1
+        ids = pk_set if action == 'post_add' else instance._interes_quitado
+        if not ids:
+            return
+        if reverse:
+            EstadisticaReunion.objects.filter(reunion_id__in=ids).update(interesados=F('interesados') + signo)
+        else:
+            estadisticas.sumar_reunion(instance.id, interesados=signo * len(ids))
+    elif action == 'post_clear':
+        EstadisticaReunion.objects.filter(reunion_id=instance.id).update(interesados=0)
+
+@receiver(pre_save, sender=RespuestaEncuesta)
+def recordar_puntuacion(sender, instance, update_fields=None, **kwargs):
+    instance._puntuacion_anterior = None
+    if instance.pk is not None and (update_fields is None or 'puntuacion' in update_fields):
+        instance._puntuacion_anterior = sender.objects.filter(pk=instance.pk).values_list('puntuacion', flat=True).first()
+
+@receiver(post_save, sender=RespuestaEncuesta)
+def contar_respuesta(sender, instance, created, **kwargs):
+    anterior = instance._puntuacion_anterior
+    if not created and anterior in (None, instance.puntuacion):
+        return
+    reunion_id = instance.encuesta.reunion_id
+    if anterior is not None:
+        estadisticas.sumar_respuesta(reunion_id, anterior, -1)
+    estadisticas.sumar_respuesta(reunion_id, instance.puntuacion)
+
+@receiver(pre_delete, sender=RespuestaEncuesta)
+def descontar_respuesta(sender, instance, **kwargs):
+    estadisticas.sumar_respuesta(instance.encuesta.reunion_id, instance.puntuacion, -1)
+
+def _valores_usuario(usuario):
+    return type(usuario).objects.filter(pk=usuario.pk).values(*estadisticas.DIMENSIONES).first()
+
+@receiver(pre_save, sender='usuario.Usuario')
+def recordar_estadisticas_usuario(sender, instance, update_fields=None, **kwargs):
+    instance._estadisticas_anteriores = None
+    if instance.pk is not None and (update_fields is None or set(update_fields) & set(estadisticas.DIMENSIONES)):
+        instance._estadisticas_anteriores = _valores_usuario(instance)
+
+@receiver(post_save, sender='usuario.Usuario')
+def contar_usuario(sender, instance, created, update_fields=None, **kwargs):
+    anteriores = getattr(instance, '_estadisticas_anteriores', None)
+    actuales = {campo: getattr(instance, campo) for campo in estadisticas.DIMENSIONES}
+    if created:
+        estadisticas.sumar_usuarios([actuales])
+    elif anteriores:
+        if update_fields is not None:
+            # Los campos que no se guardaron siguen como estaban en la base.
+            actuales = {campo: actuales[campo] if campo in update_fields else anteriores[campo] for campo in actuales}
+        estadisticas.cambiar_usuario(anteriores, actuales)
+
+@receiver(pre_delete, sender='usuario.Usuario')
+def descontar_usuario(sender, instance, **kwargs):
+    # En pre_delete: todavía existen sus intereses.
+    valores = _valores_usuario(instance)
+    if valores:
+        estadisticas.quitar_usuario(instance.id, valores)
@@ -1,3 +1,338 @@
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from usuario.credenciales import generar_token
+from usuario.models import Usuario
+
+from . import estadisticas, imagenes
+from .models import (
+    Asistencia, BajaAsistencia, Encuesta, EstadisticaDistribucion, EstadisticaGlobal, EstadisticaReunion,
+    RespuestaEncuesta, Reunion, TrabajoHojaEtiquetas, TrabajoImpresion,
+)
+
+
+class RegistrarAsistenciaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.usuario = Usuario.objects.create_user(email='ana@prueba.cl', nombre='Ana', apellido='Rojas', rut='1-9')
+
+    def _cantidad(self):
+        return Usuario.objects.get(id=self.usuario.id).cantidad_asistencias
+
+    def test_registrar_es_idempotente(self):
+        self.assertTrue(Asistencia.objects.registrar(self.reunion.id, self.usuario.id))
+        self.assertFalse(Asistencia.objects.registrar(self.reunion.id, self.usuario.id))
+        self.assertEqual(Asistencia.objects.filter(reunion=self.reunion, usuario=self.usuario).count(), 1)
+        self.assertEqual(self._cantidad(), 1)
+
+    def test_quitar(self):
+        Asistencia.objects.registrar(self.reunion.id, self.usuario.id)
+        self.assertTrue(Asistencia.objects.quitar(self.reunion.id, self.usuario.id))
+        self.assertFalse(Asistencia.objects.quitar(self.reunion.id, self.usuario.id))
+        self.assertEqual(self._cantidad(), 0)
+        self.assertEqual(BajaAsistencia.objects.filter(reunion=self.reunion, usuario=self.usuario).count(), 1)
+
+    def test_endpoint_qr(self):
+        totem = Usuario.objects.create_user(email='totem@prueba.cl', nombre='Tótem', apellido='1', rut='2-7', es_totem=True)
+        sesion = self.client.session
+        sesion['usuario_id'] = totem.id
+        sesion.save()
+        url = reverse('panel-admin:marcar_asistencia_qr', args=[self.reunion.id, self.usuario.id])
+
+        respuesta = self.client.post(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['asistente']['nombre'], 'Ana')
+        self.assertEqual(self.client.post(url).status_code, 409)
+        self.assertEqual(self._cantidad(), 1)
+
+
+class LoteAsistenciaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.usuarios = [
+            Usuario.objects.create_user(email=f'u{i}@prueba.cl', nombre=f'Nombre{i}', apellido='Lote', rut=f'{i}-k')
+            for i in range(3)
+        ]
+
+    def _cantidades(self):
+        return list(Usuario.objects.filter(id__in=[u.id for u in self.usuarios]).order_by('id').values_list('cantidad_asistencias', flat=True))
+
+    def test_registrar_lote(self):
+        primero, segundo, tercero = self.usuarios
+        Asistencia.objects.registrar(self.reunion.id, primero.id)
+        nuevos, duplicados, desconocidos = Asistencia.objects.registrar_lote(
+            self.reunion.id, {primero.id: None, segundo.id: None, tercero.id: timezone.now(), 999999: None}
+        )
+        self.assertEqual(nuevos, {segundo.id, tercero.id})
+        self.assertEqual(duplicados, {primero.id})
+        self.assertEqual(desconocidos, {999999})
+        self.assertEqual(self._cantidades(), [1, 1, 1])
+        self.assertIsNotNone(Asistencia.objects.get(reunion=self.reunion, usuario=tercero).escaneado_en)
+
+        # Repetir el lote no inserta ni cuenta nada.
+        nuevos, duplicados, _ = Asistencia.objects.registrar_lote(self.reunion.id, {segundo.id: None, tercero.id: None})
+        self.assertEqual((nuevos, duplicados), (set(), {segundo.id, tercero.id}))
+        self.assertEqual(Asistencia.objects.filter(reunion=self.reunion).count(), 3)
+
+    def test_endpoint_devuelve_el_estado_de_cada_item(self):
+        totem = Usuario.objects.create_user(email='totem@prueba.cl', nombre='Tótem', apellido='1', rut='2-7', es_totem=True)
+        sesion = self.client.session
+        sesion['usuario_id'] = totem.id
+        sesion.save()
+        primero, segundo, _ = self.usuarios
+        Asistencia.objects.registrar(self.reunion.id, primero.id)
+
+        respuesta = self.client.post(
+            reverse('panel-admin:marcar_asistencia_lote', args=[self.reunion.id]),
+            json.dumps({'escaneos': [
+                {'usuario_id': primero.id, 'idempotency_key': 'a'},
+                {'usuario_id': segundo.id, 'idempotency_key': 'b', 'scanned_at': '2024-05-01T10:00:00'},
+                {'usuario_id': segundo.id, 'idempotency_key': 'c'},
+                {'usuario_id': 999999, 'idempotency_key': 'd'},
+                {'usuario_id': 'x', 'idempotency_key': 'e'},
+            ]}),
+            content_type='application/json',
+        )
+        estados = {item['idempotency_key']: item['estado'] for item in respuesta.json()['resultados']}
+        self.assertEqual(estados, {
+            'a': 'duplicado', 'b': 'nuevo', 'c': 'duplicado', 'd': 'usuario_desconocido', 'e': 'invalido',
+        })
+        self.assertEqual(self._cantidades(), [1, 1, 0])
+
+
+class AsistenciaCredencialTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.usuario = Usuario.objects.create_user(email='ana@prueba.cl', nombre='Ana', apellido='Rojas', rut='1-9')
+        totem = Usuario.objects.create_user(email='totem@prueba.cl', nombre='Tótem', apellido='1', rut='2-7', es_totem=True)
+        sesion = self.client.session
+        sesion['usuario_id'] = totem.id
+        sesion.save()
+        self.url = reverse('panel-admin:marcar_asistencia_credencial', args=[self.reunion.id])
+
+    def _marcar(self, credencial):
+        return self.client.post(self.url, json.dumps({'credencial': credencial}), content_type='application/json')
+
+    def test_credencial_valida_y_repetida(self):
+        credencial = generar_token(self.usuario.id)
+        self.assertEqual(self._marcar(credencial).status_code, 200)
+        self.assertEqual(self._marcar(credencial).status_code, 409)
+        self.assertEqual(Asistencia.objects.filter(reunion=self.reunion).count(), 1)
+
+    def test_credencial_alterada(self):
+        version, _, emitido_en, firma = generar_token(self.usuario.id).split('g')
+        respuesta = self._marcar(f'{version}g{self.usuario.id + 1:x}g{emitido_en}g{firma}')
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertFalse(Asistencia.objects.exists())
+
+    def test_lote_rechaza_credencial_de_otro_usuario(self):
+        otro = Usuario.objects.create_user(email='beto@prueba.cl', nombre='Beto', apellido='Soto', rut='3-5')
+        respuesta = self.client.post(
+            reverse('panel-admin:marcar_asistencia_lote', args=[self.reunion.id]),
+            json.dumps({'escaneos': [
+                {'usuario_id': self.usuario.id, 'credencial': generar_token(self.usuario.id), 'idempotency_key': 'a'},
+                {'usuario_id': otro.id, 'credencial': generar_token(self.usuario.id), 'idempotency_key': 'b'},
+            ]}),
+            content_type='application/json',
+        )
+        estados = {item['idempotency_key']: item['estado'] for item in respuesta.json()['resultados']}
+        self.assertEqual(estados, {'a': 'nuevo', 'b': 'credencial_invalida'})
+
+
+class ColaImpresionTests(TestCase):
+    def setUp(self):
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.usuarios = [
+            Usuario.objects.create_user(email=f'u{i}@prueba.cl', nombre=f'Nombre{i}', apellido='Etiqueta', rut=f'{i}-k')
+            for i in range(3)
+        ]
+
+    def test_en_orden_y_una_sola_vez(self):
+        TrabajoImpresion.objects.encolar(self.reunion.id, [u.id for u in self.usuarios])
+        tomados = [TrabajoImpresion.objects.tomar_siguiente() for _ in range(3)]
+        self.assertEqual([t.usuario_id for t in tomados], [u.id for u in self.usuarios])
+        self.assertIsNone(TrabajoImpresion.objects.tomar_siguiente())
+        self.assertEqual(set(TrabajoImpresion.objects.values_list('estado', 'intentos')), {('imprimiendo', 1)})
+
+    def test_libera_abandonados(self):
+        TrabajoImpresion.objects.encolar(self.reunion.id, [u.id for u in self.usuarios[:2]])
+        abandonado = TrabajoImpresion.objects.tomar_siguiente()
+        TrabajoImpresion.objects.filter(id=abandonado.id).update(fecha_inicio=timezone.now() - timedelta(minutes=10))
+        en_curso = TrabajoImpresion.objects.tomar_siguiente()
+        self.assertEqual(TrabajoImpresion.objects.liberar_abandonados(timedelta(minutes=5)), 1)
+        self.assertEqual(TrabajoImpresion.objects.tomar_siguiente().id, abandonado.id)
+        self.assertEqual(TrabajoImpresion.objects.get(id=en_curso.id).estado, 'imprimiendo')
+
+
+class ColaImagenesTests(TestCase):
+    def test_una_sola_vez_y_liberar(self):
+        reuniones = [
+            Reunion.objects.create(detalle=f'Reunión {i}', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+            for i in range(2)
+        ]
+        Reunion.objects.filter(id__in=[r.id for r in reuniones]).update(imagen_estado='pendiente')
+        primera = imagenes.tomar_siguiente_reunion()
+        segunda = imagenes.tomar_siguiente_reunion()
+        self.assertEqual([primera.id, segunda.id], [r.id for r in reuniones])
+        self.assertIsNone(imagenes.tomar_siguiente_reunion())
+
+        Reunion.objects.filter(id=primera.id).update(imagen_tomada_en=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(imagenes.liberar_abandonadas(timedelta(minutes=5)), 1)
+        self.assertEqual(imagenes.tomar_siguiente_reunion().id, primera.id)
+
+
+class HojaEtiquetasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = self.settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.reunion.interesados.add(*[
+            Usuario.objects.create_user(email=f'u{i}@prueba.cl', nombre=f'Nombre{i}', apellido='Hoja', rut=f'{i}-k')
+            for i in range(3)
+        ])
+        admin = Usuario.objects.create_user(email='admin@prueba.cl', nombre='Admin', apellido='Panel', rut='1-9', es_admin=True)
+        sesion = self.client.session
+        sesion['usuario_id'] = admin.id
+        sesion.save()
+        self.url = reverse('panel-admin:hoja_etiquetas', args=[self.reunion.id])
+
+    def test_la_genera_el_worker(self):
+        self.assertIsNone(self.client.get(self.url).json()['estado'])
+        self.assertEqual(self.client.post(self.url).json()['estado'], 'generando')
+        self.assertEqual(self.client.post(self.url).json()['estado'], 'generando')
+        self.assertEqual(TrabajoHojaEtiquetas.objects.get().estado, 'pendiente')
+
+        call_command('procesar_hojas_etiquetas', una_vez=True, stdout=StringIO())
+        trabajo = TrabajoHojaEtiquetas.objects.get()
+        self.assertEqual(trabajo.estado, 'listo')
+        datos = self.client.get(self.url).json()
+        self.assertEqual(datos['estado'], 'listo')
+        with default_storage.open(trabajo.ruta) as archivo:
+            self.assertIn('Nombre2', archivo.read().decode())
+
+    def test_error_vuelve_a_la_cola_al_pedirla(self):
+        self.client.post(self.url)
+        TrabajoHojaEtiquetas.objects.update(estado='error', error='sin espacio')
+        self.assertEqual(self.client.get(self.url).json()['estado'], 'error: sin espacio')
+        self.assertEqual(self.client.post(self.url).json()['estado'], 'generando')
+        self.assertEqual(TrabajoHojaEtiquetas.objects.get().estado, 'pendiente')
+
+
+class NovedadesAsistenciaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reunion = Reunion.objects.create(detalle='Reunión', descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+        self.usuario = Usuario.objects.create_user(email='ana@prueba.cl', nombre='Ana', apellido='Rojas', rut='1-9')
+        totem = Usuario.objects.create_user(email='totem@prueba.cl', nombre='Tótem', apellido='1', rut='2-7', es_totem=True)
+        sesion = self.client.session
+        sesion['usuario_id'] = totem.id
+        sesion.save()
+        self.url = reverse('panel-admin:novedades_asistencia', args=[self.reunion.id])
+
+    def test_altas_y_bajas_desde_el_cursor(self):
+        cursor = self.client.get(self.url).json()['cursor']
+        Asistencia.objects.registrar(self.reunion.id, self.usuario.id)
+        datos = self.client.get(self.url, {'desde': cursor}).json()
+        self.assertEqual([a['id'] for a in datos['altas']], [self.usuario.id])
+        self.assertGreater(int(datos['cursor']), int(cursor))
+
+        Asistencia.objects.quitar(self.reunion.id, self.usuario.id)
+        datos = self.client.get(self.url, {'desde': datos['cursor']}).json()
+        self.assertEqual((datos['altas'], datos['bajas']), ([], [self.usuario.id]))
+
+
+class EstadisticasTests(TestCase):
+    """Los rollups mantenidos por las señales deben coincidir con `reconstruir()`."""
+
+    def setUp(self):
+        cache.clear()
+        rubros = ['estudiante', 'docente', None]
+        self.usuarios = [
+            Usuario.objects.create_user(
+                email=f'u{i}@prueba.cl', nombre=f'Nombre{i}', apellido='Estadística', rut=f'{i}-k',
+                rubro=rubros[i % 3], sede='Arica', carrera='otro',
+            ) for i in range(8)
+        ]
+        self.r1, self.r2 = [
+            Reunion.objects.create(detalle=detalle, descripcion='Prueba', fecha=timezone.now(), ubicacion='Sala 1')
+            for detalle in ('R1', 'R2')
+        ]
+
+    def _estado(self):
+        return (
+            dict(EstadisticaGlobal.objects.values_list('clave', 'valor')),
+            sorted(EstadisticaReunion.objects.values_list('reunion_id', 'interesados', 'respuestas', 'suma_puntuaciones')),
+            sorted(EstadisticaDistribucion.objects.filter(cantidad__gt=0).values_list('ambito', 'dimension', 'valor', 'cantidad')),
+        )
+
+    def assertCuadra(self):
+        mantenido = self._estado()
+        estadisticas.reconstruir()
+        self.assertEqual(mantenido, self._estado())
+
+    def test_rollups(self):
+        usuarios, r1, r2 = self.usuarios, self.r1, self.r2
+        self.assertCuadra()
+
+        r1.interesados.add(*usuarios[:4])
+        usuarios[5].reuniones_interesado.add(r1, r2)
+        r1.interesados.remove(usuarios[0], usuarios[7]) # usuarios[7] no estaba interesado
+        usuarios[5].reuniones_interesado.remove(r2)
+        self.assertCuadra()
+        usuarios[5].reuniones_interesado.clear()
+        r2.interesados.add(usuarios[2])
+        r2.interesados.clear()
+        self.assertCuadra()
+
+        encuesta = Encuesta.objects.create(reunion=r1)
+        respuestas = [
+            RespuestaEncuesta.objects.create(encuesta=encuesta, usuario=usuarios[i], puntuacion=1 + i) for i in range(4)
+        ]
+        respuestas[0].puntuacion = 5
+        respuestas[0].save()
+        respuestas[1].delete()
+        self.assertCuadra()
+
+        usuario = Usuario.objects.get(id=usuarios[3].id)
+        usuario.rubro = 'docente'
+        usuario.sede = 'Iquique'
+        usuario.save()
+        self.assertCuadra()
+
+        usuarios[4].delete()
+        r2.delete()
+        self.assertCuadra()
+        self.assertEqual(estadisticas.totales()[estadisticas.USUARIOS], 7)
+
+    def test_asistencias_se_cuentan_al_leer(self):
+        usuarios, r1, r2 = self.usuarios, self.r1, self.r2
+        with CaptureQueriesContext(connection) as consultas:
+            Asistencia.objects.registrar(r1.id, usuarios[0].id)
+            Asistencia.objects.registrar_lote(r1.id, {u.id: None for u in usuarios[:5]})
+            Asistencia.objects.registrar_lote(r2.id, {u.id: None for u in usuarios[3:]})
+            Asistencia.objects.quitar(r1.id, usuarios[1].id)
+        # El check-in no escribe en las tablas de rollups que comparten todas las estaciones.
+        self.assertFalse([c['sql'] for c in consultas.captured_queries if 'paneladm_estadistica' in c['sql']])
 
-# Create your tests here.
+        self.assertEqual(estadisticas.asistencias_totales(), 9)
+        self.assertEqual(estadisticas.asistentes_por_reunion([r1.id, r2.id]), {r1.id: 4, r2.id: 5})
+        self.assertEqual(estadisticas.distribucion_asistentes(r1.id, 'rubro'), [('estudiante', 2), ('docente', 1)])
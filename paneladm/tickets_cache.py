@@ -0,0 +1,27 @@
+"""
+Contador de tickets de soporte abiertos para la insignia del panel.
+
+Se mantiene en la caché con las señales de `SoporteTicket` (creación, cambio
+de estado y borrado). Si la clave no existe, se recalcula con un COUNT; la
+duración acotada corrige cualquier desvío (p. ej. un `update()` masivo).
+"""
+from django.core.cache import cache
+
+CLAVE = 'tickets_abiertos'
+DURACION = 60 * 60 * 6
+
+
+def contar():
+    total = cache.get(CLAVE)
+    if total is None:
+        from .models import SoporteTicket
+        total = SoporteTicket.objects.filter(estado='abierto').count()
+        cache.set(CLAVE, total, DURACION)
+    return total
+
+
+def ajustar(delta):
+    try:
+        cache.incr(CLAVE, delta)
+    except ValueError:
+        pass # Sin valor en caché: se recalcula en la próxima lectura
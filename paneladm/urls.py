@@ -17,9 +17,16 @@ urlpatterns = [
     path('reuniones/eliminar/<int:reunion_id>/', views.eliminar_reunion, name='eliminar_reunion'),
     path('asistencia/', views.control_asistencia, name='control_asistencia'),
     path('reuniones/<int:reunion_id>/asistencia/', views.registrar_asistencia, name='registrar_asistencia'),
+    path('reuniones/<int:reunion_id>/asistencia/novedades/', views.novedades_asistencia, name='novedades_asistencia'),
+    path('reuniones/<int:reunion_id>/buscar-no-asistentes/', views.buscar_no_asistentes, name='buscar_no_asistentes'),
     path('reuniones/<int:reunion_id>/quitar-asistencia/<int:usuario_id>/', views.quitar_asistencia, name='quitar_asistencia'),
     path('reuniones/<int:reunion_id>/marcar-asistencia/<int:usuario_id>/', views.marcar_asistencia_qr, name='marcar_asistencia_qr'),
+    path('reuniones/<int:reunion_id>/marcar-asistencia-credencial/', views.marcar_asistencia_credencial, name='marcar_asistencia_credencial'),
+    path('reuniones/<int:reunion_id>/marcar-asistencia-lote/', views.marcar_asistencia_lote, name='marcar_asistencia_lote'),
+    path('reuniones/<int:reunion_id>/padron/', views.padron_reunion, name='padron_reunion'),
+    path('impresion/cola/', views.estado_cola_impresion, name='estado_cola_impresion'),
     path('interesados/', views.gestion_interesados, name='gestion_interesados'),
+    path('interesados/<int:reunion_id>/hoja-etiquetas/', views.hoja_etiquetas, name='hoja_etiquetas'),
     path('encuestas/', views.gestion_encuestas, name='gestion_encuestas'),
     path('encuestas/<int:encuesta_id>/respuestas/', views.ver_respuestas_encuesta, name='ver_respuestas_encuesta'),
     path('encuestas/eliminar/<int:encuesta_id>/', views.eliminar_encuesta, name='eliminar_encuesta'),
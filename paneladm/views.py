@@ -1,18 +1,29 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from usuario.models import Usuario, RUBRO_CHOICES, SEDE_CHOICES, CARRERA_CHOICES
 from usuario.forms import AdminUsuarioForm, AyudanteUsuarioForm
-from .models import Reunion, Encuesta, RespuestaEncuesta, SoporteTicket, TicketRespuesta, GanadorSorteo
+from usuario import avatares, busqueda, versiones
+from usuario.credenciales import LARGO_HUELLA, huella, verificar_token
+from usuario.middleware import usuario_actual_o_404
+from .models import Reunion, Asistencia, BajaAsistencia, BajaUsuario, TrabajoImpresion, Encuesta, RespuestaEncuesta, SoporteTicket, TicketRespuesta, GanadorSorteo, EstadisticaReunion
+from . import asistencia_cache, estadisticas, etiquetas, impresion
 from .forms import ReunionForm, EncuestaForm, SoporteTicketAdminForm, TicketRespuestaForm
 from django.urls import reverse
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, F, Count, Avg, Sum
+from django.http import JsonResponse, HttpResponse, Http404
+from django.db.models import Q, F, Count, Avg, Sum, Max, Exists, OuterRef
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import openpyxl
 from openpyxl.styles import Font
 import json
+import hashlib
+from datetime import datetime, timedelta
 
 from django.contrib.auth.hashers import check_password
+from django.conf import settings
+from django.db import IntegrityError
 
 def _flatten_choices(choices):
     """
@@ -35,13 +46,12 @@ def admin_required(view_func):
         if not usuario_id:
             return redirect('login')
 
-        try:
-            usuario_actual = Usuario.objects.get(id=usuario_id)
-            # Ahora, ni admin ni ayudante pueden acceder a vistas solo para superadmin (si las hubiera)
-            if not usuario_actual.es_admin and not usuario_actual.es_ayudante:
-                return redirect('inicio')
-        except Usuario.DoesNotExist:
+        # Los roles vienen de la caché del middleware; la fila se carga solo si la vista la usa.
+        if not request.usuario_info:
             return redirect('login')
+        # Ahora, ni admin ni ayudante pueden acceder a vistas solo para superadmin (si las hubiera)
+        if not request.user_is_admin and not request.user_is_ayudante:
+            return redirect('inicio')
         return view_func(request, *args, **kwargs)
     return wrapper
     
@@ -53,8 +63,9 @@ def solo_admin_required(view_func):
         usuario_id = request.session.get('usuario_id')
         if not usuario_id:
             return redirect('login')
-        usuario_actual = get_object_or_404(Usuario, id=usuario_id)
-        if not usuario_actual.es_admin:
+        if not request.usuario_info:
+            raise Http404
+        if not request.user_is_admin:
             messages.error(request, "No tienes permiso para realizar esta acción.")
             return redirect('panel-admin:panel_admin') # Redirige al panel principal si no es admin
         return view_func(request, *args, **kwargs)
@@ -68,8 +79,9 @@ def totem_required(view_func):
         usuario_id = request.session.get('usuario_id')
         if not usuario_id:
             return redirect('login')
-        usuario_actual = get_object_or_404(Usuario, id=usuario_id)
-        if not usuario_actual.es_totem:
+        if not request.usuario_info:
+            raise Http404
+        if not request.user_is_totem:
             messages.error(request, "Esta sección es solo para terminales de tipo Tótem.")
             return redirect('inicio')
         return view_func(request, *args, **kwargs)
@@ -84,112 +96,131 @@ def privileged_user_required(view_func):
         usuario_id = request.session.get('usuario_id')
         if not usuario_id:
             return redirect('login')
-        try:
-            usuario_actual = Usuario.objects.get(id=usuario_id)
-            if not (usuario_actual.es_admin or usuario_actual.es_ayudante or usuario_actual.es_totem):
-                return JsonResponse({'status': 'error', 'message': 'Permiso denegado.'}, status=403)
-        except Usuario.DoesNotExist:
+        if not request.usuario_info:
             return JsonResponse({'status': 'error', 'message': 'Usuario no encontrado.'}, status=403)
+        if not (request.user_is_admin or request.user_is_ayudante or request.user_is_totem):
+            return JsonResponse({'status': 'error', 'message': 'Permiso denegado.'}, status=403)
         return view_func(request, *args, **kwargs)
     return wrapper
 
+USUARIOS_POR_PAGINA = 50
+MAX_USUARIOS_POR_PAGINA = 200
+BUSQUEDA_USUARIOS_CACHE_TTL = 30 # Segundos; acota lo que tarda en verse un cambio que no pasa por save()
+CAMPOS_FILA_USUARIO = (
+    'id', 'nombre', 'apellido', 'email', 'rut', 'rubro', 'rubro_otro', 'sede', 'sede_otro',
+    'carrera', 'carrera_otro', 'telefono', 'cantidad_asistencias', 'es_admin', 'foto',
+)
+ETIQUETAS_RUBRO = _flatten_choices(RUBRO_CHOICES)
+ETIQUETAS_SEDE = _flatten_choices(SEDE_CHOICES)
+ETIQUETAS_CARRERA = _flatten_choices(CARRERA_CHOICES)
+
+
+def _usuarios_filtrados(q='', rubro='', sede='', carrera=''):
+    """Usuarios de la gestión de usuarios, en un orden estable para paginar por desplazamiento."""
+    usuarios = Usuario.objects.all().order_by('nombre', 'apellido', 'id')
+    if busqueda.normalizar(q):
+        usuarios = busqueda.buscar(usuarios, q, incluir_email=True)
+    if rubro:
+        usuarios = usuarios.filter(rubro=rubro)
+    if sede:
+        usuarios = usuarios.filter(sede=sede)
+    if carrera:
+        usuarios = usuarios.filter(carrera=carrera)
+    return usuarios
+
+
+def _etiqueta(etiquetas, valor, otro, otro_por_defecto):
+    """Como `Usuario.get_*_real_display`, pero sobre los valores de un `values()`."""
+    if valor == 'otro':
+        return otro or otro_por_defecto
+    return etiquetas.get(valor, valor or '')
+
+
+def _fila_usuario(u):
+    return {
+        'id': u['id'],
+        'nombre': u['nombre'],
+        'apellido': u['apellido'],
+        'email': u['email'],
+        'rut': u['rut'],
+        'rubro': _etiqueta(ETIQUETAS_RUBRO, u['rubro'], u['rubro_otro'], 'Otro'),
+        'sede': _etiqueta(ETIQUETAS_SEDE, u['sede'], u['sede_otro'], 'Otra Sede'),
+        'carrera': _etiqueta(ETIQUETAS_CARRERA, u['carrera'], u['carrera_otro'], 'Otra Carrera'),
+        'telefono': u['telefono'] or '',
+        'cantidad_asistencias': u['cantidad_asistencias'],
+        'es_admin': u['es_admin'],
+        'foto_url': avatares.url(u['foto'], 48) or '/static/img/persn.jpg',
+    }
+
+
 @admin_required
 def gestion_usuarios(request):
-    usuario_actual = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario_actual = usuario_actual_o_404(request)
     # La búsqueda y el filtrado ahora se manejan exclusivamente por AJAX.
-    # Esta vista solo carga la página inicial con todos los usuarios.
+    # Esta vista solo carga la primera página con los filtros de la URL.
     
     query = request.GET.get('q', '')
     rubro_filter = request.GET.get('rubro', '')
     sede_filter = request.GET.get('sede', '')
     carrera_filter = request.GET.get('carrera', '')
 
-    usuarios = Usuario.objects.all().order_by('nombre', 'apellido')
-
-    if query:
-        usuarios = usuarios.filter(
-            Q(nombre__icontains=query) |
-            Q(apellido__icontains=query) |
-            Q(email__icontains=query) |
-            Q(rut__icontains=query) |
-            Q(sede__icontains=query) |
-            Q(sede_otro__icontains=query) |
-            Q(carrera__icontains=query) |
-            Q(carrera_otro__icontains=query)
-        )
-    
-    if rubro_filter:
-        usuarios = usuarios.filter(rubro=rubro_filter)
-    if sede_filter:
-        usuarios = usuarios.filter(sede=sede_filter)
-    if carrera_filter:
-        usuarios = usuarios.filter(carrera=carrera_filter)
+    usuarios = _usuarios_filtrados(query, rubro_filter, sede_filter, carrera_filter)
+    total_usuarios = usuarios.count()
 
     return render(request, 'panel_admin_usuarios.html', {
-        'usuarios': usuarios, 
+        'usuarios': usuarios[:USUARIOS_POR_PAGINA],
+        'total_usuarios': total_usuarios,
+        'siguiente': USUARIOS_POR_PAGINA if total_usuarios > USUARIOS_POR_PAGINA else None,
         'query': query, 
         'rubro_filter': rubro_filter, 
         'sede_filter': sede_filter,
         'carrera_filter': carrera_filter,
         'usuario_actual': usuario_actual,
         # Aplanamos las listas para simplificar la lógica en la plantilla
-        'flat_sede_choices': _flatten_choices(SEDE_CHOICES),
-        'flat_rubro_choices': _flatten_choices(RUBRO_CHOICES),
-        'flat_carrera_choices': _flatten_choices(CARRERA_CHOICES),
+        'flat_sede_choices': ETIQUETAS_SEDE,
+        'flat_rubro_choices': ETIQUETAS_RUBRO,
+        'flat_carrera_choices': ETIQUETAS_CARRERA,
     })
 
 @admin_required
 def buscar_usuarios_ajax(request):
     """
-    Vista para manejar las peticiones AJAX de búsqueda de usuarios.
+    Búsqueda AJAX de la gestión de usuarios, paginada con `desde` y `limite`.
+    Devuelve solo las columnas de la tabla y el total. Cada respuesta se cachea
+    unos segundos con los filtros normalizados y la versión de los usuarios.
     """
-    query = request.GET.get('q', '')
-    rubro_filter = request.GET.get('rubro', '')
-    sede_filter = request.GET.get('sede', '')
-    carrera_filter = request.GET.get('carrera', '')
-
-    usuarios = Usuario.objects.all().order_by('nombre', 'apellido')
-
-    if query:
-        usuarios = usuarios.filter(
-            Q(nombre__icontains=query) |
-            Q(apellido__icontains=query) | 
-            Q(email__icontains=query) | 
-            Q(rut__icontains=query) |
-            Q(sede__icontains=query) |
-            Q(sede_otro__icontains=query) |
-            Q(carrera__icontains=query) |
-            Q(carrera_otro__icontains=query) 
-        )
-    
-    if rubro_filter:
-        usuarios = usuarios.filter(rubro=rubro_filter)
-    if sede_filter:
-        usuarios = usuarios.filter(sede=sede_filter)
-    if carrera_filter:
-        usuarios = usuarios.filter(carrera=carrera_filter)
-
-    # Preparamos los datos para la respuesta JSON
-    data = [{
-        'id': u.id,
-        'nombre': u.nombre,
-        'apellido': u.apellido,
-        'email': u.email,
-        'rut': u.rut,
-        'rubro': u.get_rubro_real_display,
-        'sede': u.get_sede_real_display or '', # Corregido para usar el display real
-        'carrera': u.get_carrera_real_display or '',
-        'telefono': u.telefono or '',
-        'cantidad_asistencias': u.cantidad_asistencias,
-        'es_admin': u.es_admin,
-        'foto_url': u.foto.url if u.foto else '/static/img/persn.jpg'
-    } for u in usuarios]
-
-    return JsonResponse({'usuarios': data})
+    try:
+        desde = max(int(request.GET.get('desde', 0)), 0)
+        limite = min(max(int(request.GET.get('limite', USUARIOS_POR_PAGINA)), 1), MAX_USUARIOS_POR_PAGINA)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Parámetros de paginación inválidos.'}, status=400)
+
+    filtros = {
+        'q': busqueda.normalizar(request.GET.get('q', '')),
+        'rubro': request.GET.get('rubro', ''),
+        'sede': request.GET.get('sede', ''),
+        'carrera': request.GET.get('carrera', ''),
+    }
+    version = versiones.obtener(versiones.USUARIO)[versiones.USUARIO]
+    huella = hashlib.sha1(json.dumps([filtros, desde, limite], sort_keys=True).encode()).hexdigest()
+    clave = f'buscar_usuarios:{version}:{huella}'
+
+    data = cache.get(clave)
+    if data is None:
+        usuarios = _usuarios_filtrados(**filtros)
+        total = usuarios.count()
+        filas = usuarios.values(*CAMPOS_FILA_USUARIO)[desde:desde + limite]
+        data = {
+            'usuarios': [_fila_usuario(u) for u in filas],
+            'total': total,
+            'siguiente': desde + limite if desde + limite < total else None,
+        }
+        cache.set(clave, data, BUSQUEDA_USUARIOS_CACHE_TTL)
+    return JsonResponse(data)
 
 @admin_required
 def editar_usuario_admin(request, usuario_id):
-    usuario_actual = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario_actual = usuario_actual_o_404(request)
     usuario_a_editar = get_object_or_404(Usuario, id=usuario_id)
 
     # Determinar qué formulario usar según el rol del usuario actual
@@ -305,13 +336,12 @@ def registrar_asistencia(request, reunion_id):
         if usuario_id:
             usuario_a_agregar = get_object_or_404(Usuario, id=usuario_id)
             
-            if not reunion.asistentes.filter(id=usuario_a_agregar.id).exists():
-                reunion.asistentes.add(usuario_a_agregar)
-                usuario_a_agregar.cantidad_asistencias = F('cantidad_asistencias') + 1
-                usuario_a_agregar.save()
-                
-                # Si se debe imprimir etiqueta, preparamos la URL para la redirección.
-                if reunion.imprimir_etiqueta_al_asistir:
+            if Asistencia.objects.registrar(reunion.id, usuario_a_agregar.id):
+                print_url, en_cola = _etiqueta_al_asistir(reunion, usuario_a_agregar.id)
+                if en_cola:
+                    messages.success(request, f'Asistencia de {usuario_a_agregar.nombre} registrada. Etiqueta enviada a la impresora.')
+                # Si se debe imprimir etiqueta en el navegador, preparamos la URL para la redirección.
+                elif print_url:
                     redirect_url = f"{reverse('panel-admin:registrar_asistencia', args=[reunion_id])}?print_user={usuario_a_agregar.id}"
                     return redirect(redirect_url)
                 else:
@@ -321,14 +351,52 @@ def registrar_asistencia(request, reunion_id):
 
             return redirect('panel-admin:registrar_asistencia', reunion_id=reunion_id)
 
+    cursor_inicial = _a_cursor(timezone.now()) # Punto de partida del feed de novedades
     asistentes = reunion.asistentes.all().order_by('nombre')
-    # Obtenemos todos los usuarios que no están en la lista de asistentes
-    usuarios_no_asistentes = Usuario.objects.exclude(id__in=asistentes.values_list('id', flat=True)).order_by('nombre')
+    asistencia_cache.precalentar(reunion.id, [a.id for a in asistentes]) # Solo la primera visita escribe en la caché
+    # Los no asistentes ya no se renderizan: el registro manual los busca con `buscar_no_asistentes`.
 
     return render(request, 'panel_admin_asistencia.html', {
         'reunion': reunion,
         'asistentes': asistentes,
-        'usuarios_no_asistentes': usuarios_no_asistentes,
+        'cursor_inicial': cursor_inicial,
+        'intervalo_novedades': INTERVALO_NOVEDADES,
+    })
+
+RESULTADOS_POR_PAGINA_BUSQUEDA = 20
+
+@admin_required # Ayudante puede registrar asistencia
+def buscar_no_asistentes(request, reunion_id):
+    """
+    Endpoint API para el buscador del registro manual. Busca por prefijo de
+    nombre, apellido, RUT o email (consultas que usan índice) entre quienes
+    aún no asisten a la reunión, y devuelve una página de resultados.
+    """
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    terminos = request.GET.get('q', '').split()
+    pagina = request.GET.get('pagina', '1')
+    pagina = int(pagina) if pagina.isdigit() and int(pagina) > 0 else 1
+    if not terminos:
+        return JsonResponse({'usuarios': [], 'hay_mas': False})
+
+    usuarios = Usuario.objects.filter(
+        ~Exists(Asistencia.objects.filter(reunion=reunion, usuario_id=OuterRef('pk')))
+    )
+    # Cada palabra debe coincidir con el inicio de algún campo ("jose per" -> José Pérez).
+    for termino in terminos[:4]:
+        usuarios = usuarios.filter(
+            Q(nombre__istartswith=termino) |
+            Q(apellido__istartswith=termino) |
+            Q(rut__istartswith=termino) |
+            Q(email__istartswith=termino)
+        )
+
+    inicio = (pagina - 1) * RESULTADOS_POR_PAGINA_BUSQUEDA
+    # Pedimos un resultado extra para saber si hay otra página sin hacer un count().
+    filas = list(usuarios.order_by('nombre', 'apellido', 'id').values('id', 'nombre', 'apellido', 'rut')[inicio:inicio + RESULTADOS_POR_PAGINA_BUSQUEDA + 1])
+    return JsonResponse({
+        'usuarios': filas[:RESULTADOS_POR_PAGINA_BUSQUEDA],
+        'hay_mas': len(filas) > RESULTADOS_POR_PAGINA_BUSQUEDA,
     })
 
 @admin_required # Ayudante puede quitar asistencia
@@ -340,49 +408,348 @@ def quitar_asistencia(request, reunion_id, usuario_id):
         reunion = get_object_or_404(Reunion, id=reunion_id)
         usuario_a_quitar = get_object_or_404(Usuario, id=usuario_id)
 
-        if reunion.asistentes.filter(id=usuario_a_quitar.id).exists():
-            reunion.asistentes.remove(usuario_a_quitar)
-            # Decrementamos el contador de asistencias del usuario de forma segura
-            if usuario_a_quitar.cantidad_asistencias > 0:
-                usuario_a_quitar.cantidad_asistencias = F('cantidad_asistencias') - 1
-                usuario_a_quitar.save()
+        # El contador solo se decrementa si la asistencia realmente existía.
+        if Asistencia.objects.quitar(reunion.id, usuario_a_quitar.id):
             messages.success(request, f'Se ha quitado la asistencia de {usuario_a_quitar.nombre}.')
     
     return redirect('panel-admin:registrar_asistencia', reunion_id=reunion_id)
 
+def _etiqueta_al_asistir(reunion, usuario_id):
+    """
+    Etiqueta de un check-in nuevo. Devuelve (print_url, en_cola): con la cola
+    de impresión activa se encola el trabajo y el navegador no imprime nada.
+    """
+    if not reunion.imprimir_etiqueta_al_asistir:
+        return None, False
+    if impresion.cola_activa():
+        TrabajoImpresion.objects.encolar(reunion.id, [usuario_id])
+        return None, True
+    return reverse('imprimir_etiqueta', args=[usuario_id]), False
+
 @privileged_user_required # Admin, Ayudante y Tótem pueden usar el QR para marcar asistencia
 def marcar_asistencia_qr(request, reunion_id, usuario_id):
     """
     Endpoint API para marcar la asistencia de un usuario a un evento.
     """
     if request.method == 'POST':
-        reunion = get_object_or_404(Reunion, id=reunion_id)
-        usuario = get_object_or_404(Usuario, id=usuario_id)
-
-        # Primero, verificamos si el usuario ya es un asistente.
-        if reunion.asistentes.filter(id=usuario.id).exists():
-            # Si ya existe, devolvemos un error y no hacemos nada más.
-            return JsonResponse({'status': 'error', 'message': f'{usuario.nombre} ya se encuentra registrado en este evento.'}, status=409)
-
-        # Si no existe, procedemos a registrarlo.
-        if not reunion.asistentes.filter(id=usuario.id).exists():
-            reunion.asistentes.add(usuario)
-            usuario.cantidad_asistencias = F('cantidad_asistencias') + 1
-            usuario.save()
-
-            # Refrescar el objeto para obtener el valor actualizado de 'cantidad_asistencias'
-            usuario.refresh_from_db()
-
-            print_url = reverse('imprimir_etiqueta', args=[usuario.id]) if reunion.imprimir_etiqueta_al_asistir else None
-            return JsonResponse({
-                'status': 'ok', 
-                'message': f'Asistencia de {usuario.nombre} registrada.',
-                'asistente': { 'id': usuario.id, 'nombre': usuario.nombre, 'apellido': usuario.apellido, 'rubro': usuario.get_rubro_real_display or '', 'foto_url': usuario.foto.url if usuario.foto else '/static/img/persn.jpg' },
-                'print_url': print_url
-            })
-            
+        if not getattr(settings, 'CREDENCIAL_ACEPTAR_SIN_FIRMA', True):
+            return JsonResponse({'status': 'error', 'message': 'Este QR no está firmado. Solicita una credencial nueva.'}, status=403)
+        # Escaneo repetido: la caché lo confirma sin consultar la base de datos.
+        if asistencia_cache.ya_asistio(reunion_id, usuario_id):
+            return JsonResponse({'status': 'error', 'message': 'Este asistente ya se encuentra registrado en este evento.'}, status=409)
+        # Inserción idempotente con los ids tal cual: una reunión o un usuario
+        # inexistente lo rechaza la FK, sin cargar las filas antes.
+        try:
+            if not Asistencia.objects.registrar(reunion_id, usuario_id):
+                return JsonResponse({'status': 'error', 'message': 'Este asistente ya se encuentra registrado en este evento.'}, status=409)
+        except IntegrityError:
+            return JsonResponse({'status': 'error', 'message': 'Reunión o usuario no encontrado.'}, status=404)
+
+        asistente = _datos_asistente(usuario_id)
+        reunion = Reunion.objects.only('id', 'imprimir_etiqueta_al_asistir').get(id=reunion_id)
+        print_url, en_cola = _etiqueta_al_asistir(reunion, usuario_id)
+        return JsonResponse({
+            'status': 'ok',
+            'message': f'Asistencia de {asistente["nombre"]} registrada.',
+            'asistente': asistente,
+            'print_url': print_url,
+            'etiqueta_en_cola': en_cola
+        })
+
     return JsonResponse({'status': 'error', 'message': 'Método no permitido'}, status=405)
 
+@privileged_user_required
+def marcar_asistencia_credencial(request, reunion_id):
+    """
+    Endpoint API para marcar asistencia a partir de la credencial firmada del QR.
+    Los códigos falsos o revocados se rechazan sin consultar la base de datos,
+    y los escaneos repetidos se resuelven sin cargar al usuario.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Método no permitido'}, status=405)
+    try:
+        credencial = json.loads(request.body).get('credencial')
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'status': 'error', 'message': 'Petición inválida'}, status=400)
+
+    usuario_id = verificar_token(credencial)
+    if usuario_id is None:
+        return JsonResponse({'status': 'error', 'message': 'Credencial inválida o revocada.'}, status=403)
+    if asistencia_cache.ya_asistio(reunion_id, usuario_id):
+        return JsonResponse({'status': 'error', 'message': 'Este asistente ya se encuentra registrado en este evento.'}, status=409)
+
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    try:
+        if not Asistencia.objects.registrar(reunion.id, usuario_id):
+            return JsonResponse({'status': 'error', 'message': 'Este asistente ya se encuentra registrado en este evento.'}, status=409)
+    except IntegrityError:
+        return JsonResponse({'status': 'error', 'message': 'Usuario no encontrado.'}, status=404)
+
+    asistente = _datos_padron(Usuario.objects.filter(id=usuario_id), reunion.id)[0]
+    print_url, en_cola = _etiqueta_al_asistir(reunion, usuario_id)
+    return JsonResponse({
+        'status': 'ok',
+        'message': f'Asistencia de {asistente["nombre"]} registrada.',
+        'asistente': asistente,
+        'print_url': print_url,
+        'etiqueta_en_cola': en_cola
+    })
+
+MAX_ESCANEOS_POR_LOTE = 1000
+
+@privileged_user_required
+def marcar_asistencia_lote(request, reunion_id):
+    """
+    Endpoint API para vaciar la cola de escaneos de un tótem o estación.
+    Recibe {"escaneos": [{"usuario_id", "scanned_at", "idempotency_key", "credencial"}, ...]}
+    y devuelve el estado de cada ítem: nuevo, duplicado, usuario_desconocido,
+    credencial_invalida o invalido. La credencial es opcional mientras se acepten QR sin firma.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Método no permitido'}, status=405)
+
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    try:
+        escaneos = json.loads(request.body).get('escaneos')
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'status': 'error', 'message': 'Petición inválida'}, status=400)
+    if not isinstance(escaneos, list):
+        return JsonResponse({'status': 'error', 'message': 'Se esperaba una lista de escaneos.'}, status=400)
+    if len(escaneos) > MAX_ESCANEOS_POR_LOTE:
+        return JsonResponse({'status': 'error', 'message': f'Máximo {MAX_ESCANEOS_POR_LOTE} escaneos por lote.'}, status=400)
+
+    # Normalizamos los ítems; si un usuario aparece varias veces, vale el primer escaneo.
+    aceptar_sin_firma = getattr(settings, 'CREDENCIAL_ACEPTAR_SIN_FIRMA', True)
+    items = []
+    por_usuario = {}
+    for escaneo in escaneos:
+        if not isinstance(escaneo, dict):
+            items.append((None, None, 'invalido'))
+            continue
+        clave = escaneo.get('idempotency_key')
+        try:
+            usuario_id = int(escaneo.get('usuario_id'))
+        except (TypeError, ValueError):
+            items.append((clave, None, 'invalido'))
+            continue
+        credencial = escaneo.get('credencial')
+        if (credencial or not aceptar_sin_firma) and verificar_token(credencial) != usuario_id:
+            items.append((clave, usuario_id, 'credencial_invalida'))
+            continue
+        escaneado_en = parse_datetime(str(escaneo.get('scanned_at') or ''))
+        if escaneado_en and timezone.is_naive(escaneado_en):
+            escaneado_en = timezone.make_aware(escaneado_en)
+        por_usuario.setdefault(usuario_id, escaneado_en)
+        items.append((clave, usuario_id, None))
+
+    nuevos, duplicados, desconocidos = Asistencia.objects.registrar_lote(reunion.id, por_usuario)
+    # El tótem no imprime en el navegador cuando hay cola: las etiquetas de los nuevos se encolan aquí.
+    if nuevos and reunion.imprimir_etiqueta_al_asistir and impresion.cola_activa():
+        TrabajoImpresion.objects.encolar(reunion.id, sorted(nuevos, key=lambda usuario_id: por_usuario[usuario_id] or timezone.now()))
+
+    resultados = []
+    vistos = set()
+    for clave, usuario_id, estado in items:
+        # Los ítems con estado ya fueron rechazados antes de consultar la base de datos.
+        if estado is None:
+            if usuario_id in desconocidos:
+                estado = 'usuario_desconocido'
+            elif usuario_id in nuevos and usuario_id not in vistos:
+                estado = 'nuevo'
+            else:
+                estado = 'duplicado'
+            vistos.add(usuario_id)
+        resultados.append({'idempotency_key': clave, 'usuario_id': usuario_id, 'estado': estado})
+
+    return JsonResponse({
+        'status': 'ok',
+        'nuevos': len(nuevos),
+        'duplicados': len(duplicados),
+        'resultados': resultados,
+    })
+
+# Margen que se resta a la versión del padrón: los deltas se solapan un poco
+# para no perder filas confirmadas tarde; aplicarlos dos veces es inocuo.
+MARGEN_VERSION_PADRON = timedelta(seconds=5)
+
+CAMPOS_ASISTENTE = ('id', 'nombre', 'apellido', 'rubro', 'rubro_otro', 'foto')
+RUBROS = _flatten_choices(RUBRO_CHOICES)
+
+def _formatear_asistente(usuario_id, nombre, apellido, rubro, rubro_otro, foto):
+    return {
+        'id': usuario_id,
+        'nombre': nombre,
+        'apellido': apellido,
+        'rubro': (rubro_otro or 'Otro') if rubro == 'otro' else RUBROS.get(rubro, rubro or ''),
+        'foto_url': avatares.url(foto, 256) or '/static/img/persn.jpg',
+    }
+
+def _datos_asistente(usuario_id):
+    """El `asistente` que muestra el escáner, con una sola consulta de los campos que usa."""
+    return _formatear_asistente(*Usuario.objects.filter(id=usuario_id).values_list(*CAMPOS_ASISTENTE).get())
+
+def _datos_padron(usuarios_qs, reunion_id, con_credencial=False):
+    """
+    Proyecta usuarios al formato compacto del padrón, con los mismos campos
+    del `asistente` que devuelve `marcar_asistencia_qr` más la marca `asistio`.
+    Con `con_credencial`, también la huella de su QR vigente (ver credenciales.huella).
+    """
+    filas = usuarios_qs.annotate(
+        asistio=Exists(Asistencia.objects.filter(reunion_id=reunion_id, usuario_id=OuterRef('pk')))
+    ).values_list(*CAMPOS_ASISTENTE, 'asistio', 'qr_contenido')
+    datos = []
+    for *campos, asistio, qr_contenido in filas:
+        dato = {**_formatear_asistente(*campos), 'asistio': asistio}
+        if con_credencial:
+            dato['credencial'] = huella(qr_contenido, dato['id'])
+        datos.append(dato)
+    return datos
+
+@privileged_user_required
+def padron_reunion(request, reunion_id):
+    """
+    Endpoint API con el padrón de una reunión para validar escaneos en el tótem
+    sin conexión. Sin parámetros devuelve el padrón completo (con ETag); con
+    `?desde=<version>` devuelve solo lo que cambió desde esa versión, incluidos
+    los usuarios eliminados.
+    """
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    ahora = timezone.now()
+    version = int((ahora - MARGEN_VERSION_PADRON).timestamp() * 1000)
+    usuarios = Usuario.objects.order_by('id')
+    desde = request.GET.get('desde', '')
+
+    if desde.isdigit():
+        # --- DELTA ---
+        fecha_desde = datetime.fromtimestamp(int(desde) / 1000, tz=timezone.utc)
+        asistencias = Asistencia.objects.filter(reunion=reunion, fecha_registro__gte=fecha_desde)
+        bajas = BajaAsistencia.objects.filter(reunion=reunion, fecha__gte=fecha_desde).exclude(
+            usuario_id__in=Asistencia.objects.filter(reunion=reunion).values('usuario_id')
+        )
+        return JsonResponse({
+            'version': version,
+            'completo': False,
+            'total_usuarios': usuarios.count(),
+            'usuarios': _datos_padron(usuarios.filter(fecha_actualizacion__gte=fecha_desde), reunion.id, con_credencial=True),
+            'asistencias': list(asistencias.values_list('usuario_id', flat=True)),
+            'bajas': list(set(bajas.values_list('usuario_id', flat=True))),
+            'eliminados': list(set(BajaUsuario.objects.filter(fecha__gte=fecha_desde).values_list('usuario_id', flat=True))),
+        })
+
+    # --- PADRÓN COMPLETO ---
+    # La huella cambia con cualquier alta, baja o edición de usuario o asistencia.
+    huella = (
+        usuarios.aggregate(total=Count('id'), ultima=Max('fecha_actualizacion')),
+        Asistencia.objects.filter(reunion=reunion).aggregate(total=Count('id'), ultima=Max('fecha_registro')),
+        BajaAsistencia.objects.filter(reunion=reunion).aggregate(ultima=Max('id')),
+        BajaUsuario.objects.aggregate(ultima=Max('id')),
+    )
+    etag = '"padron-%s-%s"' % (reunion.id, hashlib.md5(repr(huella).encode()).hexdigest())
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=304)
+    else:
+        datos = _datos_padron(usuarios, reunion.id, con_credencial=True)
+        response = JsonResponse({
+            'version': version,
+            'completo': True,
+            'total_usuarios': len(datos),
+            'usuarios': datos,
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+# --- Feed de novedades de asistencia (short polling) ---
+# El cursor son microsegundos desde 1970 (UTC) de la última novedad entregada.
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+INTERVALO_NOVEDADES = 2 # segundos entre consultas de cada estación
+
+def _a_cursor(fecha):
+    return (fecha - EPOCH) // timedelta(microseconds=1)
+
+def _novedades_asistencia(reunion, cursor):
+    """
+    Altas y bajas de asistencia desde el cursor, releyendo MARGEN_VERSION_PADRON
+    hacia atrás: una fila confirmada después de otra con fecha posterior (dos
+    estaciones a la vez) no se pierde. Las altas son asistencias vigentes y las
+    bajas excluyen a quien volvió a asistir, así que repetirlas es inocuo.
+    Devuelve (nuevo_cursor, altas, bajas) como listas de (usuario_id, fecha).
+    """
+    fecha = EPOCH + timedelta(microseconds=cursor) - MARGEN_VERSION_PADRON
+    asistencias = Asistencia.objects.filter(reunion=reunion)
+    altas = list(asistencias.filter(fecha_registro__gt=fecha).values_list('usuario_id', 'fecha_registro'))
+    bajas = list(BajaAsistencia.objects.filter(reunion=reunion, fecha__gt=fecha).exclude(
+        usuario_id__in=asistencias.values('usuario_id')
+    ).values_list('usuario_id', 'fecha'))
+    nuevo_cursor = max([cursor] + [_a_cursor(f) for _, f in altas + bajas])
+    return nuevo_cursor, altas, bajas
+
+def _datos_novedades(reunion, altas, bajas):
+    datos_altas = _datos_padron(Usuario.objects.filter(id__in=[u for u, _ in altas]), reunion.id) if altas else []
+    return {'altas': datos_altas, 'bajas': sorted({u for u, _ in bajas})}
+
+@privileged_user_required # Admin, ayudante y tótem: todas las estaciones del evento
+def novedades_asistencia(request, reunion_id):
+    """
+    Feed de altas y bajas de asistencia para mantener sincronizadas varias
+    estaciones. Cada petición lee una vez desde `?desde=<cursor>` y responde al
+    instante con el cursor nuevo; la estación vuelve a consultar cada
+    `intervalo` segundos. Sin esperas en el servidor: un flujo SSE o un
+    long-poll retendría un worker síncrono durante toda la conexión.
+    Las respuestas pueden repetir novedades ya entregadas: el cliente las deduplica.
+    """
+    reunion = get_object_or_404(Reunion.objects.only('id'), id=reunion_id)
+    desde = request.GET.get('desde', '')
+    cursor = int(desde) if desde.isdigit() else _a_cursor(timezone.now())
+    cursor, altas, bajas = _novedades_asistencia(reunion, cursor)
+    return JsonResponse({
+        'cursor': str(cursor),
+        'intervalo': INTERVALO_NOVEDADES,
+        **_datos_novedades(reunion, altas, bajas),
+    })
+
+def _milisegundos(desde, hasta):
+    return round((hasta - desde).total_seconds() * 1000) if desde and hasta else None
+
+@admin_required # Ayudante puede revisar la cola de impresión
+def estado_cola_impresion(request):
+    """
+    Endpoint API con la profundidad de la cola de etiquetas y los tiempos de
+    los últimos trabajos (espera en cola e impresión). Acepta `?reunion=<id>`.
+    """
+    trabajos = TrabajoImpresion.objects.all()
+    if request.GET.get('reunion', '').isdigit():
+        trabajos = trabajos.filter(reunion_id=int(request.GET['reunion']))
+
+    por_estado = dict(trabajos.values_list('estado').annotate(total=Count('id')).order_by())
+    ahora = timezone.now()
+    pendiente_mas_antiguo = trabajos.filter(estado='pendiente').order_by('fecha_creacion').values_list('fecha_creacion', flat=True).first()
+
+    recientes = []
+    for trabajo in trabajos.select_related('usuario').order_by('-fecha_creacion', '-id')[:20]:
+        recientes.append({
+            'id': trabajo.id,
+            'usuario': f'{trabajo.usuario.nombre} {trabajo.usuario.apellido}',
+            'estado': trabajo.estado,
+            'intentos': trabajo.intentos,
+            'creado': trabajo.fecha_creacion.isoformat(),
+            'espera_ms': _milisegundos(trabajo.fecha_creacion, trabajo.fecha_inicio),
+            'impresion_ms': _milisegundos(trabajo.fecha_inicio, trabajo.fecha_fin) if trabajo.estado == 'impreso' else None,
+            'error': trabajo.error,
+        })
+    impresos = [t for t in recientes if t['impresion_ms'] is not None]
+
+    return JsonResponse({
+        'status': 'ok',
+        'cola_activa': impresion.cola_activa(),
+        'profundidad': por_estado.get('pendiente', 0) + por_estado.get('imprimiendo', 0),
+        'por_estado': {estado: por_estado.get(estado, 0) for estado, _ in TrabajoImpresion.ESTADO_CHOICES},
+        'espera_mas_antigua_ms': _milisegundos(pendiente_mas_antiguo, ahora),
+        'promedio_espera_ms': round(sum(t['espera_ms'] for t in impresos) / len(impresos)) if impresos else None,
+        'promedio_impresion_ms': round(sum(t['impresion_ms'] for t in impresos) / len(impresos)) if impresos else None,
+        'trabajos': recientes,
+    })
+
 @solo_admin_required
 def gestion_interesados(request):
     reuniones_proximas = Reunion.objects.filter(fecha__gte=timezone.now()).prefetch_related('interesados').order_by('fecha')
@@ -390,6 +757,47 @@ def gestion_interesados(request):
         'reuniones': reuniones_proximas
     })
 
+def _parametros_hoja(request, reunion):
+    """(usuario_ids, por_pagina, prefijo) de la petición; por defecto, los interesados de la reunión."""
+    datos = request.POST if request.method == 'POST' else request.GET
+    try:
+        por_pagina = int(datos.get('por_pagina') or etiquetas.ETIQUETAS_POR_PAGINA)
+        usuario_ids = [int(x) for x in datos.get('usuario_ids', '').split(',') if x.strip()]
+    except ValueError:
+        return None
+    por_pagina = max(1, min(por_pagina, etiquetas.MAX_ETIQUETAS_POR_PAGINA))
+    if usuario_ids:
+        return usuario_ids, por_pagina, f'reunion-{reunion.id}-seleccion'
+    return list(reunion.interesados.values_list('id', flat=True)), por_pagina, f'reunion-{reunion.id}'
+
+@solo_admin_required
+def hoja_etiquetas(request, reunion_id):
+    """
+    Hoja de etiquetas para imprimir antes del evento.
+    POST: encola la generación para el worker (o reutiliza la hoja ya generada).
+    GET: consulta el estado con los mismos parámetros.
+    Parámetros opcionales: `usuario_ids` (separados por coma) y `por_pagina`.
+    """
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    parametros = _parametros_hoja(request, reunion)
+    if parametros is None:
+        return JsonResponse({'status': 'error', 'message': 'Parámetros inválidos.'}, status=400)
+    usuario_ids, por_pagina, prefijo = parametros
+    if not usuario_ids:
+        return JsonResponse({'status': 'error', 'message': 'No hay usuarios para generar etiquetas.'}, status=400)
+
+    if request.method == 'POST':
+        ruta, estado = etiquetas.encolar_hoja(usuario_ids, por_pagina, reunion.detalle, prefijo)
+    else:
+        ruta = etiquetas.ruta_hoja(usuario_ids, por_pagina, prefijo)
+        estado = etiquetas.estado_hoja(ruta)
+    return JsonResponse({
+        'status': 'success',
+        'estado': estado,
+        'total': len(usuario_ids),
+        'url': default_storage.url(ruta) if estado == 'listo' else None,
+    })
+
 @solo_admin_required
 def gestion_encuestas(request):
     if request.method == 'POST':
@@ -447,7 +855,7 @@ def gestion_soporte(request):
 @admin_required # Ayudante puede ver y responder tickets
 def ver_ticket_soporte(request, ticket_id):
     ticket = get_object_or_404(SoporteTicket, id=ticket_id)
-    admin_usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    admin_usuario = usuario_actual_o_404(request)
 
     if request.method == 'POST':
         if 'actualizar_estado' in request.POST:
@@ -486,7 +894,7 @@ def totem_seleccionar_reunion(request):
     reuniones_proximas = Reunion.objects.filter(fecha__gte=timezone.now()).order_by('fecha')
     contexto = {
         'reuniones': reuniones_proximas,
-        'usuario': get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+        'usuario': usuario_actual_o_404(request)
     }
     return render(request, 'totem_seleccionar_reunion.html', contexto)
 
@@ -496,8 +904,14 @@ def totem_escaner(request, reunion_id):
     Vista de escaneo para el Tótem, bloqueada y a pantalla completa.
     """
     reunion = get_object_or_404(Reunion, id=reunion_id)
+    asistencia_cache.precalentar(reunion.id)
     # Pasamos el token CSRF explícitamente para que esté disponible en el JavaScript
-    return render(request, 'totem_escaner.html', {'reunion': reunion})
+    return render(request, 'totem_escaner.html', {
+        'reunion': reunion,
+        'cola_impresion': impresion.cola_activa(),
+        'aceptar_sin_firma': getattr(settings, 'CREDENCIAL_ACEPTAR_SIN_FIRMA', True),
+        'largo_huella': LARGO_HUELLA,
+    })
 
 @totem_required
 def totem_verify_exit(request):
@@ -508,7 +922,7 @@ def totem_verify_exit(request):
         try:
             data = json.loads(request.body)
             password = data.get('password')
-            usuario_totem = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+            usuario_totem = usuario_actual_o_404(request)
 
             # Usamos check_password para comparar la contraseña en texto plano con la hasheada en la BD
             if check_password(password, usuario_totem.password): 
@@ -519,6 +933,14 @@ def totem_verify_exit(request):
             return JsonResponse({'status': 'error', 'message': 'Petición inválida'}, status=400)
     return JsonResponse({'status': 'error', 'message': 'Método no permitido'}, status=405)
 
+
+def _estadistica_reunion(reunion):
+    """Contadores precalculados de la reunión; en cero si aún no tiene (reconstruir_estadisticas los crea)."""
+    try:
+        return reunion.estadistica
+    except EstadisticaReunion.DoesNotExist:
+        return EstadisticaReunion(reunion=reunion)
+
 @admin_required # Ayudante puede ver estadísticas (con lógica interna para restringir)
 def estadisticas_admin(request):
     """
@@ -527,7 +949,7 @@ def estadisticas_admin(request):
     """
     reuniones_para_filtro = Reunion.objects.all().order_by('-fecha')
     reunion_seleccionada_id_str = request.GET.get('reunion_id', None)
-    usuario_actual = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario_actual = usuario_actual_o_404(request)
 
     rubros_dict = _flatten_choices(RUBRO_CHOICES)
 
@@ -561,42 +983,44 @@ def estadisticas_admin(request):
     contexto['reunion_seleccionada_id'] = reunion_seleccionada_id
 
     # --- 4. Poblar el contexto con los datos correspondientes ---
+    # Sale de las tablas de estadísticas precalculadas, salvo las asistencias,
+    # que se cuentan al leer (ver paneladm/estadisticas.py).
     if reunion_seleccionada_id:
         # --- VISTA DE ESTADÍSTICAS POR REUNIÓN ---
-        reunion = get_object_or_404(Reunion, id=reunion_seleccionada_id)
+        reunion = get_object_or_404(Reunion.objects.select_related('estadistica'), id=reunion_seleccionada_id)
         contexto['reunion_seleccionada'] = reunion
-        asistentes = reunion.asistentes.all()
-        interesados = reunion.interesados.all()
-        contexto['total_asistencias'] = asistentes.count()
-        contexto['data_conversion'] = [interesados.count(), asistentes.count()]
+        estadistica = _estadistica_reunion(reunion)
+        asistentes = estadisticas.asistentes_por_reunion([reunion.id])[reunion.id]
+        contexto['total_asistencias'] = asistentes
+        contexto['data_conversion'] = [estadistica.interesados, asistentes]
+        contexto['promedio_satisfaccion'] = estadistica.promedio_satisfaccion
 
-        if hasattr(reunion, 'encuesta'):
-            respuestas = reunion.encuesta.respuestas.all()
-            contexto['promedio_satisfaccion'] = respuestas.aggregate(avg=Avg('puntuacion'))['avg'] or 0
-            puntuaciones = respuestas.values('puntuacion').annotate(cantidad=Count('id')).order_by('puntuacion')
-            contexto['labels_puntuacion'] = [f"{p['puntuacion']} Estrellas" for p in puntuaciones]
-            contexto['data_puntuacion'] = [p['cantidad'] for p in puntuaciones]
+        puntuaciones = estadisticas.distribucion(reunion.id, 'puntuacion', por_valor=True)
+        contexto['labels_puntuacion'] = [f"{puntuacion} Estrellas" for puntuacion, _ in puntuaciones]
+        contexto['data_puntuacion'] = [cantidad for _, cantidad in puntuaciones]
 
-        top_rubros = asistentes.filter(rubro__isnull=False).exclude(rubro__exact='').values('rubro').annotate(cantidad=Count('id')).order_by('-cantidad')[:5]
-        contexto['labels_rubro'] = [rubros_dict.get(r['rubro'], r['rubro']) for r in top_rubros]
-        contexto['data_rubro'] = [r['cantidad'] for r in top_rubros]
+        top_rubros = estadisticas.distribucion_asistentes(reunion.id, 'rubro', limite=5)
+        contexto['labels_rubro'] = [rubros_dict.get(rubro, rubro) for rubro, _ in top_rubros]
+        contexto['data_rubro'] = [cantidad for _, cantidad in top_rubros]
 
     elif usuario_actual.es_admin:
         # --- VISTA DE ESTADÍSTICAS GENERALES ---
-        contexto['total_usuarios'] = Usuario.objects.count()
-        contexto['total_reuniones'] = Reunion.objects.count()
-        contexto['total_asistencias'] = Usuario.objects.aggregate(total=Sum('cantidad_asistencias'))['total'] or 0
-        contexto['promedio_satisfaccion'] = RespuestaEncuesta.objects.aggregate(avg=Avg('puntuacion'))['avg'] or 0
+        totales = estadisticas.totales()
+        contexto['total_usuarios'] = totales[estadisticas.USUARIOS]
+        contexto['total_reuniones'] = totales[estadisticas.REUNIONES]
+        contexto['total_asistencias'] = estadisticas.asistencias_totales()
+        contexto['promedio_satisfaccion'] = estadisticas.promedio(totales[estadisticas.RESPUESTAS], totales[estadisticas.SUMA_PUNTUACIONES])
         
         # Gráfico de Asistencia a últimas reuniones
-        reuniones_recientes = Reunion.objects.annotate(num_asistentes=Count('asistentes')).order_by('-fecha')[:10][::-1] # Invertido para orden cronológico
+        reuniones_recientes = Reunion.objects.order_by('-fecha')[:10][::-1] # Invertido para orden cronológico
+        asistentes = estadisticas.asistentes_por_reunion([r.id for r in reuniones_recientes])
         contexto['labels_reuniones'] = [r.detalle for r in reuniones_recientes]
-        contexto['data_asistencia'] = [r.num_asistentes for r in reuniones_recientes]
+        contexto['data_asistencia'] = [asistentes[r.id] for r in reuniones_recientes]
         
         # Gráfico de Rubros (general)
-        top_rubros = Usuario.objects.filter(rubro__isnull=False).exclude(rubro__exact='').values('rubro').annotate(cantidad=Count('id')).order_by('-cantidad')[:5]
-        contexto['labels_rubro'] = [rubros_dict.get(r['rubro'], r['rubro']) for r in top_rubros]
-        contexto['data_rubro'] = [r['cantidad'] for r in top_rubros]
+        top_rubros = estadisticas.distribucion(estadisticas.GENERAL, 'rubro', limite=5)
+        contexto['labels_rubro'] = [rubros_dict.get(rubro, rubro) for rubro, _ in top_rubros]
+        contexto['data_rubro'] = [cantidad for _, cantidad in top_rubros]
 
     return render(request, 'panel_admin_estadisticas.html', contexto)
 
@@ -608,7 +1032,7 @@ def exportar_estadisticas_excel(request):
     exporta las estadísticas generales.
     """
     reunion_id = request.GET.get('reunion_id')
-    usuario_actual = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario_actual = usuario_actual_o_404(request)
     workbook = openpyxl.Workbook()
     bold_font = Font(bold=True, size=12)
     filename = "estadisticas_inacap.xlsx" # Actualizado el nombre del archivo
@@ -802,7 +1226,7 @@ def obtener_participantes_ruleta(request):
             'nombre_completo': f"{p.nombre} {p.apellido}",
             'nombre_corto': nombre_corto,
             'rubro': p.get_rubro_real_display,
-            'foto_url': p.foto.url if p.foto else '/static/img/persn.jpg'
+            'foto_url': p.avatar_256_url or '/static/img/persn.jpg'
         })
 
     return JsonResponse({'participantes': participantes_data})
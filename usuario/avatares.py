@@ -0,0 +1,102 @@
+"""
+Avatares de los usuarios.
+
+Al subir una foto se normaliza: se corrige la orientación EXIF, se recorta al
+centro en cuadrado y se guarda en WebP en tres lados (48, 96 y 256 px) en la
+misma carpeta que el original. Una vez verificados los avatares, el original
+se mueve a `originales/` (sin extensión, junto al token) y se borra recién con
+los avatares; así una normalización fallida nunca pierde la foto subida. `Usuario.foto` pasa a apuntar a
+la de 256 px (`usuarios/<id>-<token>_256.webp`; el token cambia con cada foto,
+así el navegador no muestra una anterior cacheada) y las demás se derivan de
+ese nombre, de modo que basta la columna `foto` (p. ej. en un values_list)
+para armar cualquier URL.
+
+Las fotos subidas antes de este cambio se normalizan con
+`manage.py normalizar_avatares`; mientras tanto se sirve el original.
+"""
+import os
+import secrets
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from paneladm.imagenes import abrir, guardar_webp
+
+# Lo que Pillow o el storage levantan con una foto ilegible o corrupta.
+ERRORES_IMAGEN = (OSError, Image.DecompressionBombError)
+CARPETA_ORIGINALES = 'originales'
+LADOS = (48, 96, 256)
+LADO_BASE = 256
+SUFIJO_BASE = f'_{LADO_BASE}.webp'
+
+
+def normalizada(nombre):
+    return nombre.endswith(SUFIJO_BASE)
+
+
+def nombre_lado(nombre, lado):
+    return nombre[:-len(SUFIJO_BASE)] + f'_{lado}.webp'
+
+
+def nombre_original(nombre):
+    """Dónde queda archivado el original de un avatar normalizado."""
+    carpeta, archivo = os.path.split(nombre[:-len(SUFIJO_BASE)])
+    return f'{carpeta}/{CARPETA_ORIGINALES}/{archivo}'
+
+
+def url(nombre, lado):
+    """URL del avatar de `lado` px para el nombre guardado en `foto`; '' si no hay foto."""
+    if not nombre:
+        return ''
+    if normalizada(nombre):
+        return default_storage.url(nombre_lado(nombre, lado))
+    return default_storage.url(nombre)
+
+
+def borrar(nombre):
+    if normalizada(nombre):
+        for lado in LADOS:
+            default_storage.delete(nombre_lado(nombre, lado))
+        default_storage.delete(nombre_original(nombre))
+
+
+def _verificar(base):
+    """Levanta ERRORES_IMAGEN si algún avatar no quedó escrito como imagen legible."""
+    for lado in LADOS:
+        with default_storage.open(nombre_lado(base, lado), 'rb') as archivo:
+            Image.open(archivo).verify()
+
+
+def _archivar(original, base):
+    with default_storage.open(original, 'rb') as archivo:
+        default_storage.save(nombre_original(base), archivo)
+
+
+def normalizar(usuario_id, original):
+    """
+    Genera los avatares de `original` y apunta la foto del usuario al de 256 px.
+    Devuelve el nombre nuevo, o None si entretanto el usuario cambió de foto.
+    """
+    from . import info_cache, versiones
+    from .models import Usuario
+    imagen = ImageOps.fit(abrir(original, lado_minimo=LADO_BASE), (LADO_BASE, LADO_BASE), Image.LANCZOS)
+    base = f'{os.path.dirname(original)}/{usuario_id}-{secrets.token_hex(4)}{SUFIJO_BASE}'
+    try:
+        for lado in LADOS:
+            guardar_webp(imagen if lado == LADO_BASE else imagen.resize((lado, lado), Image.LANCZOS), nombre_lado(base, lado))
+        _verificar(base)
+        _archivar(original, base)
+    except ERRORES_IMAGEN:
+        borrar(base)
+        raise
+
+    # update() en vez de save(): no vuelve a disparar la normalización. La fecha
+    # se actualiza a mano para que el padrón del tótem envíe la foto nueva en su delta.
+    if not Usuario.objects.filter(id=usuario_id, foto=original).update(foto=base, fecha_actualizacion=timezone.now()):
+        borrar(base)
+        return None
+    default_storage.delete(original) # Ya quedó en originales/
+    info_cache.invalidar(usuario_id)
+    versiones.incrementar(versiones.USUARIO)
+    return base
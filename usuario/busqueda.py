@@ -0,0 +1,261 @@
+"""
+Búsqueda de texto completo de usuarios (directorio, gestión de usuarios y su
+búsqueda AJAX).
+
+Cada `Usuario` tiene un `DocumentoBusqueda` con el texto buscable ya
+normalizado (minúsculas, sin tildes): nombre, apellido, RUT, sede y carrera en
+`texto`, y el email aparte en `email`, que solo se busca desde el panel (el
+directorio nunca buscó por email). Se actualiza al guardar el usuario y se
+reconstruye completo con `manage.py reconstruir_busqueda`.
+
+El motor depende de la base de datos, o del setting `BUSQUEDA_USUARIOS_BACKEND`
+(ruta a una clase con la interfaz de `BusquedaSimple`):
+- MySQL: índice FULLTEXT sobre el documento, `MATCH ... AGAINST` en modo booleano.
+- SQLite: tabla virtual FTS5 que replica el documento con triggers (desarrollo y pruebas).
+- Otras: LIKE sobre el documento, sin índice ni relevancia.
+
+Sin índice de texto completo (motor simple, o términos que FULLTEXT no indexa)
+se busca en columnas normalizadas del propio `Usuario` (`nombre_normalizado`,
+`sede_normalizada`, `carrera_normalizada`): minúsculas, sin tildes y con las
+palabras ordenadas, indexadas para búsquedas por prefijo. Las mantiene
+`Usuario.save()` y se rellenan con `manage.py rellenar_normalizados`. Ahí cada
+término se compara solo como prefijo de la columna (o del RUT), para que use el
+índice: encuentra la primera palabra en orden alfabético, no las siguientes.
+
+Cada palabra de la consulta es obligatoria y se busca como prefijo
+("jua per" encuentra a Juan Pérez). Los resultados se anotan con `relevancia`
+y se ordenan por ella antes que por el orden que ya traía el queryset.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+TABLA_DOCUMENTOS = 'usuario_documentobusqueda'
+TABLA_FTS = 'usuario_documentobusqueda_fts'
+INDICE_FULLTEXT = 'usuario_documentobusqueda_texto_ft'
+INDICE_FULLTEXT_EMAIL = 'usuario_documentobusqueda_texto_email_ft'
+CAMPOS = ['nombre', 'apellido', 'email', 'rut', 'sede', 'sede_otro', 'carrera', 'carrera_otro']
+LOTE = 500
+# Columna normalizada -> campos de los que se calcula.
+COLUMNAS_NORMALIZADAS = {
+    'nombre_normalizado': ['nombre', 'apellido'],
+    'sede_normalizada': ['sede', 'sede_otro'],
+    'carrera_normalizada': ['carrera', 'carrera_otro'],
+}
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes y solo letras/dígitos separados por un espacio."""
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto))
+
+
+def terminos(consulta):
+    return normalizar(consulta).split()
+
+
+def _display(usuario, campo):
+    valor = getattr(usuario, campo)
+    if not valor or valor == 'otro':
+        return '' # La opción "Otro/a" no aporta: lo buscable está en el campo *_otro
+    return dict(usuario._meta.get_field(campo).flatchoices).get(valor, valor)
+
+
+def columnas_normalizadas(usuario):
+    """
+    Valores de las columnas normalizadas: palabras sin tildes, sin repetir y en
+    orden alfabético ("Pérez José" y "José Pérez" quedan igual). Sede y carrera
+    usan la etiqueta de la opción ("Ñuñoa", no el código).
+    """
+    valores = {}
+    for columna, campos in COLUMNAS_NORMALIZADAS.items():
+        texto = ' '.join(filter(None, [_display(usuario, campo) if campo in ('sede', 'carrera') else getattr(usuario, campo)
+                                       for campo in campos]))
+        valores[columna] = ' '.join(sorted(set(normalizar(texto).split())))
+    return valores
+
+
+def texto_documento(usuario):
+    rut = usuario.rut or ''
+    partes = [
+        usuario.nombre, usuario.apellido,
+        rut, re.sub(r'[^0-9kK]', '', rut), # El RUT también sin puntos ni guion
+        _display(usuario, 'sede'), usuario.sede_otro,
+        _display(usuario, 'carrera'), usuario.carrera_otro,
+    ]
+    return normalizar(' '.join(filter(None, partes)))
+
+
+def campos_documento(usuario):
+    return {'texto': texto_documento(usuario), 'email': normalizar(usuario.email)}
+
+
+class BusquedaSimple:
+    """LIKE sobre las columnas normalizadas. Funciona en cualquier base."""
+
+    def filtrar_like(self, queryset, lista, incluir_email):
+        for termino in lista:
+            # Solo prefijos (LIKE 'termino%'), que usan los índices de las columnas;
+            # la búsqueda dentro del texto queda para FULLTEXT/FTS5.
+            condicion = Q(rut__istartswith=termino)
+            if incluir_email:
+                condicion |= Q(email__istartswith=termino)
+            for columna in COLUMNAS_NORMALIZADAS:
+                condicion |= Q(**{f'{columna}__istartswith': termino})
+            queryset = queryset.filter(condicion)
+        return queryset
+
+    def filtrar(self, queryset, consulta, incluir_email=False):
+        """Devuelve (queryset filtrado, expresión de relevancia o None)."""
+        return self.filtrar_like(queryset, terminos(consulta), incluir_email), None
+
+    def crear_indice(self, schema_editor):
+        pass
+
+    def borrar_indice(self, schema_editor):
+        pass
+
+    def reconstruir_indice(self):
+        pass
+
+
+class BusquedaMySQL(BusquedaSimple):
+    # InnoDB no indexa palabras más cortas que innodb_ft_min_token_size (3 por
+    # defecto) ni las de su lista de palabras vacías: esas van por LIKE.
+    LARGO_MINIMO = 3
+    PALABRAS_VACIAS = {
+        'about', 'are', 'com', 'for', 'from', 'how', 'that', 'the', 'this', 'was',
+        'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www',
+    }
+
+    def filtrar(self, queryset, consulta, incluir_email=False):
+        lista = terminos(consulta)
+        indexables = [t for t in lista if len(t) >= self.LARGO_MINIMO and t not in self.PALABRAS_VACIAS]
+        queryset = self.filtrar_like(queryset, [t for t in lista if t not in indexables], incluir_email)
+        if not indexables:
+            return queryset, None
+
+        # MATCH debe nombrar exactamente las columnas de uno de los dos índices FULLTEXT.
+        match = f"MATCH({'texto, email' if incluir_email else 'texto'}) AGAINST (%s IN BOOLEAN MODE)"
+        expresion = ' '.join(f'+{termino}*' for termino in indexables)
+        tabla = queryset.model._meta.db_table
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT usuario_id FROM {TABLA_DOCUMENTOS} WHERE {match}', [expresion]
+        ))
+        return queryset, RawSQL(
+            f'SELECT {match} FROM {TABLA_DOCUMENTOS} WHERE usuario_id = {tabla}.id',
+            [expresion], output_field=FloatField(),
+        )
+
+    def crear_indice(self, schema_editor):
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {INDICE_FULLTEXT} ON {TABLA_DOCUMENTOS} (texto)')
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {INDICE_FULLTEXT_EMAIL} ON {TABLA_DOCUMENTOS} (texto, email)')
+
+    def borrar_indice(self, schema_editor):
+        schema_editor.execute(f'DROP INDEX {INDICE_FULLTEXT_EMAIL} ON {TABLA_DOCUMENTOS}')
+        schema_editor.execute(f'DROP INDEX {INDICE_FULLTEXT} ON {TABLA_DOCUMENTOS}')
+
+
+class BusquedaSQLite(BusquedaSimple):
+    """
+    FTS5 con contenido externo: la tabla virtual solo guarda el índice y lo
+    mantienen triggers sobre la tabla de documentos. Si una migración futura
+    recrea esa tabla (SQLite la copia al alterarla), los triggers se pierden:
+    `reconstruir_busqueda` los vuelve a crear.
+    """
+
+    def filtrar(self, queryset, consulta, incluir_email=False):
+        lista = terminos(consulta)
+        if not lista:
+            return queryset, None
+        # Los términos ya vienen normalizados (solo [a-z0-9]): no hay sintaxis FTS5 que escapar.
+        columnas = '{texto email}' if incluir_email else '{texto}'
+        prefijos = ' '.join(f'"{termino}"*' for termino in lista)
+        expresion = f'{columnas} : ({prefijos})'
+        tabla = queryset.model._meta.db_table
+        queryset = queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s', [expresion]
+        ))
+        # bm25() es menor cuanto más relevante: se invierte el signo.
+        return queryset, RawSQL(
+            f'SELECT -bm25({TABLA_FTS}) FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s AND rowid = {tabla}.id',
+            [expresion], output_field=FloatField(),
+        )
+
+    def crear_indice(self, schema_editor):
+        for sql in [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(texto, email, content='{TABLA_DOCUMENTOS}', "
+            f"content_rowid='usuario_id', tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA_DOCUMENTOS} BEGIN '
+            f'INSERT INTO {TABLA_FTS}(rowid, texto, email) VALUES (new.usuario_id, new.texto, new.email); END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA_DOCUMENTOS} BEGIN '
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto, email) VALUES ('delete', old.usuario_id, old.texto, old.email); END",
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE ON {TABLA_DOCUMENTOS} BEGIN '
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto, email) VALUES ('delete', old.usuario_id, old.texto, old.email); "
+            f'INSERT INTO {TABLA_FTS}(rowid, texto, email) VALUES (new.usuario_id, new.texto, new.email); END',
+        ]:
+            schema_editor.execute(sql)
+
+    def borrar_indice(self, schema_editor):
+        for sufijo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLA_FTS}')
+
+    def reconstruir_indice(self):
+        with connection.schema_editor() as schema_editor:
+            self.crear_indice(schema_editor)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+
+
+MOTORES = {'mysql': BusquedaMySQL, 'sqlite': BusquedaSQLite}
+
+
+def motor(conexion=None):
+    ruta = getattr(settings, 'BUSQUEDA_USUARIOS_BACKEND', None)
+    if ruta:
+        return import_string(ruta)()
+    return MOTORES.get((conexion or connection).vendor, BusquedaSimple)()
+
+
+def buscar(queryset, consulta, incluir_email=False):
+    """Filtra un queryset de `Usuario` por `consulta`, anotado y ordenado por `relevancia`."""
+    queryset, relevancia = motor().filtrar(queryset, consulta, incluir_email)
+    if relevancia is None:
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    return queryset.annotate(relevancia=relevancia).order_by('-relevancia', *queryset.query.order_by)
+
+
+def filtrar(queryset, consulta, incluir_email=False):
+    """Como `buscar`, pero sin relevancia: conserva el orden del queryset (p. ej. para paginar por keyset)."""
+    return motor().filtrar(queryset, consulta, incluir_email)[0]
+
+
+def actualizar_documento(usuario):
+    from .models import DocumentoBusqueda
+    DocumentoBusqueda.objects.update_or_create(usuario_id=usuario.id, defaults=campos_documento(usuario))
+
+
+def reconstruir(lote=LOTE):
+    """
+    Regenera todos los documentos por lotes (un INSERT ... ON CONFLICT por lote).
+    Devuelve cuántos documentos se escribieron.
+    """
+    from .models import DocumentoBusqueda, Usuario
+    usuarios = Usuario.objects.only('id', *CAMPOS).order_by('id')
+    desde_id = total = 0
+    while True:
+        grupo = list(usuarios.filter(id__gt=desde_id)[:lote])
+        if not grupo:
+            return total
+        DocumentoBusqueda.objects.bulk_create(
+            [DocumentoBusqueda(usuario_id=u.id, **campos_documento(u)) for u in grupo],
+            update_conflicts=True, unique_fields=['usuario'], update_fields=['texto', 'email'],
+        )
+        total += len(grupo)
+        desde_id = grupo[-1].id
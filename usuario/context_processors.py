@@ -1,4 +1,4 @@
-from paneladm.models import SoporteTicket
+from paneladm import tickets_cache
 
 def notificaciones_admin(request):
     """
@@ -6,6 +6,6 @@ def notificaciones_admin(request):
     si el usuario es un administrador.
     """
     if hasattr(request, 'user_is_admin') and request.user_is_admin:
-        tickets_abiertos = SoporteTicket.objects.filter(estado='abierto').count()
-        return {'tickets_abiertos_count': tickets_abiertos}
+        # Contador mantenido por señales (ver paneladm/tickets_cache.py): no consulta la base.
+        return {'tickets_abiertos_count': tickets_cache.contar()}
     return {}
\ No newline at end of file
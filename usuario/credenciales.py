@@ -0,0 +1,106 @@
+"""
+Credenciales firmadas para los códigos QR de los usuarios.
+
+Formato del token: <version_clave>g<usuario_id>g<emitido_en>g<firma>
+Los tres primeros campos van en hexadecimal y la firma son los primeros
+20 caracteres de un HMAC-SHA256. Solo se usan letras y números para que los
+escáneres de mano (que a veces escriben con otra distribución de teclado)
+no alteren el código.
+"""
+import hashlib
+import hmac
+import re
+import time
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+
+LARGO_FIRMA = 20
+LARGO_HUELLA = 16
+PATRON_TOKEN = re.compile(r'^([0-9a-f]+)g([0-9a-f]+)g([0-9a-f]+)g([0-9a-f]{%d})$' % LARGO_FIRMA)
+
+
+def _claves():
+    """
+    Claves HMAC por versión. Si no se configura `CREDENCIAL_CLAVES`, se deriva
+    una clave (versión 1) desde SECRET_KEY.
+    Para rotar: agregar una versión nueva y apuntar `CREDENCIAL_VERSION_ACTUAL` a ella.
+    Para revocar todos los QR de una versión: quitarla del diccionario.
+    """
+    claves = getattr(settings, 'CREDENCIAL_CLAVES', None)
+    if claves:
+        return claves
+    return {1: salted_hmac('usuario.credenciales', 'v1').hexdigest()}
+
+
+def _firmar(clave, version, usuario_id, emitido_en):
+    mensaje = f'{version}:{usuario_id}:{emitido_en}'.encode()
+    return hmac.new(str(clave).encode(), mensaje, hashlib.sha256).hexdigest()[:LARGO_FIRMA]
+
+
+def generar_token(usuario_id, emitido_en=None):
+    """Genera un token firmado con la clave vigente."""
+    version = getattr(settings, 'CREDENCIAL_VERSION_ACTUAL', 1)
+    emitido_en = int(emitido_en if emitido_en is not None else time.time())
+    firma = _firmar(_claves()[version], version, usuario_id, emitido_en)
+    return f'{version:x}g{usuario_id:x}g{emitido_en:x}g{firma}'
+
+
+def verificar_token(token):
+    """
+    Devuelve el id de usuario si el token es auténtico y no está revocado;
+    en cualquier otro caso devuelve None. No consulta la base de datos.
+    """
+    coincidencia = PATRON_TOKEN.match((token or '').strip().lower())
+    if not coincidencia:
+        return None
+    version, usuario_id, emitido_en = (int(campo, 16) for campo in coincidencia.groups()[:3])
+    clave = _claves().get(version)
+    if clave is None:
+        return None # Versión de clave desconocida o revocada
+    if not hmac.compare_digest(_firmar(clave, version, usuario_id, emitido_en), coincidencia.group(4)):
+        return None
+    # Revocación global: códigos emitidos antes de esta marca (epoch) dejan de valer.
+    if emitido_en < getattr(settings, 'CREDENCIAL_EMITIDAS_DESDE', 0):
+        return None
+    return usuario_id
+
+
+def token_de(contenido):
+    """El token del enlace de un QR: su último segmento."""
+    return (contenido or '').rstrip('/').rsplit('/', 1)[-1]
+
+
+def huella(contenido, usuario_id):
+    """
+    SHA-256 (truncado) del token del QR del usuario. El padrón del tótem la
+    lleva para validar escaneos sin conexión sin conocer la clave HMAC.
+    None si el contenido no es una credencial válida del usuario.
+    """
+    token = token_de(contenido)
+    if verificar_token(token) != usuario_id:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()[:LARGO_HUELLA]
+
+
+def url_credencial(usuario_id, token=None):
+    """
+    Contenido del QR: el enlace al perfil público con el token como último
+    segmento. Quien lo escanee con la cámara del teléfono sigue llegando al perfil.
+    """
+    base_url = getattr(settings, 'BASE_URL', 'http://127.0.0.1:8000')
+    return base_url + reverse('perfil_publico_credencial', args=[usuario_id, token or generar_token(usuario_id)])
+
+
+def credencial_vigente(contenido, usuario_id):
+    """
+    True si `contenido` es el enlace que se generaría hoy para el usuario:
+    misma BASE_URL y ruta, firma válida y clave de la versión actual.
+    """
+    token = token_de(contenido)
+    if verificar_token(token) != usuario_id:
+        return False
+    if int(token.split('g', 1)[0], 16) != getattr(settings, 'CREDENCIAL_VERSION_ACTUAL', 1):
+        return False
+    return contenido == url_credencial(usuario_id, token)
@@ -0,0 +1,32 @@
+"""
+Caché de los datos de sesión de cada usuario (roles y lo que muestra la barra
+de navegación), para que `UserInfoMiddleware` no consulte la base en cada
+petición. Se invalida con las señales de guardado y borrado de `Usuario`, antes
+y después del commit: una petición que lea la fila entre el save() y el commit
+volvería a cachear los roles viejos. Un `update()` de los roles no pasa por las
+señales; la duración corta acota cuánto siguen vigentes los permisos revocados.
+"""
+from django.core.cache import cache
+
+DURACION = 60 * 5
+CAMPOS = ['id', 'es_admin', 'es_ayudante', 'es_totem', 'nombre', 'apellido', 'foto']
+
+
+def _clave(usuario_id):
+    return f'usuario_info:{usuario_id}'
+
+
+def obtener(usuario_id):
+    """Dict con CAMPOS del usuario, o None si no existe."""
+    info = cache.get(_clave(usuario_id))
+    if info is None:
+        from .models import Usuario
+        info = Usuario.objects.filter(id=usuario_id).values(*CAMPOS).first()
+        if info is None:
+            return None # No se cachean ausencias: el id puede reutilizarse tras una restauración
+        cache.set(_clave(usuario_id), info, DURACION)
+    return info
+
+
+def invalidar(usuario_id):
+    cache.delete(_clave(usuario_id))
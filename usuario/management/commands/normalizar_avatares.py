@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuario import avatares
+from usuario.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Normaliza las fotos de perfil subidas antes de los avatares: corrige la "
+        "orientación, recorta en cuadrado y genera las versiones de 48, 96 y 256 px. "
+        "Se puede interrumpir y volver a correr; solo toma las que faltan."
+    )
+
+    def handle(self, *args, **options):
+        pendientes = (Usuario.objects.exclude(foto__isnull=True).exclude(foto='')
+                      .exclude(foto__endswith=avatares.SUFIJO_BASE).order_by('id').values_list('id', 'foto'))
+        inicio = time.perf_counter()
+        normalizadas = errores = 0
+        for usuario_id, foto in pendientes.iterator():
+            try:
+                avatares.normalizar(usuario_id, foto)
+            except avatares.ERRORES_IMAGEN as e:
+                errores += 1
+                self.stderr.write(f'[{usuario_id}] {foto}: {e}')
+                continue
+            normalizadas += 1
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo: {normalizadas} fotos normalizadas, {errores} con error en {segundos:.1f} s.'
+        ))
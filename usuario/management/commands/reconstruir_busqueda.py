@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuario import busqueda
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera el documento de búsqueda de todos los usuarios y el índice de texto "
+        "completo (FULLTEXT en MySQL, FTS5 en SQLite). Usar tras cargas masivas hechas "
+        "sin señales o si los resultados de búsqueda no coinciden con los datos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=busqueda.LOTE, help='Usuarios por lote.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = busqueda.reconstruir(lote=options['lote'])
+        motor = busqueda.motor()
+        motor.reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} documentos reconstruidos con {type(motor).__name__} en {time.perf_counter() - inicio:.1f} s.'
+        ))
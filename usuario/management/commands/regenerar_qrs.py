@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from usuario import qr
+from usuario.credenciales import credencial_vigente, url_credencial
+from usuario.models import Usuario
+
+
+def _renderizar(item):
+    """Se ejecuta en los procesos del pool: solo dibuja el PNG, sin tocar la base de datos."""
+    usuario_id, contenido = item
+    return usuario_id, contenido, qr.renderizar_png(contenido)
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera los códigos QR faltantes o desactualizados (por ejemplo, después de "
+        "cambiar BASE_URL o la clave de las credenciales). Con QR_GUARDAR_ARCHIVOS dibuja "
+        "los PNG en paralelo; si no, solo emite el contenido nuevo. Actualiza la base por "
+        "lotes con bulk_update y guarda un punto de control para retomar si se interrumpe. "
+        "Reemplaza a generate_qrs.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1, help='Procesos que dibujan los QR.')
+        parser.add_argument('--lote', type=int, default=500, help='Usuarios por lote (un bulk_update por lote).')
+        parser.add_argument('--todos', action='store_true', help='Regenerar todos, aunque estén vigentes.')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, 'regenerar_qrs.checkpoint'),
+                            help='Archivo del punto de control.')
+        parser.add_argument('--reiniciar', action='store_true', help='Ignorar el punto de control y empezar de cero.')
+
+    def handle(self, *args, **options):
+        base_url = getattr(settings, 'BASE_URL', '')
+        desde_id = 0 if options['reiniciar'] else self._leer_checkpoint(options['checkpoint'], base_url, options['todos'])
+        if desde_id:
+            self.stdout.write(f'Retomando desde el usuario {desde_id}.')
+
+        guardar_archivos = qr.guardar_archivos()
+        campos = ['qr_contenido', 'fecha_actualizacion'] + (['qr_code'] if guardar_archivos else [])
+        inicio = time.perf_counter()
+        revisados = regenerados = 0
+        with ProcessPoolExecutor(max_workers=options['procesos']) as pool:
+            for lote in self._lotes(desde_id, options['lote']):
+                revisados += len(lote)
+                pendientes = [
+                    (usuario_id, url_credencial(usuario_id)) for usuario_id, contenido, tiene_qr in lote
+                    if options['todos'] or (guardar_archivos and not tiene_qr) or not credencial_vigente(contenido, usuario_id)
+                ]
+                actualizados = []
+                if guardar_archivos:
+                    for usuario_id, contenido, png in pool.map(_renderizar, pendientes, chunksize=16):
+                        actualizados.append(Usuario(
+                            id=usuario_id, qr_code=qr.guardar_png(usuario_id, png),
+                            qr_contenido=contenido, fecha_actualizacion=timezone.now(),
+                        ))
+                else:
+                    # El QR se dibuja al vuelo: basta con emitir el contenido nuevo.
+                    actualizados = [Usuario(id=usuario_id, qr_contenido=contenido, fecha_actualizacion=timezone.now())
+                                    for usuario_id, contenido in pendientes]
+                Usuario.objects.bulk_update(actualizados, campos)
+                regenerados += len(actualizados)
+
+                self._escribir_checkpoint(options['checkpoint'], base_url, options['todos'], lote[-1][0])
+                segundos = time.perf_counter() - inicio
+                self.stdout.write(f'Hasta el usuario {lote[-1][0]}: {revisados} revisados, {regenerados} regenerados '
+                                  f'({regenerados / segundos:.1f} QR/s)')
+
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo: {revisados} usuarios revisados, {regenerados} QR regenerados en {segundos:.1f} s '
+            f'({regenerados / segundos if segundos else 0:.1f} QR/s, {options["procesos"]} procesos).'
+        ))
+
+    def _lotes(self, desde_id, tamano):
+        """Recorre los usuarios por id (keyset), lote a lote. Omite los que un worker está generando."""
+        usuarios = Usuario.objects.order_by('id')
+        while True:
+            lote = list(usuarios.filter(id__gt=desde_id).values_list('id', 'qr_contenido', 'qr_code')[:tamano])
+            if not lote:
+                return
+            yield [(usuario_id, contenido, bool(qr_code)) for usuario_id, contenido, qr_code in lote]
+            desde_id = lote[-1][0]
+
+    def _leer_checkpoint(self, ruta, base_url, todos):
+        try:
+            with open(ruta) as archivo:
+                checkpoint = json.load(archivo)
+        except (OSError, ValueError):
+            return 0
+        # Un punto de control de otra corrida (otra BASE_URL u otro modo) no sirve.
+        if checkpoint.get('base_url') != base_url or checkpoint.get('todos') != todos:
+            return 0
+        return checkpoint.get('ultimo_id', 0)
+
+    def _escribir_checkpoint(self, ruta, base_url, todos, ultimo_id):
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w') as archivo:
+            json.dump({'base_url': base_url, 'todos': todos, 'ultimo_id': ultimo_id}, archivo)
+        os.replace(temporal, ruta)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuario import busqueda
+from usuario.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Rellena las columnas normalizadas de búsqueda (nombre, sede y carrera sin "
+        "tildes ni mayúsculas) de todos los usuarios, por lotes con bulk_update. "
+        "Usar después de migrar o tras cargas masivas hechas con update()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=busqueda.LOTE, help='Usuarios por lote.')
+
+    def handle(self, *args, **options):
+        columnas = list(busqueda.COLUMNAS_NORMALIZADAS)
+        campos = {campo for fuentes in busqueda.COLUMNAS_NORMALIZADAS.values() for campo in fuentes}
+        usuarios = Usuario.objects.only('id', *campos, *columnas).order_by('id')
+        inicio = time.perf_counter()
+        desde_id = revisados = actualizados = 0
+        while True:
+            lote = list(usuarios.filter(id__gt=desde_id)[:options['lote']])
+            if not lote:
+                break
+            cambiados = []
+            for usuario in lote:
+                valores = busqueda.columnas_normalizadas(usuario)
+                if any(getattr(usuario, columna) != valor for columna, valor in valores.items()):
+                    for columna, valor in valores.items():
+                        setattr(usuario, columna, valor)
+                    cambiados.append(usuario)
+            # bulk_update no llama a save() ni a las señales: solo escribe estas columnas.
+            Usuario.objects.bulk_update(cambiados, columnas)
+            revisados += len(lote)
+            actualizados += len(cambiados)
+            desde_id = lote[-1].id
+        self.stdout.write(self.style.SUCCESS(
+            f'{revisados} usuarios revisados, {actualizados} actualizados en {time.perf_counter() - inicio:.1f} s.'
+        ))
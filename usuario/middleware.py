@@ -1,18 +1,38 @@
+from django.http import Http404
+from django.utils.functional import SimpleLazyObject
+from . import info_cache
 from .models import Usuario
 
+def _cargar_usuario(usuario_id):
+    if not usuario_id:
+        return None
+    return Usuario.objects.filter(id=usuario_id).first()
+
+def usuario_actual_o_404(request):
+    """
+    El usuario de la sesión, cargado una sola vez por petición
+    (`request.current_usuario`). Lanza 404 si ya no existe.
+    """
+    usuario = request.current_usuario
+    if not usuario:
+        raise Http404
+    return usuario
+
 class UserInfoMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         usuario_id = request.session.get('usuario_id')
+        # Fila completa del usuario: se consulta solo si una vista o decorador la usa, y una sola vez.
+        request.current_usuario = SimpleLazyObject(lambda: _cargar_usuario(usuario_id))
         if usuario_id:
-            try:
-                usuario = Usuario.objects.get(id=usuario_id)
-                request.user_is_admin = usuario.es_admin
-                request.user_id = usuario.id
-            except Usuario.DoesNotExist:
-                request.user_is_admin = False
-                request.user_id = None
+            # Roles desde la caché (ver info_cache.py): no consulta la base de datos en cada petición.
+            info = info_cache.obtener(usuario_id)
+            request.usuario_info = info
+            request.user_is_admin = bool(info and info['es_admin'])
+            request.user_is_ayudante = bool(info and info['es_ayudante'])
+            request.user_is_totem = bool(info and info['es_totem'])
+            request.user_id = info['id'] if info else None
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0009_usuario_groups_usuario_is_active_usuario_is_staff_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0010_usuario_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='apellido',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='usuario',
+            name='nombre',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
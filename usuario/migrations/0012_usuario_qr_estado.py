@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+def marcar_qr_existentes(apps, schema_editor):
+    # Los usuarios que ya tienen QR no deben volver a la cola.
+    Usuario = apps.get_model('usuario', 'Usuario')
+    Usuario.objects.exclude(qr_code__isnull=True).exclude(qr_code='').update(qr_estado='listo')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0011_usuario_nombre_apellido_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='qr_estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('generando', 'Generando'), ('listo', 'Listo'), ('error', 'Error')], db_index=True, default='pendiente', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='qr_intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(marcar_qr_existentes, migrations.RunPython.noop),
+    ]
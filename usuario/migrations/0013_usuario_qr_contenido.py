@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0012_usuario_qr_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='qr_contenido',
+            field=models.CharField(blank=True, help_text='Enlace codificado en el QR actual.', max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+import re
+import unicodedata
+
+# Copia de lo necesario de usuario/busqueda.py al momento de esta migración:
+# las migraciones no deben depender del código vivo, que puede cambiar después.
+TABLA_DOCUMENTOS = 'usuario_documentobusqueda'
+TABLA_FTS = 'usuario_documentobusqueda_fts'
+INDICE_FULLTEXT = 'usuario_documentobusqueda_texto_ft'
+INDICE_FULLTEXT_EMAIL = 'usuario_documentobusqueda_texto_email_ft'
+CAMPOS = ['nombre', 'apellido', 'email', 'rut', 'sede', 'sede_otro', 'carrera', 'carrera_otro']
+LOTE = 500
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode().lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto))
+
+
+def _display(usuario, campo):
+    valor = getattr(usuario, campo)
+    if not valor or valor == 'otro':
+        return ''
+    return dict(usuario._meta.get_field(campo).flatchoices).get(valor, valor)
+
+
+def campos_documento(usuario):
+    rut = usuario.rut or ''
+    partes = [
+        usuario.nombre, usuario.apellido,
+        rut, re.sub(r'[^0-9kK]', '', rut),
+        _display(usuario, 'sede'), usuario.sede_otro,
+        _display(usuario, 'carrera'), usuario.carrera_otro,
+    ]
+    return {'texto': normalizar(' '.join(filter(None, partes))), 'email': normalizar(usuario.email)}
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {INDICE_FULLTEXT} ON {TABLA_DOCUMENTOS} (texto)')
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {INDICE_FULLTEXT_EMAIL} ON {TABLA_DOCUMENTOS} (texto, email)')
+    elif vendor == 'sqlite':
+        for sql in [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(texto, email, content='{TABLA_DOCUMENTOS}', "
+            f"content_rowid='usuario_id', tokenize='unicode61 remove_diacritics 2')",
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON {TABLA_DOCUMENTOS} BEGIN '
+            f'INSERT INTO {TABLA_FTS}(rowid, texto, email) VALUES (new.usuario_id, new.texto, new.email); END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON {TABLA_DOCUMENTOS} BEGIN '
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto, email) VALUES ('delete', old.usuario_id, old.texto, old.email); END",
+            f'CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE ON {TABLA_DOCUMENTOS} BEGIN '
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, texto, email) VALUES ('delete', old.usuario_id, old.texto, old.email); "
+            f'INSERT INTO {TABLA_FTS}(rowid, texto, email) VALUES (new.usuario_id, new.texto, new.email); END',
+        ]:
+            schema_editor.execute(sql)
+
+
+def borrar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX {INDICE_FULLTEXT_EMAIL} ON {TABLA_DOCUMENTOS}')
+        schema_editor.execute(f'DROP INDEX {INDICE_FULLTEXT} ON {TABLA_DOCUMENTOS}')
+    elif vendor == 'sqlite':
+        for sufijo in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {TABLA_FTS}_{sufijo}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLA_FTS}')
+
+
+def poblar_documentos(apps, schema_editor):
+    Usuario = apps.get_model('usuario', 'Usuario')
+    DocumentoBusqueda = apps.get_model('usuario', 'DocumentoBusqueda')
+    usuarios = Usuario.objects.only('id', *CAMPOS).order_by('id')
+    desde_id = 0
+    while True:
+        grupo = list(usuarios.filter(id__gt=desde_id)[:LOTE])
+        if not grupo:
+            return
+        DocumentoBusqueda.objects.bulk_create(
+            [DocumentoBusqueda(usuario_id=u.id, **campos_documento(u)) for u in grupo],
+            update_conflicts=True, unique_fields=['usuario'], update_fields=['texto', 'email'],
+        )
+        desde_id = grupo[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0013_usuario_qr_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='documento_busqueda', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('texto', models.TextField()),
+                ('email', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(crear_indice, borrar_indice),
+        migrations.RunPython(poblar_documentos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0014_documentobusqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='carrera_normalizada',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='sede_normalizada',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0015_usuario_columnas_normalizadas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['es_admin', '-destacado', 'nombre', 'id'], name='usuario_directorio_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:59
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0016_usuario_directorio_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='usuario',
+            name='qr_estado',
+        ),
+        migrations.RemoveField(
+            model_name='usuario',
+            name='qr_intentos',
+        ),
+    ]
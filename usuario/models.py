@@ -1,12 +1,14 @@
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-import qrcode
-from io import BytesIO
-from django.core.files import File
 from django.urls import reverse
-from django.conf import settings
+import hashlib
+import logging
+import random
+from . import avatares, busqueda, info_cache, versiones
+
+logger = logging.getLogger(__name__)
 
 RUBRO_CHOICES = [
     ('estudiante', 'Estudiante'),
@@ -90,6 +92,9 @@ CARRERA_CHOICES = [
     ('otro', 'Otra Carrera / Especialidad'),
 ]
 
+EMOJIS_DISPONIBLES = ['💡', '🚀', '📈', '💼', '🤝', '🌐', '💻', '📱', '🎯', '🌟', '🌱', '🔗', '🛠️', '📊', '🧠', '⚡️', '🏆', '🔑']
+
+
 class UsuarioManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -114,8 +119,8 @@ class UsuarioManager(BaseUserManager):
 
 class Usuario(AbstractBaseUser, PermissionsMixin):
     # Campos de Usuario
-    nombre = models.CharField(max_length=100)
-    apellido = models.CharField(max_length=100)
+    nombre = models.CharField(max_length=100, db_index=True)
+    apellido = models.CharField(max_length=100, db_index=True)
     rut = models.CharField(max_length=12, unique=True)
     email = models.EmailField(unique=True, verbose_name='Email')
     # 'password' es manejado por AbstractBaseUser
@@ -135,6 +140,8 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     institucion_empresa = models.CharField(max_length=150, blank=True, null=True, verbose_name="Institución o Empresa")
     foto = models.ImageField(upload_to='usuarios/', null=True, blank=True)
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    # El QR se dibuja al vuelo desde qr_contenido, que se emite la primera vez que se pide (ver usuario/qr.py).
+    qr_contenido = models.CharField(max_length=255, blank=True, null=True, help_text="Enlace codificado en el QR actual.")
     etiqueta_emojis = models.CharField(max_length=10, blank=True)
     # Campos de Sistema
     es_admin = models.BooleanField(default=False)
@@ -143,6 +150,11 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     cantidad_asistencias = models.IntegerField(default=0, verbose_name="Cantidad de Asistencias")
     perfil_publico = models.BooleanField(default=True, help_text="Permite que otros miembros vean tu perfil en el directorio.")
     destacado = models.BooleanField(default=False)
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True)
+    # Copias normalizadas para buscar sin tildes ni mayúsculas (ver usuario/busqueda.py).
+    nombre_normalizado = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    sede_normalizada = models.CharField(max_length=150, blank=True, db_index=True, editable=False)
+    carrera_normalizada = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
 
     # Manager personalizado
     objects = UsuarioManager()
@@ -152,10 +164,52 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
     # Campos requeridos al crear un superusuario
     REQUIRED_FIELDS = ['nombre', 'apellido', 'rut']
 
+    class Meta:
+        indexes = [
+            # Orden y paginación por keyset del directorio (ver usuario.views.directorio_miembros).
+            models.Index(fields=['es_admin', '-destacado', 'nombre', 'id'], name='usuario_directorio_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
+
+    def save(self, *args, **kwargs):
+        for columna, valor in busqueda.columnas_normalizadas(self).items():
+            setattr(self, columna, valor)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Un save(update_fields=['nombre']) también debe escribir su copia normalizada.
+            kwargs['update_fields'] = set(update_fields) | {
+                columna for columna, campos in busqueda.COLUMNAS_NORMALIZADAS.items() if set(campos) & set(update_fields)
+            }
+        super().save(*args, **kwargs)
+
+    @property
+    def qr_version(self):
+        """Huella corta del contenido del QR; cambia cuando se emite una credencial nueva."""
+        return hashlib.sha1((self.qr_contenido or '').encode()).hexdigest()[:8]
+
+    @property
+    def qr_svg_url(self):
+        return reverse('qr_usuario', args=[self.id, 'svg']) + f'?v={self.qr_version}'
+
+    @property
+    def qr_png_url(self):
+        return reverse('qr_usuario', args=[self.id, 'png']) + f'?v={self.qr_version}&tamano=600'
     
 
+    @property
+    def avatar_48_url(self):
+        return avatares.url(self.foto.name, 48) if self.foto else ''
+
+    @property
+    def avatar_96_url(self):
+        return avatares.url(self.foto.name, 96) if self.foto else ''
+
+    @property
+    def avatar_256_url(self):
+        return avatares.url(self.foto.name, 256) if self.foto else ''
+
     @property
     def get_rubro_real_display(self):
         if self.rubro == 'otro':
@@ -174,22 +228,63 @@ class Usuario(AbstractBaseUser, PermissionsMixin):
             return self.carrera_otro or 'Otra Carrera'
         return self.get_carrera_display()
 
+class DocumentoBusqueda(models.Model):
+    """Texto normalizado por el que se busca a cada usuario (ver usuario/busqueda.py)."""
+    usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True, related_name='documento_busqueda')
+    texto = models.TextField()
+    email = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Documento de búsqueda de {self.usuario_id}"
+
+@receiver(pre_save, sender=Usuario)
+def asignar_emojis(sender, instance, **kwargs):
+    # Se asignan antes de insertar: el registro hace un único INSERT.
+    if instance._state.adding and not instance.etiqueta_emojis:
+        instance.etiqueta_emojis = "".join(random.sample(EMOJIS_DISPONIBLES, 3))
+
+@receiver(pre_save, sender=Usuario)
+def recordar_foto(sender, instance, update_fields=None, **kwargs):
+    instance._foto_anterior = None
+    if update_fields is not None and 'foto' not in update_fields:
+        instance._foto_anterior = instance.foto.name # No cambia: se evita la consulta
+    elif instance.pk is not None:
+        instance._foto_anterior = Usuario.objects.filter(pk=instance.pk).values_list('foto', flat=True).first()
+
+def _normalizar_foto(usuario_id, nombre):
+    try:
+        avatares.normalizar(usuario_id, nombre)
+    except avatares.ERRORES_IMAGEN:
+        # Se sirve el original; normalizar_avatares la reintenta.
+        logger.warning('No se pudo normalizar la foto %s del usuario %s', nombre, usuario_id, exc_info=True)
+
+@receiver(post_save, sender=Usuario)
+def procesar_foto(sender, instance, **kwargs):
+    """Normaliza la foto recién subida y borra los avatares de la que reemplazó."""
+    anterior, actual = getattr(instance, '_foto_anterior', None) or '', instance.foto.name or ''
+    if anterior == actual:
+        return
+    if anterior:
+        transaction.on_commit(lambda: avatares.borrar(anterior))
+    if actual and not avatares.normalizada(actual):
+        transaction.on_commit(lambda: _normalizar_foto(instance.id, actual))
+
+@receiver(post_save, sender=Usuario)
+def actualizar_documento_busqueda(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(busqueda.CAMPOS):
+        busqueda.actualizar_documento(instance)
+
+@receiver(post_delete, sender=Usuario)
+def borrar_avatares(sender, instance, **kwargs):
+    if instance.foto:
+        nombre = instance.foto.name
+        transaction.on_commit(lambda: avatares.borrar(nombre))
+
 @receiver(post_save, sender=Usuario)
-def extras_post_creacion(sender, instance, created, **kwargs):
-    import random
-    if created:
-        update_fields = []
-        if not instance.etiqueta_emojis:
-            emojis_disponibles = ['💡', '🚀', '📈', '💼', '🤝', '🌐', '💻', '📱', '🎯', '🌟', '🌱', '🔗', '🛠️', '📊', '🧠', '⚡️', '🏆', '🔑']
-            instance.etiqueta_emojis = "".join(random.sample(emojis_disponibles, 3))
-            update_fields.append('etiqueta_emojis')
-        if not instance.qr_code:
-            base_url = getattr(settings, 'BASE_URL', 'http://127.0.0.1:8000')
-            qr_url = base_url + reverse('perfil_publico', args=[instance.id])
-            buffer = BytesIO()
-            qrcode.make(qr_url).save(buffer, format='PNG')
-            instance.qr_code.save(f'qr_usuario_{instance.id}.png', File(buffer), save=False)
-            update_fields.append('qr_code')
-
-        if update_fields:
-            instance.save(update_fields=update_fields)
+@receiver(post_delete, sender=Usuario)
+def invalidar_info_cache(sender, instance, **kwargs):
+    usuario_id = instance.id
+    info_cache.invalidar(usuario_id)
+    transaction.on_commit(lambda: info_cache.invalidar(usuario_id))
+    # Nombre y foto salen en los testimonios de inicio; el total, en sus estadísticas.
+    transaction.on_commit(lambda: versiones.incrementar(versiones.USUARIO))
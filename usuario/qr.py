@@ -0,0 +1,74 @@
+"""
+Códigos QR de los usuarios.
+
+Por defecto el QR se dibuja al vuelo en `usuario.views.qr_usuario` (SVG o PNG)
+a partir de `Usuario.qr_contenido`, con una caché LRU acotada en memoria.
+Con `QR_GUARDAR_ARCHIVOS = True` además se guarda un PNG por usuario en
+media/qr_codes/ (comportamiento anterior), que dibuja `manage.py regenerar_qrs`.
+
+El contenido se emite la primera vez que alguien pide el QR (`contenido_vigente`),
+así que registrarse no genera nada y no hace falta una cola ni un worker.
+"""
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .credenciales import credencial_vigente, url_credencial
+from .models import Usuario
+
+MAX_QR_EN_CACHE = 512
+BORDE = 2
+
+
+def guardar_archivos():
+    return getattr(settings, 'QR_GUARDAR_ARCHIVOS', False)
+
+
+def renderizar_png(contenido):
+    buffer = BytesIO()
+    qrcode.make(contenido).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=MAX_QR_EN_CACHE)
+def renderizar(contenido, formato, tamano):
+    """
+    Bytes del QR en 'svg' (un único <path>, escalable) o 'png' de hasta
+    `tamano` px por lado. Se cachea: el mismo contenido siempre da el mismo QR.
+    """
+    codigo = qrcode.QRCode(border=BORDE)
+    codigo.add_data(contenido)
+    codigo.make(fit=True)
+    buffer = BytesIO()
+    if formato == 'svg':
+        codigo.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        codigo.box_size = max(1, tamano // (codigo.modules_count + 2 * BORDE))
+        codigo.make_image().save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def contenido_vigente(usuario):
+    """
+    Enlace que va en el QR del usuario. Se reutiliza el guardado mientras siga
+    vigente (así el QR no cambia entre visitas); si no, se emite y guarda uno nuevo.
+    """
+    if not credencial_vigente(usuario.qr_contenido, usuario.id):
+        usuario.qr_contenido = url_credencial(usuario.id)
+        # La fecha hace que el padrón del tótem envíe la huella nueva en su delta.
+        Usuario.objects.filter(id=usuario.id).update(qr_contenido=usuario.qr_contenido, fecha_actualizacion=timezone.now())
+    return usuario.qr_contenido
+
+
+def guardar_png(usuario_id, png):
+    """Guarda el PNG reemplazando el anterior (sin sufijos aleatorios). Devuelve el nombre."""
+    nombre = f'qr_codes/qr_usuario_{usuario_id}.png'
+    if default_storage.exists(nombre):
+        default_storage.delete(nombre)
+    return default_storage.save(nombre, ContentFile(png))
@@ -1,3 +1,207 @@
-from django.test import TestCase
+import hashlib
+import re
+import shutil
+import tempfile
+import time
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from . import avatares, busqueda
+from .credenciales import LARGO_HUELLA, credencial_vigente, generar_token, huella, url_credencial, verificar_token
+from .models import Usuario
+
+
+class CredencialesTests(SimpleTestCase):
+    def test_token_valido(self):
+        self.assertEqual(verificar_token(generar_token(42)), 42)
+
+    def test_acepta_mayusculas_y_espacios(self):
+        # Los escáneres de mano a veces cambian mayúsculas o agregan un salto de línea.
+        self.assertEqual(verificar_token(f' {generar_token(42).upper()}\n'), 42)
+
+    def test_firma_alterada(self):
+        token = generar_token(42)
+        alterado = token[:-1] + ('0' if token[-1] != '0' else '1')
+        self.assertIsNone(verificar_token(alterado))
+
+    def test_usuario_alterado(self):
+        version, _, emitido_en, firma = generar_token(42).split('g')
+        self.assertIsNone(verificar_token(f'{version}g{43:x}g{emitido_en}g{firma}'))
+
+    def test_formato_invalido(self):
+        for token in (None, '', 'hola', '1g2g3', '1g2g3gzz'):
+            self.assertIsNone(verificar_token(token))
+
+    @override_settings(CREDENCIAL_CLAVES={1: 'uno', 2: 'dos'}, CREDENCIAL_VERSION_ACTUAL=1)
+    def test_rotacion_de_claves(self):
+        anterior = generar_token(42)
+        with self.settings(CREDENCIAL_VERSION_ACTUAL=2):
+            self.assertTrue(generar_token(42).startswith('2g'))
+            # Los QR de la versión anterior siguen valiendo mientras su clave exista...
+            self.assertEqual(verificar_token(anterior), 42)
+            # ...pero ya no son la credencial vigente: se regeneran.
+            self.assertFalse(credencial_vigente(url_credencial(42, anterior), 42))
+            self.assertTrue(credencial_vigente(url_credencial(42), 42))
+        with self.settings(CREDENCIAL_CLAVES={2: 'dos'}, CREDENCIAL_VERSION_ACTUAL=2):
+            self.assertIsNone(verificar_token(anterior)) # Versión revocada
+
+    def test_revocacion_por_fecha(self):
+        ahora = int(time.time())
+        token = generar_token(42, emitido_en=ahora - 60)
+        with self.settings(CREDENCIAL_EMITIDAS_DESDE=ahora):
+            self.assertIsNone(verificar_token(token))
+            self.assertEqual(verificar_token(generar_token(42, emitido_en=ahora)), 42)
+
+    def test_huella(self):
+        token = generar_token(42)
+        esperada = hashlib.sha256(token.encode()).hexdigest()[:LARGO_HUELLA]
+        self.assertEqual(huella(url_credencial(42, token), 42), esperada)
+        # Solo hay huella para la credencial auténtica del mismo usuario.
+        self.assertIsNone(huella(url_credencial(42, token), 43))
+        self.assertIsNone(huella(None, 42))
+
+
+class BusquedaTests(TransactionTestCase):
+    """
+    TransactionTestCase: el índice FULLTEXT de InnoDB solo ve las filas
+    confirmadas, así que estas pruebas no pueden correr dentro de una transacción.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.juan = Usuario.objects.create_user(
+            email='juan@prueba.cl', nombre='Juan José', apellido='Pérez Soto', rut='11.111.111-1', sede='Arica'
+        )
+        self.maria = Usuario.objects.create_user(
+            email='maria@prueba.cl', nombre='María', apellido='Núñez', rut='22.222.222-2',
+            carrera='otro', carrera_otro='Diseño Gráfico',
+        )
+        self.pedro = Usuario.objects.create_user(email='pedro@prueba.cl', nombre='Pedro', apellido='Pereira', rut='3-5')
+
+    def _buscar(self, consulta, incluir_email=False):
+        return set(busqueda.buscar(Usuario.objects.all(), consulta, incluir_email).values_list('id', flat=True))
+
+    def test_buscar(self):
+        self.assertEqual(self._buscar('jua per'), {self.juan.id})
+        self.assertEqual(self._buscar('PEREZ'), {self.juan.id})
+        self.assertEqual(self._buscar('nunez'), {self.maria.id})
+        self.assertEqual(self._buscar('diseño'), {self.maria.id})
+        self.assertEqual(self._buscar('pere'), {self.juan.id, self.pedro.id})
+        self.assertEqual(self._buscar('11111111'), {self.juan.id})
+        # El email solo se busca desde el panel.
+        self.assertEqual(self._buscar('maria@prueba'), set())
+        self.assertEqual(self._buscar('maria@prueba', incluir_email=True), {self.maria.id})
+
+    @override_settings(BUSQUEDA_USUARIOS_BACKEND='usuario.busqueda.BusquedaSimple')
+    def test_motor_simple_solo_por_prefijo(self):
+        # Cada término debe ser prefijo de una columna normalizada ("jose juan perez soto") o del RUT.
+        self.assertEqual(self._buscar('JOSÉ'), {self.juan.id})
+        self.assertEqual(self._buscar('mar'), {self.maria.id})
+        self.assertEqual(self._buscar('arica'), {self.juan.id})
+        self.assertEqual(self._buscar('diseño'), {self.maria.id})
+        self.assertEqual(self._buscar('11'), {self.juan.id})
+        # Lo que no es prefijo queda para el índice de texto completo.
+        self.assertEqual(self._buscar('perez'), set())
+        self.assertEqual(self._buscar('grafico'), set())
+
+    def test_documento_se_actualiza_al_guardar(self):
+        self.pedro.apellido = 'Álvarez'
+        self.pedro.save()
+        self.assertEqual(self._buscar('alvarez'), {self.pedro.id})
+        self.assertEqual(self._buscar('pereira'), set())
+
+    def test_filtrar_conserva_el_orden(self):
+        miembros = Usuario.objects.order_by('-id')
+        self.assertEqual(
+            list(busqueda.filtrar(miembros, 'pe').values_list('id', flat=True)),
+            [self.pedro.id, self.juan.id],
+        )
+
+
+class DirectorioKeysetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = Usuario.objects.create_user(email='admin@prueba.cl', nombre='Admin', apellido='Panel', rut='1-9', es_admin=True)
+        # Nombres repetidos y destacados mezclados: el desempate por id debe mantener el orden estable.
+        for i in range(60):
+            Usuario.objects.create_user(
+                email=f'u{i}@prueba.cl', nombre=f'Nombre{i % 7}', apellido='Directorio', rut=f'{i}-k',
+                destacado=i % 5 == 0, perfil_publico=i % 11 != 0,
+            )
+        sesion = self.client.session
+        sesion['usuario_id'] = admin.id
+        sesion.save()
+
+    def _recorrer(self, **filtros):
+        respuesta = self.client.get(reverse('directorio_miembros'), filtros)
+        vistos = [m.id for m in respuesta.context['miembros']]
+        siguiente = respuesta.context['siguiente']
+        while siguiente:
+            datos = self.client.get(reverse('directorio_pagina'), {**filtros, 'cursor': siguiente}).json()
+            # Cada tarjeta enlaza dos veces al perfil.
+            vistos += [int(i) for i in dict.fromkeys(re.findall(r'href="/perfil-publico/(\d+)/"', datos['html']))]
+            siguiente = datos['siguiente']
+        return vistos
+
+    def test_recorre_todo_sin_repetir_ni_saltar(self):
+        esperados = list(
+            Usuario.objects.filter(es_admin=False).order_by('-destacado', 'nombre', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self._recorrer(), esperados)
+
+    def test_con_filtro(self):
+        esperados = list(
+            Usuario.objects.filter(es_admin=False, nombre='Nombre3').order_by('-destacado', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self._recorrer(q='nombre3'), esperados)
+
+    def test_cursor_falsificado(self):
+        respuesta = self.client.get(reverse('directorio_pagina'), {'cursor': 'WzAsICIiLCAwXQ:falso:firma'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class AvataresTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = self.settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _subir(self, contenido):
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = Usuario.objects.create_user(email='ana@prueba.cl', nombre='Ana', apellido='Rojas', rut='1-9')
+            usuario.foto = SimpleUploadedFile('ana.png', contenido)
+            usuario.save()
+        return Usuario.objects.get(id=usuario.id)
+
+    def test_normaliza_y_archiva_el_original(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, format='PNG')
+        usuario = self._subir(buffer.getvalue())
+
+        self.assertTrue(avatares.normalizada(usuario.foto.name))
+        for lado in avatares.LADOS:
+            with default_storage.open(avatares.nombre_lado(usuario.foto.name, lado), 'rb') as archivo:
+                self.assertEqual(Image.open(archivo).size, (lado, lado))
+        self.assertFalse(default_storage.exists('usuarios/ana.png'))
+        with default_storage.open(avatares.nombre_original(usuario.foto.name), 'rb') as archivo:
+            self.assertEqual(archivo.read(), buffer.getvalue())
+
+        nombre = usuario.foto.name
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.delete()
+        self.assertFalse(default_storage.exists(avatares.nombre_original(nombre)))
+
+    def test_foto_ilegible_conserva_el_original(self):
+        with self.assertLogs('usuario.models', 'WARNING'):
+            usuario = self._subir(b'no es una imagen')
+        self.assertEqual(usuario.foto.name, 'usuarios/ana.png')
+        self.assertEqual(default_storage.listdir('usuarios'), ([], ['ana.png']))
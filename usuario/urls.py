@@ -5,8 +5,11 @@ urlpatterns = [
     path('perfil/', views.perfil, name='perfil'),
     path('perfil/editar/<int:usuario_id>/', views.editar_perfil, name='editar_perfil'),
     path('perfil-publico/<int:usuario_id>/', views.perfil_publico, name='perfil_publico'),
+    path('perfil-publico/<int:usuario_id>/<str:credencial>/', views.perfil_publico, name='perfil_publico_credencial'),
     path('imprimir-etiqueta/<int:usuario_id>/', views.imprimir_etiqueta, name='imprimir_etiqueta'),
+    path('qr/<int:usuario_id>.<str:formato>', views.qr_usuario, name='qr_usuario'),
     path('reunion/<int:reunion_id>/toggle-interes/', views.toggle_interes, name='toggle_interes'),
+    path('reuniones/estado/', views.estado_eventos, name='estado_eventos'),
     path('configuracion/', views.configuracion, name='configuracion'),
     path('configuracion/cambiar-password/', views.cambiar_password, name='cambiar_password'),
     path('configuracion/eliminar-cuenta/', views.eliminar_cuenta, name='eliminar_cuenta'),
@@ -14,5 +17,6 @@ urlpatterns = [
     path('soporte/mis-tickets/', views.mis_tickets, name='mis_tickets'),
     path('soporte/ticket/<int:ticket_id>/', views.ver_ticket_usuario, name='ver_ticket_usuario'),
     path('directorio/', views.directorio_miembros, name='directorio_miembros'),
+    path('directorio/pagina/', views.directorio_pagina, name='directorio_pagina'),
     path('mis-reuniones/', views.mis_reuniones, name='mis_reuniones'),
 ]
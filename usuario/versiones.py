@@ -0,0 +1,41 @@
+"""
+Versiones de datos para armar claves de caché.
+
+Cada modelo tiene un contador en la caché (`version:<modelo>`) que las señales
+de guardado y borrado incrementan. Las claves que incluyen la versión quedan
+obsoletas solas al cambiar los datos: no hace falta saber qué claves borrar.
+"""
+import time
+
+from django.core.cache import cache
+
+REUNION = 'reunion'
+RESPUESTA_ENCUESTA = 'respuesta_encuesta'
+USUARIO = 'usuario'
+
+
+def _clave(modelo):
+    return f'version:{modelo}'
+
+
+def obtener(*modelos):
+    """Dict {modelo: versión}. Una sola lectura a la caché para todos."""
+    versiones = cache.get_many([_clave(modelo) for modelo in modelos])
+    resultado = {}
+    for modelo in modelos:
+        version = versiones.get(_clave(modelo))
+        if version is None:
+            # Se parte del reloj, no de 1: si la clave se perdió, la nueva
+            # versión no coincide con claves guardadas antes.
+            version = time.time_ns() // 1000
+            if not cache.add(_clave(modelo), version, None):
+                version = cache.get(_clave(modelo), version)
+        resultado[modelo] = version
+    return resultado
+
+
+def incrementar(modelo):
+    try:
+        cache.incr(_clave(modelo))
+    except ValueError:
+        pass # Sin versión en caché: la próxima lectura crea una nueva
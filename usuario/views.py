@@ -1,12 +1,21 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.core import signing
 from django.contrib import messages
+from django.contrib.messages import get_messages
+from django.core.cache import cache
 from .forms import UsuarioForm, EditarUsuarioForm, RespuestaEncuestaForm, CambiarPasswordForm, LoginForm
 from .models import CARRERA_CHOICES, SEDE_CHOICES, Usuario, RUBRO_CHOICES
-from paneladm.models import Reunion, Encuesta, RespuestaEncuesta, SoporteTicket, TicketRespuesta
+from paneladm.models import Reunion, Asistencia, Encuesta, RespuestaEncuesta, SoporteTicket, TicketRespuesta
 from paneladm.forms import SoporteTicketForm, TicketRespuestaForm, ReunionForm
 from django.contrib.auth.hashers import check_password
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef
+from django.utils.functional import SimpleLazyObject
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotModified, Http404
+from . import busqueda, qr, versiones
+from .middleware import usuario_actual_o_404
+import hashlib
 import random
 
 def login_required(view_func):
@@ -62,10 +71,9 @@ def registro(request):
 
 
 def perfil(request):
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
+    if not request.session.get('usuario_id'):
         return redirect('login')
-    usuario = get_object_or_404(Usuario, id=usuario_id)
+    usuario = usuario_actual_o_404(request)
     if request.method == 'POST' and 'responder_encuesta' in request.POST:
         form_respuesta = RespuestaEncuestaForm(request.POST)
         if form_respuesta.is_valid():
@@ -102,7 +110,8 @@ def editar_perfil(request, usuario_id):
         form = EditarUsuarioForm(instance=usuario)
     return render(request, 'editar_perfil.html', {'form': form, 'usuario': usuario})
 
-def perfil_publico(request, usuario_id):
+def perfil_publico(request, usuario_id, credencial=None):
+    # `credencial` es el token firmado del QR; aquí solo se muestra el perfil.
     usuario = get_object_or_404(Usuario, id=usuario_id)
     return render(request, 'perfil_publico.html', {'usuario': usuario})
 
@@ -113,32 +122,117 @@ def imprimir_etiqueta(request, usuario_id):
     usuario = get_object_or_404(Usuario, id=usuario_id)
     return render(request, 'etiqueta_imprimir.html', {'usuario': usuario})
 
-def inicio(request):
-    usuario_id = request.session.get('usuario_id')
-    usuario = None
-    if usuario_id:
-        try:
-            usuario = Usuario.objects.get(id=usuario_id)
-        except Usuario.DoesNotExist:
-            pass
-
-    reuniones_proximas = Reunion.objects.filter(fecha__gte=timezone.now()).order_by('fecha')
+TAMANO_QR_POR_DEFECTO = 300
+TAMANO_QR_MAXIMO = 1200
+
+def qr_usuario(request, usuario_id, formato):
+    """
+    QR de la credencial del usuario dibujado al vuelo, en SVG o PNG (`?tamano=` px).
+    Solo lo ven el propio usuario y las cuentas con privilegios (admin, ayudante, tótem).
+    Con `?v=` igual a la versión vigente se puede cachear por un año.
+    """
+    if formato not in ('svg', 'png'):
+        raise Http404
+    sesion_id = request.session.get('usuario_id')
+    if not sesion_id:
+        return redirect('login')
+    if sesion_id != usuario_id and not (request.user_is_admin or request.user_is_ayudante or request.user_is_totem):
+        return HttpResponseForbidden()
+
+    usuario = get_object_or_404(Usuario.objects.only('id', 'qr_contenido'), id=usuario_id)
+    try:
+        tamano = int(request.GET.get('tamano', TAMANO_QR_POR_DEFECTO))
+    except ValueError:
+        tamano = TAMANO_QR_POR_DEFECTO
+    tamano = max(64, min(tamano, TAMANO_QR_MAXIMO)) if formato == 'png' else 0
+
+    contenido = qr.contenido_vigente(usuario)
+    etag = '"%s"' % hashlib.sha1(f'{contenido}|{formato}|{tamano}'.encode()).hexdigest()
+    if request.GET.get('v') == usuario.qr_version:
+        cache_control = 'private, max-age=31536000, immutable' # La URL cambia si cambia el QR
+    else:
+        cache_control = 'private, no-cache'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        content_type = 'image/svg+xml' if formato == 'svg' else 'image/png'
+        response = HttpResponse(qr.renderizar(contenido, formato, tamano), content_type=content_type)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+INICIO_CACHE_TTL = 60 * 10 # Acota el tiempo que una reunión ya comenzada sigue como "próxima"
+
+def _reuniones_proximas():
     now = timezone.now()
-    for reunion in reuniones_proximas:
+    reuniones = list(Reunion.objects.filter(fecha__gte=now).order_by('fecha'))
+    for reunion in reuniones:
         delta = reunion.fecha.date() - now.date()
         reunion.dias_restantes = delta.days
+    return reuniones
 
-    testimonios = RespuestaEncuesta.objects.filter(destacado=True).exclude(comentarios__exact='').order_by('-fecha_respuesta')
-    total_usuarios = Usuario.objects.count()
-    total_reuniones = Reunion.objects.count()
+def _testimonios():
+    return list(
+        RespuestaEncuesta.objects.filter(destacado=True).exclude(comentarios__exact='')
+        .select_related('usuario').order_by('-fecha_respuesta')
+    )
+
+def _estado_interes(usuario_id):
+    """
+    Ids de las próximas reuniones a las que el usuario asiste o en las que está
+    interesado. Una sola consulta: dos EXISTS sobre los índices (reunion, usuario).
+    """
+    estados = Reunion.objects.filter(fecha__gte=timezone.now()).annotate(
+        asiste=Exists(Asistencia.objects.filter(reunion=OuterRef('pk'), usuario_id=usuario_id)),
+        interesa=Exists(Reunion.interesados.through.objects.filter(reunion=OuterRef('pk'), usuario_id=usuario_id)),
+    ).filter(Q(asiste=True) | Q(interesa=True)).values_list('id', 'asiste', 'interesa')
+    estado = {'asistente': [], 'interesado': []}
+    for reunion_id, asiste, interesa in estados:
+        if asiste:
+            estado['asistente'].append(reunion_id)
+        elif interesa:
+            estado['interesado'].append(reunion_id)
+    return estado
+
+def inicio(request):
+    """
+    Página de inicio. Las tarjetas de reuniones y los testimonios se cachean como
+    fragmentos (ver `{% cache %}` en inicio.html) con claves que incluyen la versión
+    de los datos (`usuario/versiones.py`) y la fecha, de modo que las consultas
+    solo corren si el fragmento no está en caché. El estado de interés de cada
+    usuario no va en el fragmento: se aplica encima con `estado_interes`.
+    Los visitantes anónimos reciben la página completa desde la caché.
+    """
+    usuario = request.current_usuario or None
+    v = versiones.obtener(versiones.REUNION, versiones.RESPUESTA_ENCUESTA, versiones.USUARIO)
+    hoy = timezone.localdate().isoformat()
     contexto = {
         'usuario': usuario,
-        'reuniones': reuniones_proximas,
-        'testimonios': testimonios,
-        'total_usuarios': total_usuarios,
-        'total_reuniones': total_reuniones,
+        'reuniones': SimpleLazyObject(_reuniones_proximas),
+        'testimonios': SimpleLazyObject(_testimonios),
+        'inicio_cache_ttl': INICIO_CACHE_TTL,
+        'version_reuniones': f"{hoy}:{v[versiones.REUNION]}",
+        'version_testimonios': f"{v[versiones.RESPUESTA_ENCUESTA]}:{v[versiones.USUARIO]}",
     }
-    return render(request, 'inicio.html', contexto)
+    if usuario:
+        contexto['estado_interes'] = _estado_interes(usuario.id)
+        return render(request, 'inicio.html', contexto)
+
+    # Con mensajes pendientes (p. ej. tras cerrar sesión) la página no es la genérica.
+    cacheable = request.method == 'GET' and not get_messages(request)
+    clave = f"inicio:anonimo:{hoy}:{v[versiones.REUNION]}:{v[versiones.RESPUESTA_ENCUESTA]}:{v[versiones.USUARIO]}"
+    if cacheable:
+        contenido = cache.get(clave)
+        if contenido is not None:
+            return HttpResponse(contenido)
+
+    contexto['total_usuarios'] = Usuario.objects.count()
+    contexto['total_reuniones'] = Reunion.objects.count()
+    response = render(request, 'inicio.html', contexto)
+    if cacheable:
+        cache.set(clave, response.content, INICIO_CACHE_TTL)
+    return response
 
 def registrar_interes(request, reunion_id):
     usuario_id = request.session.get('usuario_id')
@@ -147,7 +241,7 @@ def registrar_interes(request, reunion_id):
         return redirect('login')
     if request.method == 'POST':
         reunion = get_object_or_404(Reunion, id=reunion_id)
-        usuario = get_object_or_404(Usuario, id=usuario_id)
+        usuario = usuario_actual_o_404(request)
         reunion.interesados.add(usuario)
         messages.success(request, f'¡Genial! Has mostrado interés en "{reunion.detalle}".')
     return redirect('inicio')
@@ -161,12 +255,13 @@ def toggle_interes(request, reunion_id):
     from django.http import JsonResponse
     if request.method == 'POST':
         reunion = get_object_or_404(Reunion, id=reunion_id)
-        usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+        usuario = usuario_actual_o_404(request)
 
-        if usuario in reunion.asistentes.all():
+        # Búsquedas de una fila por el índice (reunion, usuario), sin cargar las listas completas.
+        if Asistencia.objects.filter(reunion=reunion, usuario_id=usuario.id).exists():
             return JsonResponse({'status': 'error', 'message': 'Tu asistencia ya está confirmada.'}, status=400)
 
-        if usuario in reunion.interesados.all():
+        if Reunion.interesados.through.objects.filter(reunion=reunion, usuario_id=usuario.id).exists():
             reunion.interesados.remove(usuario)
             return JsonResponse({'status': 'removed', 'message': 'Interés quitado.'})
         else:
@@ -174,16 +269,23 @@ def toggle_interes(request, reunion_id):
             return JsonResponse({'status': 'added', 'message': 'Interés registrado.'})
     return JsonResponse({'status': 'error', 'message': 'Método no permitido.'}, status=405)
 
+@login_required
+def estado_eventos(request):
+    """
+    Estado del usuario en las próximas reuniones (AJAX): ids en las que confirmó
+    asistencia y en las que marcó interés, para los botones de inicio.
+    """
+    from django.http import JsonResponse
+    return JsonResponse(_estado_interes(request.session['usuario_id']))
+
 def panel_admin(request):
-    usuario_id = request.session.get('usuario_id')
-    if not usuario_id:
+    if not request.session.get('usuario_id'):
         return redirect('login')
-    try:
-        usuario_actual = Usuario.objects.get(id=usuario_id)
-        if not usuario_actual.es_admin and not usuario_actual.es_ayudante:
-            return redirect('inicio')
-    except Usuario.DoesNotExist:
+    usuario_actual = request.current_usuario
+    if not usuario_actual:
         return redirect('login')
+    if not usuario_actual.es_admin and not usuario_actual.es_ayudante:
+        return redirect('inicio')
 
     return render(request, 'panel_admin.html', {'usuario': usuario_actual})
 
@@ -192,8 +294,7 @@ def configuracion(request):
     """
     Muestra la página de configuración del usuario.
     """
-    usuario_id = request.session.get('usuario_id')
-    usuario = get_object_or_404(Usuario, id=usuario_id)
+    usuario = usuario_actual_o_404(request)
 
     if request.method == 'POST':
         usuario.perfil_publico = request.POST.get('perfil_publico') == 'true'
@@ -208,8 +309,7 @@ def configuracion(request):
 
 @login_required
 def cambiar_password(request):
-    usuario_id = request.session.get('usuario_id')
-    usuario = get_object_or_404(Usuario, id=usuario_id)
+    usuario = usuario_actual_o_404(request)
     if request.method == 'POST':
         form = CambiarPasswordForm(request.POST)
         if form.is_valid():
@@ -236,8 +336,7 @@ def cambiar_password(request):
 @login_required
 def eliminar_cuenta(request):
     if request.method == 'POST':
-        usuario_id = request.session.get('usuario_id')
-        usuario = get_object_or_404(Usuario, id=usuario_id)
+        usuario = usuario_actual_o_404(request)
         usuario.delete()
         request.session.flush()
         messages.success(request, 'Tu cuenta ha sido eliminada permanentemente.')
@@ -246,7 +345,7 @@ def eliminar_cuenta(request):
 
 @login_required
 def crear_ticket_soporte(request):
-    usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario = usuario_actual_o_404(request)
     if request.method == 'POST':
         form = SoporteTicketForm(request.POST)
         if form.is_valid():
@@ -266,13 +365,13 @@ def crear_ticket_soporte(request):
 
 @login_required
 def mis_tickets(request):
-    usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario = usuario_actual_o_404(request)
     tickets = SoporteTicket.objects.filter(usuario=usuario).order_by('-fecha_creacion')
     return render(request, 'mis_tickets.html', {'usuario': usuario, 'tickets': tickets})
 
 @login_required
 def ver_ticket_usuario(request, ticket_id):
-    usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario = usuario_actual_o_404(request)
     ticket = get_object_or_404(SoporteTicket, id=ticket_id, usuario=usuario) # Seguridad: solo el dueño puede ver
 
     if request.method == 'POST':
@@ -293,59 +392,90 @@ def ver_ticket_usuario(request, ticket_id):
     }
     return render(request, 'ver_ticket_usuario.html', contexto)
 
-@login_required
-def directorio_miembros(request):
-    usuario_id = request.session.get('usuario_id')
-    usuario_actual = get_object_or_404(Usuario, id=usuario_id) # El que está viendo la página
+MIEMBROS_POR_PAGINA = 24
+CAMPOS_TARJETA_MIEMBRO = ['id', 'nombre', 'apellido', 'foto', 'rubro', 'rubro_otro', 'sede', 'sede_otro',
+                          'carrera', 'carrera_otro', 'perfil_publico', 'destacado']
 
-    query = request.GET.get('q', '')
-    rubro_filter = request.GET.get('rubro', '') # Ahora es rol_filter
-    sede_filter = request.GET.get('sede', '')
-    carrera_filter = request.GET.get('carrera', '')
-
-    # Los usuarios solo ven perfiles públicos. El admin ve todos.
-    # Nota: `request.user_is_admin` no está definido en este contexto. Asumo que es una variable de contexto o middleware.
-    # Para mayor seguridad, se debería verificar `usuario_actual.es_admin`.
-    if usuario_actual.es_admin: # Asumiendo que request.user_is_admin es equivalente a usuario_actual.es_admin
-        # El admin ve a todos los usuarios (no admins), ordenando por destacado y luego por visibilidad
-        miembros = Usuario.objects.filter(es_admin=False).order_by('-destacado', '-perfil_publico', 'nombre')
-    else:
-        miembros = Usuario.objects.filter(perfil_publico=True, es_admin=False).order_by('-destacado', 'nombre')
+def _miembros_directorio(request, usuario_actual):
+    """
+    Miembros visibles con los filtros de la URL, en el orden del índice
+    `usuario_directorio_idx` (destacados primero, luego nombre e id).
+    """
+    # Los usuarios solo ven perfiles públicos. El admin ve todos (los ocultos, atenuados).
+    miembros = Usuario.objects.filter(es_admin=False)
+    if not usuario_actual.es_admin:
+        miembros = miembros.filter(perfil_publico=True)
 
+    query = request.GET.get('q', '')
     if query:
-        # Incluimos búsqueda en sede y carrera también
+        # Texto completo sobre nombre, apellido, RUT, sede y carrera (ver usuario/busqueda.py).
+        # Sin orden por relevancia: el keyset necesita el orden del índice.
+        miembros = busqueda.filtrar(miembros, query)
+    # Comparación exacta (los valores vienen de los select): no impide usar el índice.
+    for campo in ('rubro', 'sede', 'carrera'):
+        if request.GET.get(campo):
+            miembros = miembros.filter(**{campo: request.GET[campo]})
+    return miembros.only(*CAMPOS_TARJETA_MIEMBRO).order_by('-destacado', 'nombre', 'id')
+
+def _pagina_miembros(miembros, cursor=None):
+    """
+    Una página por keyset: las filas posteriores a (destacado, nombre, id) del
+    cursor, sin OFFSET. Devuelve (miembros, cursor de la siguiente o None).
+    """
+    if cursor:
+        destacado, nombre, ultimo_id = signing.loads(cursor, salt='directorio')
         miembros = miembros.filter(
-            Q(nombre__icontains=query) | 
-            Q(apellido__icontains=query) |
-            Q(rut__icontains=query) |
-            Q(sede__icontains=query) |
-            Q(sede_otro__icontains=query) |
-            Q(carrera__icontains=query) |
-            Q(carrera_otro__icontains=query)
+            Q(destacado__lt=destacado) |
+            Q(destacado=destacado, nombre__gt=nombre) |
+            Q(destacado=destacado, nombre=nombre, id__gt=ultimo_id)
         )
-    
-    if rubro_filter:
-        miembros = miembros.filter(rubro__iexact=rubro_filter)
-    if sede_filter:
-        miembros = miembros.filter(sede__iexact=sede_filter)
-    if carrera_filter:
-        miembros = miembros.filter(carrera__iexact=carrera_filter)
+    pagina = list(miembros[:MIEMBROS_POR_PAGINA + 1])
+    if len(pagina) <= MIEMBROS_POR_PAGINA:
+        return pagina, None
+    ultimo = pagina[MIEMBROS_POR_PAGINA - 1]
+    return pagina[:MIEMBROS_POR_PAGINA], signing.dumps([ultimo.destacado, ultimo.nombre, ultimo.id], salt='directorio')
+
+def _filtros_directorio(request):
+    filtros = request.GET.copy()
+    filtros.pop('cursor', None)
+    return filtros.urlencode()
 
+@login_required
+def directorio_miembros(request):
+    usuario_actual = usuario_actual_o_404(request) # El que está viendo la página
+    miembros, siguiente = _pagina_miembros(_miembros_directorio(request, usuario_actual))
     contexto = {
         'usuario': usuario_actual,
         'miembros': miembros,
+        'siguiente': siguiente,
+        'filtros': _filtros_directorio(request),
         'RUBRO_CHOICES': RUBRO_CHOICES,
         'SEDE_CHOICES': SEDE_CHOICES,
         'CARRERA_CHOICES': CARRERA_CHOICES,
     }
     return render(request, 'directorio.html', contexto)
 
+@login_required
+def directorio_pagina(request):
+    """
+    Siguiente página del directorio para el scroll infinito (AJAX): el HTML de
+    las tarjetas y el cursor de la página que sigue (null si es la última).
+    """
+    from django.http import JsonResponse
+    usuario_actual = usuario_actual_o_404(request)
+    try:
+        miembros, siguiente = _pagina_miembros(_miembros_directorio(request, usuario_actual), request.GET.get('cursor'))
+    except (signing.BadSignature, ValueError):
+        return JsonResponse({'status': 'error', 'message': 'Cursor inválido.'}, status=400)
+    html = render_to_string('directorio_miembros.html', {'miembros': miembros}, request=request)
+    return JsonResponse({'html': html, 'siguiente': siguiente})
+
 @login_required
 def mis_reuniones(request):
     """
     Muestra al usuario un resumen de su actividad en las reuniones.
     """
-    usuario = get_object_or_404(Usuario, id=request.session.get('usuario_id'))
+    usuario = usuario_actual_o_404(request)
 
     # Reuniones futuras en las que el usuario ha mostrado interés O ya es asistente.
     # Usamos Q para combinar ambas consultas y .distinct() para evitar duplicados.